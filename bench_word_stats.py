@@ -0,0 +1,141 @@
+"""word_stats の処理速度 (MB/s) とメモリを、合成した大きなコーパスで測る
+
+コーパスは Zipf 分布の語彙 (句読点つき・大文字まじり) を改行でつないだテキストで、
+--size-mb まで書いたファイルを一時ディレクトリに作る。比べるのは
+
+- notebook: 問5 と同じくファイルを丸ごと読んで tokenize() し Counter を作る (--naive-mb までの先頭部分だけ)
+- stream: word_stats() を --workers の各値で実行する (1 はプロセスプールなし)
+
+メモリは各設定を別プロセスで実行して、最大RSS (ワーカープロセスは一番大きかったもの) を比べる。
+
+    python bench_word_stats.py --size-mb 2048 --workers 1 2 4
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import string
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import word_stats
+
+BLOCK_SIZE = 16 * 1024 * 1024
+
+
+def make_vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        length = min(12, max(1, int(rng.gauss(5, 2.5))))
+        words.add("".join(rng.choice(string.ascii_lowercase) for _ in range(length)))
+    return sorted(words)
+
+
+def make_block(vocabulary, cum_weights, rng, size=BLOCK_SIZE):
+    """size バイトほどのテキスト。ときどき大文字・句読点・改行を混ぜる"""
+    words = rng.choices(vocabulary, cum_weights=cum_weights, k=size // 6)
+    for i in range(0, len(words), 7):
+        words[i] = words[i].capitalize()
+    for i in range(3, len(words), 11):
+        words[i] += rng.choice(",.;:!?")
+    lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def write_corpus(path, size_mb, seed=0, distinct_blocks=8):
+    """size_mb MB のコーパスを書く。作るのに時間がかかるので、distinct_blocks 個のブロックを順番を変えて並べる"""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(50_000, rng)
+    cum_weights = []
+    total = 0.0
+    for rank in range(1, len(vocabulary) + 1):
+        total += 1 / rank
+        cum_weights.append(total)
+    blocks = [make_block(vocabulary, cum_weights, rng) for _ in range(distinct_blocks)]
+    written = 0
+    with open(path, "wb") as f:
+        while written < size_mb * 1024 * 1024:
+            block = rng.choice(blocks)
+            f.write(block)
+            written += len(block)
+    return written
+
+
+def peak_rss_mb():
+    """このプロセスの最大RSS。ru_maxrss は exec の前 (コーパスを作った親) の値を引き継ぐので VmHWM を読む"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_config(path, mode, workers, naive_mb):
+    """このプロセスで1つの設定を実行し、結果を JSON で出力する (--run から呼ばれる)"""
+    started = time.perf_counter()
+    if mode == "notebook":
+        with open(path, "rb") as f:
+            text = f.read(naive_mb * 1024 * 1024).decode("utf-8", errors="replace")
+        size = len(text.encode("utf-8"))
+        words = word_stats.tokenize(text)
+        counts = Counter(words)
+        total_words, distinct = len(words), len(counts)
+    else:
+        size = os.path.getsize(path)
+        stats = word_stats.word_stats(path, workers, targets=[1, 2, 5, 6, 8, 9, 16, 10 ** 8])
+        total_words, distinct = stats.total_words, len(stats.counts)
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "size": size, "elapsed": elapsed, "words": total_words, "distinct": distinct,
+        "rss_mb": peak_rss_mb(),
+        "children_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }))
+
+
+def measure(path, mode, workers, naive_mb):
+    out = subprocess.run(
+        [sys.executable, __file__, "--run", path, mode, str(workers), str(naive_mb)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    result = json.loads(out.splitlines()[-1])
+    label = "notebook (丸ごと読む)" if mode == "notebook" else f"stream workers={workers}"
+    rss = f"RSS {result['rss_mb']:7.0f} MiB"
+    if result["children_rss_mb"]:
+        rss += f" (ワーカー {result['children_rss_mb']:.0f} MiB)"
+    print(f"{label:<22} {result['size'] / 1e6:>8,.0f} MB  {result['size'] / 1e6 / result['elapsed']:7.1f} MB/s  "
+          f"{result['words']:>13,}語 (異なり {result['distinct']:,})  {rss}")
+    return result
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--run":
+        path, mode, workers, naive_mb = sys.argv[2:6]
+        run_config(path, mode, int(workers), int(naive_mb))
+        return
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--naive-mb", type=int, default=128, help="丸ごと読む場合に使う先頭部分の大きさ")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--corpus", help="既存のテキストファイルを使う (指定しなければ合成する)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.corpus
+        if path is None:
+            path = os.path.join(tmp, "corpus.txt")
+            started = time.perf_counter()
+            written = write_corpus(path, args.size_mb)
+            print(f"コーパス {written / 1e6:,.0f} MB を作成 ({time.perf_counter() - started:.1f}秒)")
+        print(f"CPU {os.cpu_count()}個")
+        measure(path, "notebook", 1, args.naive_mb)
+        results = [measure(path, "stream", workers, args.naive_mb) for workers in args.workers]
+        assert len({(r["words"], r["distinct"]) for r in results}) == 1, "workers によって結果が違う"
+
+
+if __name__ == "__main__":
+    main()
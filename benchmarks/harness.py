@@ -0,0 +1,165 @@
+"""ベンチマークを登録・実行し、保存したベースラインと比べる小さなハーネス
+
+    @benchmark("calc/format_number", ops=1000)
+    def bench_format(workdir):
+        values = [...]            # 準備 (時間に含めない)
+        def run():                # 1回の呼び出しで ops 回分の処理をする
+            for v in values:
+                format_number(v)
+        return run
+
+- 時間: 1回だけ空回ししたあと、min_time 秒経つまで (少なくとも min_rounds 回) run() を呼び、
+  1回ごとの時間を ops で割って1操作あたりのレイテンシにする。p50/p99 はその分布から求める
+- メモリ: 時間とは別に、tracemalloc をつけて run() を1回呼んだときのピーク
+- 回帰の判定: p50 がベースラインより threshold (割合) を超えて遅くなったら回帰とする。
+  平均や ops/s より外れ値に強いので、p50 で比べる
+"""
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+
+BENCHMARKS = []
+
+Benchmark = namedtuple("Benchmark", "name setup ops threshold")
+Result = namedtuple("Result", "name ops_per_sec p50_us p99_us peak_kib rounds")
+
+
+class SkipBenchmark(Exception):
+    """必要なライブラリがないなど、このベンチマークを実行できないときに setup から投げる"""
+
+
+def benchmark(name, ops=1, threshold=None):
+    """setup(workdir) -> run を登録するデコレーター。threshold で判定の許容幅を個別に変えられる"""
+    def register(setup):
+        BENCHMARKS.append(Benchmark(name, setup, ops, threshold))
+        return setup
+    return register
+
+
+def percentile(sorted_values, q):
+    """最近傍法のパーセンタイル (q は 0〜100)"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def measure(bench, run, min_time=0.5, min_rounds=5, max_rounds=10_000):
+    run()  # 空回し (キャッシュやコネクションを温める)
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_rounds:
+        t0 = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - t0)
+        if len(samples) >= min_rounds and time.perf_counter() - started >= min_time:
+            break
+    per_op = sorted(s / bench.ops for s in samples)
+
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return Result(
+        bench.name,
+        ops_per_sec=bench.ops * len(samples) / sum(samples),
+        p50_us=statistics.median(per_op) * 1e6,
+        p99_us=percentile(per_op, 99) * 1e6,
+        peak_kib=peak / 1024,
+        rounds=len(samples),
+    )
+
+
+def run_benchmarks(workdir, selected=None, min_time=0.5, on_result=None, exact=False):
+    """登録済みのベンチマークを実行して {name: Result} を返す。実行できないものは飛ばす
+
+    selected は名前の一部 (exact=True なら名前そのもの) のリスト。
+    """
+    results = {}
+    for bench in BENCHMARKS:
+        if exact and bench.name not in selected:
+            continue
+        if selected and not any(pattern in bench.name for pattern in selected):
+            continue
+        try:
+            run = bench.setup(workdir)
+        except SkipBenchmark as e:
+            print(f"skip {bench.name}: {e}", file=sys.stderr)
+            continue
+        try:
+            results[bench.name] = measure(bench, run, min_time)
+        finally:
+            close = getattr(run, "close", None)
+            if close is not None:
+                close()
+        if on_result is not None:
+            on_result(results[bench.name])
+    return results
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_results(path, results, previous=None):
+    """結果をJSONに書く。previous (読み込んだベースライン) があれば、今回測っていないものは残す"""
+    benchmarks = dict(previous["benchmarks"]) if previous else {}
+    for name, result in results.items():
+        benchmarks[name] = {
+            "ops_per_sec": round(result.ops_per_sec, 1),
+            "p50_us": round(result.p50_us, 3),
+            "p99_us": round(result.p99_us, 3),
+            "peak_kib": round(result.peak_kib, 1),
+        }
+    data = {
+        "environment": environment(),
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "benchmarks": dict(sorted(benchmarks.items())),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def compare(results, baseline, threshold):
+    """(name, 変化率, 回帰か) のリストを返す。変化率は p50 の (今回 / ベースライン - 1)"""
+    thresholds = {bench.name: bench.threshold for bench in BENCHMARKS}
+    recorded = baseline["benchmarks"] if baseline else {}
+    rows = []
+    for name, result in results.items():
+        base = recorded.get(name)
+        if not base or not base["p50_us"]:
+            rows.append((name, None, False))
+            continue
+        change = result.p50_us / base["p50_us"] - 1
+        limit = thresholds.get(name) or threshold
+        rows.append((name, change, change > limit))
+    return rows
+
+
+def format_result(result):
+    return (f"{result.name:<36} {result.ops_per_sec:>14,.0f} {result.p50_us:>12.2f} "
+            f"{result.p99_us:>12.2f} {result.peak_kib:>12,.1f}")
+
+
+REPORT_HEADER = f"{'benchmark':<36} {'ops/s':>14} {'p50(us)':>12} {'p99(us)':>12} {'peak(KiB)':>12}"
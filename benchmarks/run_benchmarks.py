@@ -0,0 +1,422 @@
+"""リポジトリ全体のベンチマーク (オフラインで動く)
+
+電卓・天気アプリのDB処理・GitHubスクレイパーの解析・演習のアルゴリズムの主な処理を測り、
+ops/s, p50/p99 レイテンシ, ピークメモリを表にする。入力はリポジトリにある fixtures
+(気象庁の forecast/area JSON、GitHubの一覧ページを模した合成HTML) と、一時ディレクトリに作る合成DB。
+
+    python benchmarks/run_benchmarks.py                    # 測って baseline.json と比べる
+    python benchmarks/run_benchmarks.py --filter weather/  # 名前に weather/ を含むものだけ
+    python benchmarks/run_benchmarks.py --update-baseline  # 今回の結果をベースラインにする
+
+p50 がベースラインより --threshold (既定30%) を超えて遅くなったものがあれば終了コード1で終わる。
+ベースラインの値はマシンに依存するので、別のマシンで比べるときは先に --update-baseline する
+(ベースラインは3回測った中央の値を記録する)。
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+
+from harness import (
+    REPORT_HEADER, SkipBenchmark, benchmark, compare, format_result, load_baseline, run_benchmarks,
+    save_results,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CALCULATOR_DIR = os.path.join(ROOT, "calculator", "src")
+WEATHER_DIR = os.path.join(ROOT, "lecture-4")
+GITHUB_DIR = os.path.join(ROOT, "lecture-1", "assignment")
+COMMON_DIR = os.path.join(ROOT, "lecture-common", "src")
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# lecture-common は pip install -e していなくても読めるようにする
+for path in (CALCULATOR_DIR, WEATHER_DIR, GITHUB_DIR, COMMON_DIR, ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def require(module_name):
+    """任意の依存ライブラリを読み込む。なければそのベンチマークは飛ばす"""
+    try:
+        return __import__(module_name)
+    except ImportError as e:
+        raise SkipBenchmark(f"{module_name} がありません ({e})") from None
+
+
+def load_json_fixture(name):
+    with open(os.path.join(WEATHER_DIR, "fixtures", name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_org_pages():
+    from github_stub import FIXTURE_ORG, fixture_path
+    pages = []
+    for page in range(1, 4):
+        with open(fixture_path(page), encoding="utf-8") as f:
+            pages.append(f.read())
+    return FIXTURE_ORG, pages
+
+
+# --- 電卓 ---
+CALC_OPERATORS = ["+", "-", "*", "/", "^"]
+
+
+def calc_workload(count=1000):
+    rng = random.Random(0)
+    return [
+        (round(rng.uniform(-100, 100), 2), round(rng.uniform(-5, 5), 1), rng.choice(CALC_OPERATORS))
+        for _ in range(count)
+    ]
+
+
+@benchmark("calc/press_keys", ops=1000)
+def bench_press_keys(workdir):
+    """1000件の a op b = をキー入力として CalculatorApp.press に渡す (描画はしない)"""
+    require("flet")
+    from calc import CalculatorApp
+    app = CalculatorApp()
+    keys = []
+    for a, b, op in calc_workload():
+        keys += [*str(abs(a)), op, *str(abs(b)), "="]
+
+    def run():
+        for key in keys:
+            app.press(key)
+    return run
+
+
+@benchmark("calc/format_number", ops=1000)
+def bench_format_number(workdir):
+    from calc_engine import format_number
+    values = [a / (b or 1) for a, b, _ in calc_workload()]
+
+    def run():
+        for value in values:
+            format_number(value)
+    return run
+
+
+@benchmark("calc/evaluate_to_display", ops=1000)
+def bench_evaluate_to_display(workdir):
+    from calc_engine import evaluate_to_display
+    texts = [f"{a} {op} ({b})" for a, b, op in calc_workload()]
+
+    def run():
+        for text in texts:
+            evaluate_to_display(text)
+    return run
+
+
+@benchmark("calc/compile_uncached", ops=100)
+def bench_compile_uncached(workdir):
+    from calc_engine import compile_expression
+    texts = [f"(a + {i}) * 2 ^ 3 - sin(30) / (b + 1)" for i in range(100)]
+
+    def run():
+        compile_expression.cache_clear()
+        for text in texts:
+            compile_expression(text)
+    return run
+
+
+# --- 天気アプリ (weather-v2 のDB処理) ---
+def weather_repository(workdir, name):
+    from weather_db import WeatherRepository
+    repo = WeatherRepository(os.path.join(workdir, name))
+    repo.init_schema()
+    return repo
+
+
+@benchmark("weather/click_save_get", ops=100)
+def bench_click_save_get(workdir):
+    """エリアをクリックしたときの save_forecast + get_forecast"""
+    repo = weather_repository(workdir, "click.db")
+    times = [f"2026-01-{d:02d}T17:00:00+09:00" for d in (1, 2, 3)]
+    weathers = ["晴れ　時々　くもり", "くもり　夜　雨", "雨　後　晴れ"]
+    codes = [f"{i % 58 + 1:02d}0000" for i in range(100)]
+
+    def run():
+        for code in codes:
+            repo.save_forecast(code, times, weathers)
+            repo.get_forecast(code)
+    run.close = repo.close
+    return run
+
+
+@benchmark("weather/get_areas", ops=10)
+def bench_get_areas(workdir):
+    repo = weather_repository(workdir, "areas.db")
+    repo.save_areas(load_json_fixture("area.json"))
+
+    def run():
+        for _ in range(10):
+            repo.get_areas()
+    run.close = repo.close
+    return run
+
+
+@benchmark("weather/ingest_forecast", ops=10)
+def bench_ingest_forecast(workdir):
+    repo = weather_repository(workdir, "ingest.db")
+    data = load_json_fixture("forecast_130000.json")
+    codes = [f"{i:02d}0000" for i in range(1, 11)]
+
+    def run():
+        repo.ingest_forecasts([(code, data) for code in codes])
+    run.close = repo.close
+    return run
+
+
+@benchmark("weather/extract_weathers", ops=1000)
+def bench_extract_weathers(workdir):
+    from forecast_cache import extract_weathers
+    data = load_json_fixture("forecast_130000.json")
+
+    def run():
+        for _ in range(1000):
+            extract_weathers(data)
+    return run
+
+
+@benchmark("weather/trace_span_disabled", ops=10_000)
+def bench_trace_span_disabled(workdir):
+    """計測を無効にしたままの tracer.span の負荷 (呼び出し箇所に残しておけるか)"""
+    from lecture_common.tracing import Tracer
+    tracer = Tracer()
+
+    def run():
+        for _ in range(10_000):
+            with tracer.span("weather.fetch", area="130000"):
+                pass
+    return run
+
+
+# --- GitHubスクレイパー ---
+@benchmark("github/extract_fast", ops=3)
+def bench_extract_fast(workdir):
+    from github_extract import extract_repos_fast
+    org, pages = load_org_pages()
+
+    def run():
+        for html in pages:
+            extract_repos_fast(html, org)
+    return run
+
+
+@benchmark("github/extract_bs4", ops=3)
+def bench_extract_bs4(workdir):
+    require("bs4")
+    from github_extract import extract_repos_bs4
+    org, pages = load_org_pages()
+
+    def run():
+        for html in pages:
+            extract_repos_bs4(html, org)
+    return run
+
+
+@benchmark("github/scrape_stub", ops=1, threshold=1.0)
+def bench_scrape_stub(workdir):
+    """ローカルのスタブサーバーから3ページをスクレイピングする (通信を含むので許容幅を広くする)"""
+    require("requests")
+    from github_scraper import scrape_github_repos
+    from github_stub import FIXTURE_ORG, start_stub_server
+    server, base_url = start_stub_server()
+
+    def run():
+        # 最終ページの案内メッセージは表に混ざらないように捨てる
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in scrape_github_repos(FIXTURE_ORG, base_url, rate=1000.0, parse_workers=0):
+                pass
+
+    def close():
+        server.shutdown()
+        server.server_close()
+    run.close = close
+    return run
+
+
+@benchmark("github/stats_queries", ops=3)
+def bench_stats_queries(workdir):
+    """合成した10万件の repositories テーブルに対する集計クエリ"""
+    import github_stats
+    from github_scraper import CREATE_REPOSITORIES_SQL, INSERT_REPOSITORY_SQL
+    conn = sqlite3.connect(os.path.join(workdir, "github_repos.db"))
+    conn.execute(CREATE_REPOSITORIES_SQL)
+    github_stats.init_analytics(conn)
+    rng = random.Random(0)
+    languages = ["Python", "Go", "Rust", "TypeScript", "Java", "C++", "N/A"]
+    conn.executemany(INSERT_REPOSITORY_SQL, (
+        (f"org{i % 97}/repo-{i:06d}", rng.choice(languages), int(rng.paretovariate(1.1)) - 1)
+        for i in range(100_000)
+    ))
+    conn.commit()
+
+    def run():
+        github_stats.language_summary(conn)
+        github_stats.top_repos(conn, "Python", k=10)
+        github_stats.median_stars(conn, "Go")
+    run.close = conn.close
+    return run
+
+
+@benchmark("github/columnar_summary", ops=3)
+def bench_columnar_summary(workdir):
+    """同じ10万件を列ごとのファイルに書き出し、memmap で開いて言語別の集計とトップKを求める"""
+    require("numpy")
+    import columnar
+    from github_scraper import CREATE_REPOSITORIES_SQL, INSERT_REPOSITORY_SQL
+    conn = sqlite3.connect(os.path.join(workdir, "columnar.db"))
+    conn.execute(CREATE_REPOSITORIES_SQL)
+    rng = random.Random(0)
+    languages = ["Python", "Go", "Rust", "TypeScript", "Java", "C++", None]
+    conn.executemany(INSERT_REPOSITORY_SQL, (
+        (f"org{i % 97}/repo-{i:06d}", rng.choice(languages), int(rng.paretovariate(1.1)) - 1)
+        for i in range(100_000)
+    ))
+    columnar.export_table(conn, "repositories", os.path.join(workdir, "columns"))
+    conn.close()
+    table = columnar.open_table("repositories", os.path.join(workdir, "columns"))
+
+    def run():
+        columnar.language_summary(table)
+        columnar.top_repos(table, "Python", k=10)
+    return run
+
+
+# --- 演習のアルゴリズム ---
+@benchmark("exercise/nabeatsu_per_call", ops=10_000)
+def bench_nabeatsu_per_call(workdir):
+    from nabeatsu import nabeatsu
+
+    def run():
+        for n in range(1, 10_001):
+            nabeatsu(n)
+    return run
+
+
+@benchmark("exercise/nabeatsu_count_range_1e7", ops=1)
+def bench_nabeatsu_count_range(workdir):
+    require("numpy")
+    from nabeatsu import count_range
+
+    def run():
+        count_range(1, 10 ** 7 + 1)
+    return run
+
+
+@benchmark("exercise/combination_sum", ops=1)
+def bench_combination_sum(workdir):
+    from combination_sum import combination_sum
+
+    def run():
+        combination_sum([2, 3, 5], 60)
+    return run
+
+
+@benchmark("exercise/count_combinations", ops=1)
+def bench_count_combinations(workdir):
+    from combination_sum import count_combinations
+
+    def run():
+        count_combinations([2, 3, 5, 7, 11], 5000)
+    return run
+
+
+@benchmark("exercise/bracket_check_1mb", ops=1)
+def bench_bracket_check(workdir):
+    from bracket_checker import check_bytes
+    line = b"<li>{{ items[3]['name'] }} ({{ fmt(items[7]['price'], {'unit': 'yen'}) }})</li>\n"
+    data = line * (1_000_000 // len(line))
+
+    def run():
+        check_bytes(data)
+    return run
+
+
+@benchmark("exercise/word_stats_8mb", ops=1)
+def bench_word_stats(workdir):
+    from word_stats import word_stats
+    rng = random.Random(0)
+    vocabulary = [f"word{i}" for i in range(5000)]
+    words = rng.choices(vocabulary, weights=[1 / rank for rank in range(1, 5001)], k=200_000)
+    line = " ".join(words).replace("word1 ", "Word1, ") + "\n"
+    path = os.path.join(workdir, "corpus.txt")
+    with open(path, "w") as f:
+        f.write(line * (8_000_000 // len(line)))
+
+    def run():
+        word_stats(path, targets=[1, 2, 5, 6, 8, 9, 16])
+    return run
+
+
+def median_result(results):
+    return sorted(results, key=lambda result: result.p50_us)[(len(results) - 1) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filter", nargs="*", default=None, help="名前にこの文字列を含むものだけ実行する")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.3, help="p50 がこの割合を超えて遅くなったら回帰")
+    parser.add_argument("--min-time", type=float, default=0.5, help="1つのベンチマークを測る最短の秒数")
+    parser.add_argument("--update-baseline", action="store_true", help="今回の結果をベースラインに書き込む")
+    parser.add_argument("--repeat", type=int, default=1, help="全体を何回測るか (p50 が中央の回を採る)")
+    parser.add_argument("--retries", type=int, default=2, help="回帰に見えたものを測り直す回数")
+    parser.add_argument("--output", help="今回の結果を書き出すJSONファイル")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    # ベースラインは一度の測定の揺れを持ち込まないよう、何回か測って p50 が中央のものを記録する
+    repeat = max(args.repeat, 3) if args.update_baseline else args.repeat
+    print(REPORT_HEADER)
+    with tempfile.TemporaryDirectory() as workdir:
+        runs = [
+            run_benchmarks(workdir, args.filter, args.min_time,
+                           on_result=lambda result: print(format_result(result), flush=True))
+            for _ in range(repeat)
+        ]
+        results = {name: median_result([r[name] for r in runs]) for name in runs[0]}
+        # 他のプロセスの影響で一度だけ遅くなることがあるので、回帰に見えたものは測り直して速い方を採る
+        for _ in range(args.retries if baseline and not args.update_baseline else 0):
+            suspects = [name for name, _, regressed in compare(results, baseline, args.threshold) if regressed]
+            if not suspects:
+                break
+            print(f"測り直し: {', '.join(suspects)}")
+            for name, result in run_benchmarks(workdir, suspects, args.min_time, exact=True).items():
+                print(format_result(result), flush=True)
+                if result.p50_us < results[name].p50_us:
+                    results[name] = result
+
+    if args.output:
+        save_results(args.output, results)
+    if args.update_baseline:
+        save_results(args.baseline, results, baseline)
+        print(f"ベースラインを更新しました: {args.baseline}")
+        return
+    if baseline is None:
+        print("ベースラインがないので比較しません (--update-baseline で作成)")
+        return
+
+    regressions = []
+    print(f"\nベースライン ({baseline['recorded_at']}) との比較 (p50):")
+    for name, change, regressed in compare(results, baseline, args.threshold):
+        if change is None:
+            print(f"  {name:<36} (ベースラインなし)")
+            continue
+        mark = "  回帰" if regressed else ""
+        print(f"  {name:<36} {change:+8.1%}{mark}")
+        if regressed:
+            regressions.append(name)
+    if regressions:
+        print(f"{len(regressions)}件が許容幅を超えて遅くなりました: {', '.join(regressions)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
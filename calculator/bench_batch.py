@@ -0,0 +1,64 @@
+"""calc_batch の一括評価と、1件ずつ計算して format_number するPythonのループを比べる
+
+    python bench_batch.py --count 1000000
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import numpy as np  # noqa: E402
+
+from calc_batch import evaluate_batch  # noqa: E402
+from calc_engine import format_number  # noqa: E402
+
+
+def report(label, count, elapsed):
+    print(f"{label:<34} {elapsed * 1000:9.1f}ms  {count / elapsed:>14,.0f} values/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    a = rng.uniform(-100, 100, args.count)
+    b = rng.uniform(-3, 3, args.count)
+    b[::1000] = 0  # 0除算も混ぜる
+
+    # a / b ^ 2 の二項演算を2回
+    t0 = time.perf_counter()
+    loop = []
+    for x, y in zip(a.tolist(), b.tolist()):
+        loop.append("Error" if y == 0 else format_number(math.pow(x / y, 2)))
+    report("loop: (a/b)^2", args.count, time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    result = evaluate_batch("(a / b) ^ 2", a=a, b=b)
+    report("batch: (a / b) ^ 2", args.count, time.perf_counter() - t0)
+    print(f"  Error: loop={loop.count('Error')} batch={int(result.errors.sum())}")
+
+    # 科学計算: sin と log10
+    t0 = time.perf_counter()
+    for x in a.tolist():
+        format_number(math.sin(math.radians(x)))
+        if x > 0:
+            format_number(math.log10(x))
+    report("loop: sin(a), log10(a)", args.count, time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    evaluate_batch("sin(a)", a=a)
+    evaluate_batch("log10(a)", a=a)
+    report("batch: sin(a), log10(a)", args.count, time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    result.to_display()
+    report("batch: to_display (formatting)", args.count, time.perf_counter() - t0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""式エンジンと、Pythonの演算を直接呼ぶ場合 (以前の CalculatorApp.calculate 相当) の処理速度を比べる
+
+    python bench_engine.py --count 1000000
+"""
+import argparse
+import math
+import operator
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from calc_engine import compile_expression, evaluate_to_display, format_number  # noqa: E402
+
+OPERATORS = ["+", "-", "*", "/", "^"]
+PYTHON_OPERATORS = {"+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.truediv, "^": math.pow}
+
+
+def make_workload(count, distinct):
+    """(operand1, operand2, operator) の組を count 件作る。種類は distinct 通り"""
+    rng = random.Random(0)
+    pool = [
+        (round(rng.uniform(-100, 100), 2), round(rng.uniform(-5, 5), 1), rng.choice(OPERATORS))
+        for _ in range(distinct)
+    ]
+    return [pool[rng.randrange(distinct)] for _ in range(count)]
+
+
+def report(label, count, elapsed):
+    print(f"{label:<36} {count / elapsed:>12,.0f} ops/s  ({elapsed * 1e9 / count:8.1f} ns/op)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=1000, help="式の種類数 (キャッシュの効き方が変わる)")
+    args = parser.parse_args()
+
+    workload = make_workload(args.count, args.distinct)
+
+    t0 = time.perf_counter()
+    for a, b, op in workload:
+        try:
+            format_number(PYTHON_OPERATORS[op](a, b))
+        except (ZeroDivisionError, ValueError, OverflowError):
+            pass
+    report("python: operator + format_number", args.count, time.perf_counter() - t0)
+
+    texts = [f"{a} {op} ({b})" for a, b, op in workload]
+    t0 = time.perf_counter()
+    for text in texts:
+        evaluate_to_display(text)
+    report("engine: text (cached compile)", args.count, time.perf_counter() - t0)
+
+    compiled = {op: compile_expression(f"a {op} b") for op in OPERATORS}
+    t0 = time.perf_counter()
+    for a, b, op in workload:
+        try:
+            format_number(compiled[op](a, b))
+        except ValueError:
+            pass
+    report("engine: precompiled a op b", args.count, time.perf_counter() - t0)
+
+    expr = compile_expression("(a + b) * 2 ^ 3 - sin(30) / (1 + 1)")
+    t0 = time.perf_counter()
+    for a, b, _ in workload:
+        expr(a, b)
+    report("engine: precompiled compound expr", args.count, time.perf_counter() - t0)
+    print(f"  folded source: {expr.source}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""計算履歴の書き込みスループットと、画面のスレッドが書き込みで止まらないことを確かめる
+
+- 非同期: HistoryStore.record() (キューに積むだけ) の1回あたりの時間と、DBに書き終わるまでの件数/秒
+- 同期: 画面のスレッドで1件ごとに INSERT + COMMIT した場合
+- 電卓の操作: 履歴ありで CalculatorApp にキーを流したときの1操作の遅延 (履歴なしと比べる)
+- メモ: べき乗・三角関数・対数を含む式の結果をLRUで覚える場合と、毎回計算する場合
+
+    python bench_history.py --records 200000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import calc_engine  # noqa: E402
+from calc import CalculatorApp  # noqa: E402
+from calc_history import HISTORY_SCHEMA, INSERT_HISTORY_SQL, HistoryStore  # noqa: E402
+
+
+def latency_report(label, latencies, total=None):
+    ordered = sorted(latencies)
+    line = (f"{label:<28} p50={statistics.median(ordered) * 1e6:8.2f}us  "
+            f"p99={ordered[int(len(ordered) * 0.99)] * 1e6:8.2f}us  max={ordered[-1] * 1e6:9.1f}us")
+    if total is not None:
+        line += f"  {len(ordered) / total:>10,.0f} 件/s"
+    print(line)
+
+
+def make_entries(count):
+    rng = random.Random(0)
+    entries = []
+    for _ in range(count):
+        a, b = rng.randint(0, 9999), rng.randint(1, 99)
+        op = rng.choice("+-*/")
+        entries.append((f"{a} {op} {b}", calc_engine.evaluate_to_display(f"{a} {op} {b}")))
+    return entries
+
+
+def bench_async(path, entries):
+    store = HistoryStore(path)
+    latencies = []
+    t0 = time.perf_counter()
+    for expression, result in entries:
+        s = time.perf_counter()
+        store.record(expression, result)
+        latencies.append(time.perf_counter() - s)
+    queued = time.perf_counter() - t0
+    store.flush()
+    total = time.perf_counter() - t0
+    latency_report("async record()", latencies, queued)
+    print(f"{'':<28} DBに書き終わるまで {total:.2f}秒 ({len(entries) / total:,.0f} 件/s, "
+          f"COMMIT {store.stats['batches']}回, 最大 {store.stats['max_batch']}件/回)")
+    t0 = time.perf_counter()
+    found = store.search("12", 20)
+    print(f"{'':<28} 前方一致検索 '12': {len(found)}件 {(time.perf_counter() - t0) * 1000:.2f}ms")
+    store.close()
+
+
+def bench_sync(path, entries):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    for sql in HISTORY_SCHEMA:
+        conn.execute(sql)
+    latencies = []
+    t0 = time.perf_counter()
+    for expression, result in entries:
+        s = time.perf_counter()
+        conn.execute(INSERT_HISTORY_SQL, (time.time(), expression, result))
+        conn.commit()
+        latencies.append(time.perf_counter() - s)
+    latency_report("sync INSERT+COMMIT", latencies, time.perf_counter() - t0)
+    conn.close()
+
+
+def bench_app(path, entries):
+    """キーを1つずつ押して = まで計算する。履歴ありでも1操作の遅延が変わらないか"""
+    keys = []
+    for expression, _ in entries:
+        for token in expression.split():
+            keys += list(token) if token[0].isdigit() else [token]
+        keys.append("=")
+    for label, history in (("app keys (履歴なし)", None), ("app keys (履歴あり)", HistoryStore(path))):
+        app = CalculatorApp(history=history)
+        latencies = []
+        t0 = time.perf_counter()
+        for key in keys:
+            s = time.perf_counter()
+            app.press_keys([key])
+            latencies.append(time.perf_counter() - s)
+        latency_report(label, latencies, time.perf_counter() - t0)
+        if history is not None:
+            history.close()
+
+
+def bench_memo(count):
+    """変数を含む式を、xの種類を200に限って評価する (電卓で同じ値を何度も試す場面)"""
+    text = "x ^ 2.5 + sin(x) + ln(x) + log10(x)"
+    rng = random.Random(0)
+    xs = [float(rng.randint(1, 200)) for _ in range(count)]
+    memo = calc_engine.compile_expression.__wrapped__(text)
+    raw = memo._fn.__wrapped__
+    for label, fn in (("memo なし", raw), ("memo (LRU)", memo._fn)):
+        t0 = time.perf_counter()
+        for x in xs:
+            fn(x)
+        elapsed = time.perf_counter() - t0
+        print(f"{label:<28} {count / elapsed:>12,.0f} evals/s  (xの種類 200)")
+    print(f"{'':<28} {memo.memo_info()}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--sync-records", type=int, default=5_000)
+    parser.add_argument("--app-expressions", type=int, default=5_000)
+    args = parser.parse_args()
+
+    entries = make_entries(args.records)
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_async(os.path.join(tmp, "async.db"), entries)
+        bench_sync(os.path.join(tmp, "sync.db"), entries[:args.sync_records])
+        bench_app(os.path.join(tmp, "app.db"), entries[:args.app_expressions])
+    bench_memo(args.records)
+
+
+if __name__ == "__main__":
+    main()
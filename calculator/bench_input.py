@@ -0,0 +1,88 @@
+"""記録したキー操作を画面なしで CalculatorApp に流し、イベント/秒と遅延・描画回数を比べる
+
+window=0 はキー1つごとに描画する場合 (従来の1クリック1描画)、それ以外は記録時刻で
+window 秒以内に続いたキーをまとめて1回で描画する場合。--session がなければ合成した操作列を使う。
+
+    python bench_input.py --events 20000 --windows 0 0.008 0.016 --render-cost 0.0005
+    python bench_input.py --session session.jsonl
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from calc import CalculatorApp  # noqa: E402
+from calc_input import KeyCoalescer, generate_session, load_session, replay  # noqa: E402
+
+
+def check_same_result(events):
+    """まとめて適用しても、1件ずつ適用した場合と表示が変わらないことを確かめる"""
+    one_by_one, batched = CalculatorApp(), CalculatorApp()
+    for event in events:
+        one_by_one.press_keys([event.key])
+    batched.press_keys([event.key for event in events])
+    assert (one_by_one.result.value, one_by_one.expression_text.value) == \
+        (batched.result.value, batched.expression_text.value)
+
+
+def headless_app(render_cost):
+    """画面なしの CalculatorApp。描画1回ごとに render_cost 秒かかるものとする"""
+    app = CalculatorApp()
+    render = app.render
+
+    def slow_render():
+        render()
+        if render_cost:
+            time.sleep(render_cost)  # 実際の描画 (クライアントへの送信) の代わり
+    app.render = slow_render
+    return app
+
+
+def concurrent_push(events, threads, render_cost):
+    """複数のスレッドから KeyCoalescer に push したとき、描画が何回にまとまるか"""
+    app = headless_app(render_cost)
+    coalescer = KeyCoalescer(app.press_keys)
+    keys = [e.key for e in events]
+    per_thread = len(keys) // threads
+
+    def worker(i):
+        # 記録と同じ順序は保証されないので、各スレッドは数字だけを送る
+        for key in keys[i * per_thread:(i + 1) * per_thread]:
+            coalescer.push(key if key.isdigit() else "1")
+
+    t0 = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - t0
+    stats = coalescer.stats
+    print(f"push x{threads}スレッド (描画 {render_cost * 1000:.1f}ms): {stats['events']:,}イベント -> "
+          f"描画 {stats['flushes']:,}回  {stats['events'] / elapsed:,.0f} events/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--session", help="CALC_RECORD で記録した JSON Lines")
+    parser.add_argument("--events", type=int, default=20_000, help="合成する操作列の長さ")
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 0.008, 0.016])
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--render-cost", type=float, default=0.0005, help="1回の描画にかかるとみなす秒数")
+    args = parser.parse_args()
+
+    events = load_session(args.session) if args.session else generate_session(args.events)
+    check_same_result(events[:5000])
+    print(f"{len(events):,}イベント")
+    for window in args.windows:
+        result = replay(headless_app(args.render_cost), events, window)
+        print(f"window={window * 1000:4.0f}ms  {result.events_per_sec:>10,.0f} events/s  "
+              f"p50={result.p50_us:7.1f}us  p99={result.p99_us:7.1f}us  描画 {result.renders:,}回")
+    concurrent_push(events, args.threads, args.render_cost)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
 import flet as ft
-import math
+import os
+
+from calc_engine import evaluate_to_display, format_number
+from calc_history import HISTORY_DB, HistoryStore
+from calc_input import KeyCoalescer, SessionRecorder, key_from_event
 
 # ...existing code...
 
@@ -42,12 +46,23 @@ class ScientificButton(CalcButton):
 
 
 class CalculatorApp(ft.Container):
-    def __init__(self):
+    def __init__(self, record_path=None, history=None):
         super().__init__()
+        self.history = history  # HistoryStore (Noneなら履歴を残さない)
         self.reset()
         self.scientific_mode = False  # 科学計算モードの初期状態
+        self.render_count = 0
+        # キーボードの連続入力は、描画中に届いた分をまとめて1回で適用・描画する
+        self.keys = KeyCoalescer(self.press_keys)
+        self.recorder = SessionRecorder(record_path) if record_path else None
 
         self.result = ft.Text(value="0", color=ft.Colors.WHITE, size=20)
+        # 入力途中の式 (例: "2 + 3 *") を結果の上に小さく表示する
+        self.expression_text = ft.Text(value="", color=ft.Colors.WHITE54, size=12)
+        if history is not None and history.recent(1):
+            # 前回の最後の計算を表示しておく
+            last_expression, last_result = history.recent(1)[0]
+            self.expression_text.value = f"{last_expression} = {last_result}"
         self.width = 350
         self.bgcolor = ft.Colors.BLACK
         self.border_radius = ft.border_radius.all(20)
@@ -72,6 +87,7 @@ class CalculatorApp(ft.Container):
         # メインのUI構築
         self.content = ft.Column(
             controls=[
+                ft.Row(controls=[self.expression_text], alignment="end"),
                 ft.Row(controls=[self.result], alignment="end"),
                 self.scientific_row,
                 ft.Row(
@@ -126,8 +142,30 @@ class CalculatorApp(ft.Container):
         self.update()
 
     def button_clicked(self, e):
-        data = e.control.data
-        print(f"Button clicked with data = {data}")
+        # ボタンもキーボードと同じ経路を通し、状態の更新が同時に走らないようにする
+        self.keys.push(e.control.data)
+
+    def on_keyboard(self, e: ft.KeyboardEvent):
+        key = key_from_event(e)
+        if key is not None:
+            self.keys.push(key)
+
+    def press_keys(self, keys):
+        """キーを順に適用して、最後に1回だけ描画する"""
+        for key in keys:
+            self.press(key)
+        self.render()
+
+    def render(self):
+        """変わるのは表示中の数と式だけなので、その2つのテキストだけを送る"""
+        self.render_count += 1
+        if self.page is not None:
+            self.page.update(self.result, self.expression_text)
+
+    def press(self, data):
+        """キー1つ分の状態の更新 (描画はしない)"""
+        if self.recorder is not None:
+            self.recorder.record(data)
         current_value = str(self.result.value)
 
         if current_value == "Error" or data == "AC":
@@ -139,113 +177,54 @@ class CalculatorApp(ft.Container):
             if current_value == "0" or self.new_operand == True:
                 self.result.value = data if data != "." else "0."
                 self.new_operand = False
+                self.operator_pending = False
             elif data == "." and "." in current_value:
                 pass  # 小数点が既にある場合は何もしない
             else:
                 self.result.value = current_value + data
 
-        # --- 通常の二項演算子 ---
+        # --- 二項演算子 (式に積んでおき、= で優先順位どおりに計算する) ---
         elif data in ("+", "-", "*", "/", "^"):
-            try:
-                # 前の計算結果をoperand1に格納し、演算子を更新
-                self.result.value = self.calculate(self.operand1, float(current_value), self.operator)
-                self.operator = data
-                if self.result.value == "Error":
-                    self.operand1 = 0
-                else:
-                    self.operand1 = float(self.result.value)
-                self.new_operand = True
-            except ValueError:
-                self.result.value = "Error"
-                self.reset()
+            if self.operator_pending:
+                # 演算子を続けて押した場合は置き換える
+                self.expression[-1] = data
+            else:
+                self.expression += [current_value, data]
+            self.new_operand = True
+            self.operator_pending = True
 
         # --- 単項演算子・特殊操作 ---
-        elif data in ("=", "%", "+/-"):
-            try:
-                current_num = float(current_value)
-                if data == "=":
-                    self.result.value = self.calculate(self.operand1, current_num, self.operator)
-                    self.reset()
-                elif data == "%":
-                    self.result.value = self.format_number(current_num / 100)
-                    self.reset()
-                elif data == "+/-":
-                    self.result.value = self.format_number(-current_num)
-                    # ACでリセットされることを防ぐため、リセットしない
-
-            except ValueError:
-                self.result.value = "Error"
-                self.reset()
-
-        # --- 科学計算 (単項演算) ---
+        elif data == "=":
+            self.result.value = self.evaluate(" ".join(self.expression + [current_value]))
+            self.reset()
+        elif data == "%":
+            self.result.value = self.evaluate(f"({current_value})%")
+            self.new_operand = True
+            self.operator_pending = False
+        elif data == "+/-":
+            # ACでリセットされることを防ぐため、リセットしない
+            self.result.value = self.evaluate(f"-({current_value})")
+            self.operator_pending = False
+
+        # --- 科学計算 (単項演算, 角度は度数法) ---
         elif data in ("sin", "cos", "tan", "ln", "log10"):
-            try:
-                current_num = float(current_value)
-                if data == "sin":
-                    # 入力は度数法として扱う（必要ならラジアンに変更）
-                    self.result.value = self.format_number(math.sin(math.radians(current_num)))
-                elif data == "cos":
-                    self.result.value = self.format_number(math.cos(math.radians(current_num)))
-                elif data == "tan":
-                    self.result.value = self.format_number(math.tan(math.radians(current_num)))
-                elif data == "ln":
-                    if current_num <= 0:
-                        self.result.value = "Error"
-                    else:
-                        self.result.value = self.format_number(math.log(current_num))  # 自然対数
-                elif data == "log10":
-                    if current_num <= 0:
-                        self.result.value = "Error"
-                    else:
-                        self.result.value = self.format_number(math.log10(current_num))
-
-                if self.result.value != "Error":
-                    self.operand1 = float(self.result.value)
-                self.new_operand = True
-
-            except ValueError:
-                self.result.value = "Error"
-
-        self.update()
-
-    def format_number(self, num):
-        if abs(num) < 1e-12:
-            num = 0.0
-
-        if num % 1 == 0:
-            return str(int(num))
-        else:
-            return f"{num:.10g}".rstrip('0').rstrip('.')
-
-    def calculate(self, operand1, operand2, operator):
+            self.result.value = self.evaluate(f"{data}({current_value})")
+            self.new_operand = True
+            self.operator_pending = False
 
-        if operator == "+":
-            return self.format_number(operand1 + operand2)
+        self.expression_text.value = " ".join(self.expression)
 
-        elif operator == "-":
-            return self.format_number(operand1 - operand2)
-
-        elif operator == "*":
-            return self.format_number(operand1 * operand2)
-
-        elif operator == "/":
-            if operand2 == 0:
-                return "Error"
-            else:
-                return self.format_number(operand1 / operand2)
-
-        elif operator == "^":
-            try:
-                return self.format_number(math.pow(operand1, operand2))
-            except (OverflowError, ValueError):
-                return "Error"
-
-        return self.format_number(operand2)  # 演算子がない場合はOperand2をそのまま返す
+    def evaluate(self, text):
+        """式を評価して表示用の文字列を返し、履歴に残す (書き込みは裏のスレッドで行う)"""
+        result = evaluate_to_display(text)
+        if self.history is not None:
+            self.history.record(text, result)
+        return result
 
     def reset(self):
-        self.operator = "+"
-        self.operand1 = 0
-        self.new_operand = True
+        self.expression = []
+        self.new_operand = True  # 次の数字キーで表示中の数を置き換えるか
+        self.operator_pending = False  # 最後に押したのが二項演算子か (続けて押すと置き換える)
 
 
 def main(page: ft.Page):
@@ -253,8 +232,21 @@ def main(page: ft.Page):
     # ウィンドウサイズの調整
     page.window_width = 380
     page.window_height = 650
-    page.add(CalculatorApp())
+    # CALC_RECORD にファイル名を指定すると、押したキーを記録する (calc_input.replay で再生できる)
+    # 計算履歴は CALC_HISTORY_DB (既定は calculator/calc_history.db) に残す
+    history = HistoryStore(os.environ.get("CALC_HISTORY_DB", HISTORY_DB))
+    app = CalculatorApp(record_path=os.environ.get("CALC_RECORD"), history=history)
+    page.on_keyboard_event = app.on_keyboard
+
+    def on_disconnect(e):
+        if app.recorder is not None:
+            app.recorder.close()
+        history.close()
+
+    page.on_disconnect = on_disconnect
+    page.add(app)
 
 
-ft.app(target=main)
+if __name__ == "__main__":
+    ft.app(target=main)
 
@@ -0,0 +1,115 @@
+"""calc_engine の式をNumPy配列・CSVの列にまとめて適用する
+
+    >>> import numpy as np
+    >>> r = evaluate_batch("ln(x) + 1", x=np.array([1.0, 0.0, -1.0]))
+    >>> r.to_display()
+    ['1', 'Error', 'Error']
+
+電卓と同じく、0除算や定義域外・オーバーフローになった要素は "Error" 扱いで、
+例外は投げずに errors マスクに True を立てる。
+
+    python calc_batch.py "price * (1 + tax%)" items.csv -o out.csv
+"""
+import argparse
+import csv
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from calc_engine import CalcError, fold, format_number, parse, to_source, variables
+
+_NUMPY_FUNCTIONS = {
+    "sin": lambda x: np.sin(np.radians(x)),
+    "cos": lambda x: np.cos(np.radians(x)),
+    "tan": lambda x: np.tan(np.radians(x)),
+    "ln": np.log,
+    "log10": np.log10,
+}
+# to_source() が出力する _pow / _sin などの名前を、NumPyの関数に結びつける
+_NAMESPACE = {"__builtins__": {}, "_pow": np.power}
+_NAMESPACE.update({f"_{name}": fn for name, fn in _NUMPY_FUNCTIONS.items()})
+
+
+class BatchResult(namedtuple("BatchResult", "values errors")):
+    """values: 計算結果 (float64配列) / errors: "Error" になった要素のマスク"""
+
+    def to_display(self):
+        values = np.atleast_1d(self.values).tolist()
+        errors = np.atleast_1d(self.errors).tolist()
+        return ["Error" if err else format_number(v) for v, err in zip(values, errors)]
+
+
+@lru_cache(maxsize=256)
+def compile_batch(text):
+    """式を配列用の関数にコンパイルする。(関数, 変数名のタプル) を返す"""
+    node = fold(parse(text))
+    names = tuple(sorted(variables(node)))
+    fn = eval(f"lambda {', '.join(names)}: {to_source(node)}", _NAMESPACE)
+    return fn, names
+
+
+def evaluate_batch(text, **columns):
+    """各変数に配列 (またはスカラー) を渡して式を一括評価する"""
+    fn, names = compile_batch(text)
+    missing = [n for n in names if n not in columns]
+    if missing:
+        raise CalcError(f"変数の値がありません: {', '.join(missing)}")
+    arrays = [np.asarray(columns[n], dtype=np.float64) for n in names]
+    with np.errstate(all="ignore"):
+        values = np.asarray(fn(*arrays), dtype=np.float64)
+    if arrays:
+        values = np.broadcast_to(values, np.broadcast_shapes(*(a.shape for a in arrays)))
+    # 0除算 (±inf)・定義域外 (nan)・オーバーフロー・入力の欠損をまとめてErrorにする
+    errors = ~np.isfinite(values)
+    return BatchResult(values, errors)
+
+
+def read_csv_columns(path, names):
+    """CSVから指定した列を読み、数値にできない値はnanにした配列を返す"""
+    columns = {name: [] for name in names}
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        absent = [n for n in names if n not in (reader.fieldnames or [])]
+        if absent:
+            raise CalcError(f"CSVに列がありません: {', '.join(absent)}")
+        for row in reader:
+            for name in names:
+                try:
+                    columns[name].append(float(row[name]))
+                except (TypeError, ValueError):
+                    columns[name].append(float("nan"))
+    return {name: np.array(values, dtype=np.float64) for name, values in columns.items()}
+
+
+def evaluate_csv(text, path, output=None, result_column="result"):
+    """CSVの列を変数として式を評価し、結果の列を足したCSVを書き出す"""
+    _, names = compile_batch(text)
+    result = evaluate_batch(text, **read_csv_columns(path, names))
+    if output is not None:
+        display = result.to_display()
+        with open(path, newline="", encoding="utf-8") as src, \
+                open(output, "w", newline="", encoding="utf-8") as dst:
+            reader = csv.DictReader(src)
+            writer = csv.DictWriter(dst, fieldnames=list(reader.fieldnames) + [result_column])
+            writer.writeheader()
+            for row, value in zip(reader, display):
+                row[result_column] = value
+                writer.writerow(row)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("expression")
+    parser.add_argument("csv_path")
+    parser.add_argument("-o", "--output")
+    parser.add_argument("--column", default="result", help="結果を書き込む列名")
+    args = parser.parse_args()
+
+    result = evaluate_csv(args.expression, args.csv_path, args.output, args.column)
+    print(f"{len(result.values)}行を計算しました (Error: {int(result.errors.sum())}行)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""電卓の式を評価するエンジン (Fletに依存しない)
+
+    >>> evaluate("2 + 3 * 4")
+    14.0
+    >>> evaluate_to_display("sin(30) + 2^-1")
+    '1'
+    >>> f = compile_expression("x * 2 + 1")
+    >>> f(x=3)
+    7.0
+
+処理の流れは 文字列 -> トークン列 -> AST (Prattパーサー) -> 定数畳み込み
+-> Pythonのコードオブジェクトにコンパイル で、コンパイル結果は式ごとにキャッシュする。
+三角関数の引数は電卓の画面と同じく度数法として扱う。
+定数だけの式はコンパイル時に値まで計算されるので、同じ式の2回目以降は計算もしない。
+変数を含み、べき乗・三角関数・対数を使う式は、同じ引数での結果を上限つきのLRU (MEMO_SIZE件) で覚えておく。
+"""
+import keyword
+import math
+from collections import namedtuple
+from functools import lru_cache
+
+
+class CalcError(ValueError):
+    """式の構文エラーや、0除算・定義域外などの計算エラー"""
+
+
+Token = namedtuple("Token", "kind value pos")
+
+# 単項関数: 名前 -> 実装
+FUNCTIONS = {
+    "sin": lambda x: math.sin(math.radians(x)),
+    "cos": lambda x: math.cos(math.radians(x)),
+    "tan": lambda x: math.tan(math.radians(x)),
+    "ln": math.log,
+    "log10": math.log10,
+}
+# 二項演算子: 記号 -> (左結合力, 右結合力)
+BINARY_OPERATORS = {
+    "+": (10, 11),
+    "-": (10, 11),
+    "*": (20, 21),
+    "/": (20, 21),
+    "^": (31, 30),  # 右結合
+}
+PREFIX_POWER = 25  # 単項マイナス: -2^2 = -4
+POSTFIX_POWER = 40  # パーセント: 50% = 0.5
+
+OPERATOR_CHARS = "+-*/^%()"
+MEMO_SIZE = 1024
+
+
+def tokenize(text):
+    tokens = []
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch.isspace():
+            i += 1
+        elif ch.isdigit() or ch == ".":
+            start = i
+            while i < n and (text[i].isdigit() or text[i] == "."):
+                i += 1
+            # 1e-05 のような指数表記 (format_numberが出力することがある)
+            if i < n and text[i] in "eE":
+                j = i + 1
+                if j < n and text[j] in "+-":
+                    j += 1
+                if j < n and text[j].isdigit():
+                    i = j
+                    while i < n and text[i].isdigit():
+                        i += 1
+            literal = text[start:i]
+            try:
+                tokens.append(Token("num", float(literal), start))
+            except ValueError:
+                raise CalcError(f"不正な数値です: {literal!r}") from None
+        elif ch.isalpha() or ch == "_":
+            start = i
+            while i < n and (text[i].isalnum() or text[i] == "_"):
+                i += 1
+            tokens.append(Token("name", text[start:i], start))
+        elif ch in OPERATOR_CHARS:
+            tokens.append(Token("op", ch, i))
+            i += 1
+        elif ch in "×÷":
+            tokens.append(Token("op", "*" if ch == "×" else "/", i))
+            i += 1
+        else:
+            raise CalcError(f"使えない文字です: {ch!r} (位置 {i})")
+    tokens.append(Token("end", None, n))
+    return tokens
+
+
+class Parser:
+    """Prattパーサー。ASTはタプルで表す
+
+    ("num", 値) / ("var", 名前) / ("neg", 式) / ("pct", 式)
+    ("call", 関数名, 式) / ("bin", 演算子, 左, 右)
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def next(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def expect(self, value):
+        token = self.next()
+        if token.value != value:
+            raise CalcError(f"{value!r} がありません (位置 {token.pos})")
+        return token
+
+    def parse(self):
+        node = self.expression(0)
+        token = self.peek()
+        if token.kind != "end":
+            raise CalcError(f"余分な入力があります: {token.value!r} (位置 {token.pos})")
+        return node
+
+    def expression(self, min_power):
+        left = self.prefix()
+        while True:
+            token = self.peek()
+            if token.kind != "op":
+                break
+            if token.value == "%":
+                if POSTFIX_POWER < min_power:
+                    break
+                self.next()
+                left = ("pct", left)
+                continue
+            powers = BINARY_OPERATORS.get(token.value)
+            if powers is None or powers[0] < min_power:
+                break
+            self.next()
+            right = self.expression(powers[1])
+            left = ("bin", token.value, left, right)
+        return left
+
+    def prefix(self):
+        token = self.next()
+        if token.kind == "num":
+            return ("num", token.value)
+        if token.kind == "name":
+            if token.value in FUNCTIONS:
+                # sin(30) と sin 30 の両方を受け付ける。括弧があれば引数は括弧の中だけで、
+                # 後ろの ^ や % は関数の結果にかかる (sin(30)^2 = 0.25)
+                if self.peek().value == "(":
+                    self.next()
+                    argument = self.expression(0)
+                    self.expect(")")
+                    return ("call", token.value, argument)
+                return ("call", token.value, self.expression(PREFIX_POWER))
+            if keyword.iskeyword(token.value) or token.value.startswith("_"):
+                raise CalcError(f"変数名に使えない名前です: {token.value!r}")
+            return ("var", token.value)
+        if token.value == "-":
+            return ("neg", self.expression(PREFIX_POWER))
+        if token.value == "+":
+            return self.expression(PREFIX_POWER)
+        if token.value == "(":
+            node = self.expression(0)
+            self.expect(")")
+            return node
+        if token.kind == "end":
+            raise CalcError("式が途中で終わっています")
+        raise CalcError(f"予期しない記号です: {token.value!r} (位置 {token.pos})")
+
+
+def parse(text):
+    return Parser(tokenize(text)).parse()
+
+
+def _apply_binary(op, a, b):
+    if op == "+":
+        return a + b
+    if op == "-":
+        return a - b
+    if op == "*":
+        return a * b
+    if op == "/":
+        return a / b
+    return math.pow(a, b)
+
+
+def _constant(value, node):
+    """畳み込んだ値が有限ならnum節に、そうでなければ元の節を残す"""
+    return ("num", value) if math.isfinite(value) else node
+
+
+def fold(node):
+    """定数だけの部分式を前もって計算する (計算エラーになる部分はそのまま残す)"""
+    kind = node[0]
+    if kind in ("num", "var"):
+        return node
+    try:
+        if kind == "bin":
+            left, right = fold(node[2]), fold(node[3])
+            if left[0] == "num" and right[0] == "num":
+                return _constant(_apply_binary(node[1], left[1], right[1]), node)
+            return ("bin", node[1], left, right)
+        inner = fold(node[-1])
+        if inner[0] == "num":
+            if kind == "neg":
+                return ("num", -inner[1])
+            if kind == "pct":
+                return ("num", inner[1] / 100)
+            return _constant(FUNCTIONS[node[1]](inner[1]), node)
+        return node[:-1] + (inner,)
+    except (ZeroDivisionError, ValueError, OverflowError):
+        return node
+
+
+def variables(node, found=None):
+    if found is None:
+        found = set()
+    if node[0] == "var":
+        found.add(node[1])
+    elif node[0] == "bin":
+        variables(node[2], found)
+        variables(node[3], found)
+    elif node[0] != "num":
+        variables(node[-1], found)
+    return found
+
+
+def is_expensive(node):
+    """べき乗か関数呼び出しを含むか (結果を覚えておく価値があるか)"""
+    kind = node[0]
+    if kind in ("num", "var"):
+        return False
+    if kind == "call" or (kind == "bin" and node[1] == "^"):
+        return True
+    if kind == "bin":
+        return is_expensive(node[2]) or is_expensive(node[3])
+    return is_expensive(node[-1])
+
+
+def to_source(node):
+    """ASTをPythonの式の文字列にする"""
+    kind = node[0]
+    if kind == "num":
+        return repr(node[1])
+    if kind == "var":
+        return node[1]
+    if kind == "neg":
+        return f"(-{to_source(node[1])})"
+    if kind == "pct":
+        return f"({to_source(node[1])} / 100.0)"
+    if kind == "call":
+        return f"_{node[1]}({to_source(node[2])})"
+    op, left, right = node[1], to_source(node[2]), to_source(node[3])
+    if op == "^":
+        return f"_pow({left}, {right})"
+    return f"({left} {op} {right})"
+
+
+class CompiledExpression:
+    """コンパイル済みの式。変数はキーワード引数か、variables の順の位置引数で渡す"""
+
+    __slots__ = ("text", "source", "variables", "_fn")
+
+    def __init__(self, text, node, namespace):
+        self.text = text
+        self.variables = tuple(sorted(variables(node)))
+        self.source = to_source(node)
+        params = ", ".join(self.variables)
+        self._fn = eval(f"lambda {params}: {self.source}", namespace)
+        if self.variables and is_expensive(node):
+            # 例外になった呼び出しは覚えないので、エラーの扱いは変わらない
+            self._fn = lru_cache(maxsize=MEMO_SIZE)(self._fn)
+
+    def memo_info(self):
+        """結果のメモの CacheInfo (メモしない式では None)"""
+        cache_info = getattr(self._fn, "cache_info", None)
+        return cache_info() if cache_info is not None else None
+
+    def __call__(self, *args, **values):
+        try:
+            result = self._fn(*args, **values)
+        except TypeError:
+            missing = [v for v in self.variables[len(args):] if v not in values]
+            raise CalcError(f"変数の値がありません: {', '.join(missing)}") from None
+        except (ZeroDivisionError, ValueError, OverflowError) as e:
+            raise CalcError(str(e)) from None
+        if isinstance(result, float) and not math.isfinite(result):
+            raise CalcError("計算結果が有限の値になりません")
+        return float(result)
+
+    def __repr__(self):
+        return f"CompiledExpression({self.text!r})"
+
+
+_NAMESPACE = {"__builtins__": {}, "_pow": math.pow}
+_NAMESPACE.update({f"_{name}": fn for name, fn in FUNCTIONS.items()})
+
+
+@lru_cache(maxsize=4096)
+def compile_expression(text):
+    """式を解析・最適化してコンパイルする。同じ文字列の2回目以降はキャッシュを返す"""
+    return CompiledExpression(text, fold(parse(text)), _NAMESPACE)
+
+
+def evaluate(text, **values):
+    return compile_expression(text)(**values)
+
+
+def format_number(num):
+    """電卓の画面に表示する形式の文字列にする"""
+    if abs(num) < 1e-12:
+        num = 0.0
+
+    if num % 1 == 0:
+        return str(int(num))
+    else:
+        # "g" 形式は末尾の0を付けないので、rstripすると 110.00000000000001 が "11" になってしまう
+        return f"{num:.10g}"
+
+
+def evaluate_to_display(text, **values):
+    """評価して表示用の文字列を返す。エラーのときは "Error" """
+    try:
+        return format_number(evaluate(text, **values))
+    except CalcError:
+        return "Error"
@@ -0,0 +1,200 @@
+"""電卓の計算履歴を SQLite に追記していくストア
+
+- record() は画面のスレッドから呼ばれるので、キューに積んで直近の履歴 (メモリ) を更新するだけで戻る。
+  DBへの書き込みは専用のスレッドが flush_interval 秒ぶん / batch_size 件ずつまとめて1回のCOMMITで行う
+- テーブルは追記のみ (UPDATE/DELETE はトリガーで拒否する)。式・結果にインデックスがあるので、
+  前方一致の検索は LIKE ではなくインデックスの範囲検索になる
+- 次回の起動時は、直近の履歴をDBから読み直して recent() で返す
+- 書き込みに失敗した (ディスクがいっぱい・DBがロックされている等) バッチはログに残して捨て、
+  書き込みスレッドはそのまま次のバッチに進む。失敗した件数は stats["dropped"] に数える
+
+    >>> store = HistoryStore(":memory:")
+    >>> store.record("2 + 3", "5")
+    >>> store.flush()
+    True
+    >>> store.search("2 +")
+    [('2 + 3', '5')]
+    >>> store.close()
+"""
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY_DB = os.path.join(BASE_DIR, "calc_history.db")
+
+HISTORY_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS history (
+        id INTEGER PRIMARY KEY,
+        created_at REAL NOT NULL,
+        expression TEXT NOT NULL,
+        result TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS history_expression ON history (expression)",
+    "CREATE INDEX IF NOT EXISTS history_result ON history (result)",
+    """
+    CREATE TRIGGER IF NOT EXISTS history_no_update BEFORE UPDATE ON history
+    BEGIN SELECT RAISE(ABORT, 'history is append-only'); END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS history_no_delete BEFORE DELETE ON history
+    BEGIN SELECT RAISE(ABORT, 'history is append-only'); END
+    """,
+)
+INSERT_HISTORY_SQL = "INSERT INTO history (created_at, expression, result) VALUES (?, ?, ?)"
+SELECT_RECENT_SQL = "SELECT created_at, expression, result FROM history ORDER BY id DESC LIMIT ?"
+# 前方一致を [prefix, 次の文字列) の範囲にして、インデックスで探す
+SEARCH_EXPRESSION_SQL = """
+    SELECT expression, result FROM history INDEXED BY history_expression
+    WHERE expression >= ? AND expression < ?
+    ORDER BY id DESC LIMIT ?
+"""
+SEARCH_RESULT_SQL = """
+    SELECT expression, result FROM history INDEXED BY history_result
+    WHERE result = ? ORDER BY id DESC LIMIT ?
+"""
+
+_CLOSE = object()
+FLUSH_TIMEOUT = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+def prefix_upper_bound(prefix):
+    """prefix で始まる文字列がすべて収まる範囲の上端 (prefix の最後の文字を1つ進めたもの)"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class HistoryStore:
+    def __init__(self, path=HISTORY_DB, batch_size=256, flush_interval=0.05, recent_size=100):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stats = {"recorded": 0, "written": 0, "batches": 0, "max_batch": 0, "dropped": 0}
+        if path == ":memory:":
+            # 書き込みスレッドと検索で同じメモリDBを見るため、共有キャッシュにする
+            self.path = f"file:calc_history_{id(self)}?mode=memory&cache=shared"
+        self._read = self._connect()
+        for sql in HISTORY_SCHEMA:
+            self._read.execute(sql)
+        self._read.commit()
+        self._recent = deque(
+            reversed(self._read.execute(SELECT_RECENT_SQL, (recent_size,)).fetchall()),
+            maxlen=recent_size,
+        )
+        self._lock = threading.Lock()  # 直近の履歴と stats 用
+        self._read_lock = threading.Lock()  # 検索用の接続用
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="calc-history", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, uri=self.path.startswith("file:"))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if "cache=shared" in self.path:
+            # 共有キャッシュでは書き込み中のテーブルを読むとロックエラーになるので、読む側は待たない
+            conn.execute("PRAGMA read_uncommitted=1")
+        return conn
+
+    # --- 画面のスレッドから呼ぶもの ---
+    def record(self, expression, result):
+        """1件追記する。キューに積むだけで、DBへの書き込みは待たない"""
+        if self._closed:
+            return
+        entry = (time.time(), expression, result)
+        self._queue.put(entry)
+        with self._lock:
+            self._recent.append(entry)
+            self.stats["recorded"] += 1
+
+    def recent(self, limit=20):
+        """新しい順の [(expression, result), ...]。書き込み前のものも含む"""
+        with self._lock:
+            entries = list(self._recent)[-limit:]
+        return [(expression, result) for _, expression, result in reversed(entries)]
+
+    def search(self, prefix, limit=20):
+        """式が prefix で始まる履歴 (書き込み済みのもの) を新しい順に返す"""
+        if not prefix:
+            return self.recent(limit)
+        with self._read_lock:
+            return self._read.execute(
+                SEARCH_EXPRESSION_SQL, (prefix, prefix_upper_bound(prefix), limit)
+            ).fetchall()
+
+    def search_result(self, result, limit=20):
+        """結果が result の履歴を新しい順に返す"""
+        with self._read_lock:
+            return self._read.execute(SEARCH_RESULT_SQL, (result, limit)).fetchall()
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """それまでに record() した分の書き込みが終わるまで (最大 timeout 秒) 待つ。終わったら True"""
+        if self._closed:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_CLOSE)
+        self._writer.join()
+        self._read.close()
+
+    # --- 書き込みスレッド ---
+    def _write_loop(self):
+        conn = self._connect()
+        closing = False
+        while not closing:
+            item = self._queue.get()
+            batch, waiters = [], []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _CLOSE:
+                    closing = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                # 閉じる・flush() を待っている・件数がたまった のどれかなら、すぐ書く
+                if closing or waiters or len(batch) >= self.batch_size:
+                    break
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    self._write_batch(conn, batch)
+            finally:
+                # 書き込みに失敗しても flush() を待っている側は起こす
+                for done in waiters:
+                    done.set()
+        conn.close()
+
+    def _write_batch(self, conn, batch):
+        try:
+            with conn:
+                conn.executemany(INSERT_HISTORY_SQL, batch)
+        except sqlite3.Error:
+            logger.exception("計算履歴 %d 件を書き込めませんでした", len(batch))
+            with self._lock:
+                self.stats["dropped"] += len(batch)
+            return
+        with self._lock:
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
@@ -0,0 +1,205 @@
+"""電卓のキーボード入力: キーの対応表、連続入力のまとめ (coalescing)、操作の記録と再生
+
+キーを押すたびに画面全体を描き直すと、速い連続入力では描画が追いつかない。
+KeyCoalescer は描画中に届いたキーをためておき、次の1回でまとめて適用して1回だけ描画する。
+
+apply_keys が例外を出したまとまりは、途中まで適用されているかもしれないので再適用せずに捨てる。
+ログに残して stats["dropped"] に数え、その間に届いたキーの適用は続ける。
+
+記録した操作 (1行1イベントの JSON Lines: {"t": 秒, "key": "7"}) は replay() で
+画面なしに CalculatorApp へ流し込み、イベント/秒と1イベントあたりの遅延を測れる。
+
+    CALC_RECORD=session.jsonl flet run        # 操作を記録する
+    python ../bench_input.py --session session.jsonl
+"""
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+from collections import namedtuple
+
+DIGIT_KEYS = ("0", "1", "2", "3", "4", "5", "6", "7", "8", "9", ".")
+OPERATOR_KEYS = ("+", "-", "*", "/", "^")
+FUNCTION_KEYS = ("sin", "cos", "tan", "ln", "log10")
+CALC_KEYS = frozenset(DIGIT_KEYS + OPERATOR_KEYS + FUNCTION_KEYS + ("=", "%", "+/-", "AC"))
+
+# Flet (Flutter) のキー名 -> 電卓のキー
+KEY_ALIASES = {
+    "Enter": "=",
+    "Numpad Enter": "=",
+    "Numpad Equal": "=",
+    "Escape": "AC",
+    "Delete": "AC",
+    "Numpad Add": "+",
+    "Numpad Subtract": "-",
+    "Numpad Multiply": "*",
+    "Numpad Divide": "/",
+    "Numpad Decimal": ".",
+    "Asterisk": "*",
+    "Slash": "/",
+    "Minus": "-",
+    "Period": ".",
+}
+KEY_ALIASES.update({f"Numpad {d}": d for d in "0123456789"})
+# Shift と組み合わせたとき (US配列)
+SHIFTED_KEYS = {"=": "+", "8": "*", "6": "^", "5": "%"}
+# 科学計算はアルファベットのキーで入力する
+LETTER_KEYS = {"S": "sin", "C": "cos", "T": "tan", "L": "ln", "G": "log10", "N": "+/-"}
+
+logger = logging.getLogger(__name__)
+
+
+def key_from_event(e):
+    """ft.KeyboardEvent を電卓のキーにする。対応しないキーは None"""
+    if e.ctrl or e.meta or e.alt:
+        return None
+    key = e.key
+    if e.shift and key in SHIFTED_KEYS:
+        return SHIFTED_KEYS[key]
+    key = KEY_ALIASES.get(key, key)
+    if key in CALC_KEYS:
+        return key
+    return LETTER_KEYS.get(key.upper()) if len(key) == 1 else None
+
+
+class KeyCoalescer:
+    """push() されたキーを apply_keys(keys) でまとめて適用する
+
+    apply_keys を実行中のスレッドがあれば、後から来たキーはためるだけで戻り、
+    実行中のスレッドが次の回でまとめて適用する。window 秒待ってから適用すると、
+    同じバーストのキーをさらに多く1回にまとめられる (そのぶん最初のキーの表示は遅れる)。
+    """
+
+    def __init__(self, apply_keys, window=0.0):
+        self.apply_keys = apply_keys
+        self.window = window
+        self._pending = []
+        self._flushing = False
+        self._lock = threading.Lock()
+        self.stats = {"events": 0, "flushes": 0, "dropped": 0}
+
+    def push(self, key):
+        with self._lock:
+            self._pending.append(key)
+            self.stats["events"] += 1
+            if self._flushing:
+                return
+            self._flushing = True
+        if self.window:
+            time.sleep(self.window)
+        while True:
+            with self._lock:
+                keys, self._pending = self._pending, []
+                if not keys:
+                    self._flushing = False
+                    return
+                self.stats["flushes"] += 1
+            try:
+                self.apply_keys(keys)
+            except Exception:
+                logger.exception("キー %d 個を適用できませんでした", len(keys))
+                with self._lock:
+                    self.stats["dropped"] += len(keys)
+            except BaseException:
+                # KeyboardInterrupt などは止めずに伝えるが、残りのキーは次の push() で適用できるようにする
+                with self._lock:
+                    self._flushing = False
+                raise
+
+
+class SessionRecorder:
+    """押されたキーを時刻つきで JSON Lines に追記する"""
+
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, key):
+        line = json.dumps({"t": round(time.perf_counter() - self._started, 4), "key": key})
+        with self._lock:
+            if not self._file.closed:  # 閉じた後に届いたキーは記録しない
+                self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+KeyEvent = namedtuple("KeyEvent", "t key")
+
+
+def load_session(path):
+    with open(path, encoding="utf-8") as f:
+        return [KeyEvent(e["t"], e["key"]) for e in map(json.loads, f) if e.get("key") in CALC_KEYS]
+
+
+def generate_session(count, seed=0, typing_interval=0.03, burst_interval=0.002):
+    """人の入力 (typing_interval 間隔) と貼り付けのようなバースト (burst_interval 間隔) が混ざった操作列"""
+    rng = random.Random(seed)
+    events = []
+    t = 0.0
+    while len(events) < count:
+        burst = rng.random() < 0.3
+        keys = []
+        for _ in range(rng.randint(1, 3)):
+            keys += list(str(rng.randint(0, 9999)))
+            if rng.random() < 0.2:
+                keys += [".", str(rng.randint(0, 9))]
+            keys.append(rng.choice(OPERATOR_KEYS[:4]))
+        keys += list(str(rng.randint(1, 99)))
+        if rng.random() < 0.2:
+            keys.append(rng.choice(FUNCTION_KEYS + ("%", "+/-")))
+        keys.append("=")
+        for key in keys:
+            t += burst_interval if burst else typing_interval
+            events.append(KeyEvent(round(t, 4), key))
+        if rng.random() < 0.1:
+            t += typing_interval
+            events.append(KeyEvent(round(t, 4), "AC"))
+    return events[:count]
+
+
+def group_events(events, window):
+    """記録時刻で window 秒以内に続いたイベントを1つのまとまりにする (window=0 なら1件ずつ)"""
+    if not window:
+        return [[e] for e in events]
+    batches = []
+    start = None
+    for event in events:
+        if start is None or event.t - start > window:
+            batches.append([])
+            start = event.t
+        batches[-1].append(event)
+    return batches
+
+
+ReplayResult = namedtuple("ReplayResult", "events renders elapsed events_per_sec p50_us p99_us")
+
+
+def replay(app, events, window=0.0):
+    """画面なしで events を app.press_keys に流す。記録時刻の間隔は待たずに最高速で流す
+
+    window 秒以内に続いたイベントはまとめて1回の press_keys (=1回の描画) にする。
+    1イベントの遅延は、そのまとまりの処理が終わるまでの時間。
+    """
+    app.press_keys(["AC"])
+    renders_before = app.render_count
+    latencies = []
+    started = time.perf_counter()
+    for batch in group_events(events, window):
+        t0 = time.perf_counter()
+        app.press_keys([e.key for e in batch])
+        latencies.extend([time.perf_counter() - t0] * len(batch))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return ReplayResult(
+        events=len(events),
+        renders=app.render_count - renders_before,
+        elapsed=elapsed,
+        events_per_sec=len(events) / elapsed if elapsed else 0.0,
+        p50_us=statistics.median(latencies) * 1e6 if latencies else 0.0,
+        p99_us=latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e6 if latencies else 0.0,
+    )
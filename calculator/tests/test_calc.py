@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+pytest.importorskip("flet")
+
+from calc import CalculatorApp  # noqa: E402
+
+
+def press(keys):
+    app = CalculatorApp()
+    for key in keys.split():
+        app.press(key)
+    return app.result.value
+
+
+@pytest.mark.parametrize("keys, expected", [
+    ("2 + 3 * 4 =", "14"),
+    ("2 + 3 0 sin + 1 =", "3.5"),  # sin の結果の後の演算子は、前の演算子を置き換えない
+    ("5 0 + 1 0 % * 2 =", "50.2"),
+    ("2 + * 3 =", "6"),  # 演算子を続けて押すと置き換える
+    ("7 +/- - 3 =", "-10"),
+    ("1 / 0 =", "Error"),
+    ("1 / 0 = AC 5 =", "5"),
+])
+def test_key_sequences(keys, expected):
+    assert press(keys) == expected
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+np = pytest.importorskip("numpy")
+
+from calc_batch import evaluate_batch, evaluate_csv  # noqa: E402
+from calc_engine import evaluate_to_display  # noqa: E402
+
+
+@pytest.mark.parametrize("text", ["sin(x)^2", "ln(x)%", "-x^2", "x / (x - 2) + cos x", "(x + 1)^0.5"])
+def test_batch_matches_engine(text):
+    xs = [-3.0, 0.0, 1.0, 2.0, 30.0, 45.5]
+    assert evaluate_batch(text, x=np.array(xs)).to_display() == [evaluate_to_display(text, x=x) for x in xs]
+
+
+def test_errors_are_masked_instead_of_raised():
+    result = evaluate_batch("1 / x", x=np.array([2.0, 0.0]))
+    assert result.errors.tolist() == [False, True]
+    assert result.to_display() == ["0.5", "Error"]
+
+
+def test_evaluate_csv(tmp_path):
+    src = tmp_path / "items.csv"
+    src.write_text("name,price\na,50\nb,x\n", encoding="utf-8")
+    out = tmp_path / "out.csv"
+    evaluate_csv("price * (1 + 10%)", str(src), str(out))
+    assert out.read_text(encoding="utf-8").splitlines() == ["name,price,result", "a,50,55", "b,x,Error"]
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from calc_engine import CalcError, evaluate, evaluate_to_display, format_number, parse  # noqa: E402
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2 + 3 * 4", "14"),
+    ("sin(30)^2", "0.25"),  # ^ は関数の結果にかかる
+    ("-2^2", "-4"),
+    ("2^3^2", "512"),
+    ("50%", "0.5"),
+    ("sin 30 + 1", "1.5"),
+    ("cos(60) * 2", "1"),
+])
+def test_evaluate_to_display(text, expected):
+    assert evaluate_to_display(text) == expected
+
+
+def test_postfix_percent_applies_to_function_result():
+    assert parse("ln(2)%") == ("pct", ("call", "ln", ("num", 2.0)))
+    assert evaluate("ln(2)%") == pytest.approx(0.006931471805599453)
+
+
+def test_function_argument_is_only_the_parenthesised_expression():
+    assert parse("sin(30)^2") == ("bin", "^", ("call", "sin", ("num", 30.0)), ("num", 2.0))
+
+
+@pytest.mark.parametrize("text", ["sin(30", "1 +", "2 ** 3", "1 / 0", "ln(0)"])
+def test_errors(text):
+    with pytest.raises(CalcError):
+        evaluate(text)
+    assert evaluate_to_display(text) == "Error"
+
+
+def test_variables():
+    assert evaluate("x^2 + y", x=3, y=1) == 10.0
+
+
+@pytest.mark.parametrize("num, expected", [
+    (110.00000000000001, "110"),  # "g" 形式の結果から末尾の0を削ってはいけない
+    (0.1 + 0.2, "0.3"),
+    (2.5, "2.5"),
+    (1e-13, "0"),
+    (-4.0, "-4"),
+])
+def test_format_number(num, expected):
+    assert format_number(num) == expected
@@ -0,0 +1,40 @@
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from calc_history import HISTORY_SCHEMA, HistoryStore  # noqa: E402
+
+
+def test_records_are_written_and_searchable(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    for i in range(10):
+        store.record(f"{i} + 1", str(i + 1))
+    assert store.flush()
+    assert store.search("9 +") == [("9 + 1", "10")]
+    assert store.stats["written"] == 10
+    store.close()
+
+
+def test_failed_batch_is_logged_and_the_writer_keeps_going(tmp_path, caplog):
+    path = str(tmp_path / "history.db")
+    store = HistoryStore(path)
+    other = sqlite3.connect(path)
+    other.execute("DROP TRIGGER history_no_delete")
+    other.execute("DROP TABLE history")  # 書き込みが "no such table" で失敗する
+    other.commit()
+
+    store.record("1 + 1", "2")
+    assert store.flush(timeout=2)
+    assert store.stats["dropped"] == 1
+    assert "書き込めませんでした" in caplog.text
+
+    for sql in HISTORY_SCHEMA:
+        other.execute(sql)
+    other.commit()
+    store.record("2 + 2", "4")
+    assert store.flush(timeout=2)
+    assert other.execute("SELECT expression, result FROM history").fetchall() == [("2 + 2", "4")]
+    other.close()
+    store.close()
@@ -0,0 +1,118 @@
+import json
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from calc_input import KeyCoalescer, SessionRecorder, generate_session, key_from_event, load_session, replay  # noqa: E402
+
+TIMEOUT = 5
+
+
+def key_event(key, shift=False, ctrl=False, alt=False, meta=False):
+    """ft.KeyboardEvent と同じ属性だけを持つイベント"""
+    return SimpleNamespace(key=key, shift=shift, ctrl=ctrl, alt=alt, meta=meta)
+
+
+@pytest.mark.parametrize("event, expected", [
+    (key_event("7"), "7"),
+    (key_event("Numpad 7"), "7"),
+    (key_event("Enter"), "="),
+    (key_event("Escape"), "AC"),
+    (key_event("Numpad Multiply"), "*"),
+    (key_event("=", shift=True), "+"),
+    (key_event("8", shift=True), "*"),
+    (key_event("5", shift=True), "%"),
+    (key_event("S"), "sin"),
+    (key_event("g"), "log10"),
+    (key_event("C", ctrl=True), None),  # コピーなどのショートカットは電卓に渡さない
+    (key_event("X"), None),
+    (key_event("Arrow Left"), None),
+])
+def test_key_from_event(event, expected):
+    assert key_from_event(event) == expected
+
+
+def test_concurrent_pushes_are_coalesced():
+    started, release = threading.Event(), threading.Event()
+    batches = []
+
+    def apply_keys(keys):
+        batches.append(list(keys))
+        if len(batches) == 1:
+            started.set()
+            assert release.wait(TIMEOUT)
+
+    coalescer = KeyCoalescer(apply_keys)
+    first = threading.Thread(target=coalescer.push, args=("1",))
+    first.start()
+    assert started.wait(TIMEOUT)
+    # 1回目の適用中に届いたキーは、ためるだけですぐ戻る
+    others = [threading.Thread(target=coalescer.push, args=(key,)) for key in "2345"]
+    for t in others:
+        t.start()
+    for t in others:
+        t.join(TIMEOUT)
+    release.set()
+    first.join(TIMEOUT)
+    assert len(batches) == 2
+    assert batches[0] == ["1"] and sorted(batches[1]) == ["2", "3", "4", "5"]
+    assert coalescer.stats == {"events": 5, "flushes": 2, "dropped": 0}
+
+
+def test_failed_batch_is_dropped_and_pending_keys_are_applied(caplog):
+    applied = []
+    coalescer = KeyCoalescer(None)
+
+    def apply_keys(keys):
+        if not applied:
+            applied.append("failed")
+            coalescer.push("2")  # 適用中に届いたキー
+            raise RuntimeError("render failed")
+        applied.extend(keys)
+
+    coalescer.apply_keys = apply_keys
+    coalescer.push("1")
+    assert applied == ["failed", "2"]
+    assert coalescer.stats["dropped"] == 1
+    assert "適用できませんでした" in caplog.text
+    coalescer.push("3")  # 失敗の後も次の push() は適用される
+    assert applied == ["failed", "2", "3"]
+
+
+def test_recorder_writes_sessions_and_ignores_keys_after_close(tmp_path):
+    path = str(tmp_path / "session.jsonl")
+    recorder = SessionRecorder(path)
+    for key in ["1", "+", "Tab", "2", "="]:
+        recorder.record(key)
+    recorder.close()
+    recorder.record("3")
+    with open(path, encoding="utf-8") as f:
+        assert [json.loads(line)["key"] for line in f] == ["1", "+", "Tab", "2", "="]
+    assert [e.key for e in load_session(path)] == ["1", "+", "2", "="]
+
+
+@pytest.mark.parametrize("window", [0.0, 0.01])
+def test_replay_matches_pressing_keys_one_at_a_time(window):
+    pytest.importorskip("flet")
+    from calc import CalculatorApp
+
+    events = generate_session(300, seed=3)
+    replayed = CalculatorApp()
+    result = replay(replayed, events, window=window)
+
+    pressed = CalculatorApp()
+    pressed.press("AC")
+    for event in events:
+        pressed.press(event.key)
+    assert replayed.result.value == pressed.result.value
+    assert replayed.expression_text.value == pressed.expression_text.value
+    assert result.events == len(events)
+    if window:
+        assert result.renders < len(events)
+    else:
+        assert result.renders == len(events)
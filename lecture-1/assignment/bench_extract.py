@@ -0,0 +1,78 @@
+"""一覧ページの解析方法 (github_extract.EXTRACTORS) ごとの速度とメモリを比べる
+
+コーパスは fixtures/github/ にGitHubから保存したページ (あれば)、fixtures/synthetic/ の合成ページと、
+github_stub でその場で合成したページ。--corpus に保存したHTMLのディレクトリを渡すと、それも加える。
+
+    python bench_extract.py --pages 200
+    python bench_extract.py --corpus ~/saved_pages --repeat 5
+"""
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+
+from github_extract import EXTRACTORS
+from github_stub import FIXTURE_ORG, SYNTHETIC_DIR, render_org_page, saved_pages
+
+
+def load_corpus(pages, corpus_dir=None):
+    """[(org, html), ...] を返す"""
+    corpus = []
+    for org, path in saved_pages():
+        with open(path, encoding="utf-8") as f:
+            corpus.append((org, f.read()))
+    for path in sorted(glob.glob(os.path.join(SYNTHETIC_DIR, f"{FIXTURE_ORG}_page_*.html"))):
+        with open(path, encoding="utf-8") as f:
+            corpus.append((FIXTURE_ORG, f.read()))
+    if corpus_dir:
+        # ファイル名の先頭 (org_page_1.html なら "org") ではorgが分からないので、
+        # ディレクトリ名をorganization名として扱う
+        org = os.path.basename(os.path.normpath(corpus_dir))
+        for path in sorted(glob.glob(os.path.join(corpus_dir, "*.html"))):
+            with open(path, encoding="utf-8") as f:
+                corpus.append((org, f.read()))
+    for page in range(1, pages + 1):
+        corpus.append(("bench", render_org_page("bench", page, pages=pages)))
+    return corpus
+
+
+def measure(extract, corpus, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for org, html in corpus:
+            extract(html, org)
+    elapsed = time.perf_counter() - t0
+
+    # メモリは1ページずつ解析したときのピークを測る (時間の計測とは分ける)
+    peak = 0
+    for org, html in corpus:
+        tracemalloc.start()
+        extract(html, org)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return len(corpus) * repeat / elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=100, help="合成するページ数")
+    parser.add_argument("--corpus", help="保存済みの一覧ページ (*.html) のディレクトリ")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.pages, args.corpus)
+    size = sum(len(html) for _, html in corpus)
+    print(f"コーパス: {len(corpus)}ページ (うちGitHubから保存したもの {len(saved_pages())}), {size / 1e6:.1f} MB")
+
+    expected = [EXTRACTORS["bs4"](html, org) for org, html in corpus]
+    for name, extract in EXTRACTORS.items():
+        pages_per_sec, peak = measure(extract, corpus, args.repeat)
+        rows = [extract(html, org) for org, html in corpus]
+        same = sum(a == b for a, b in zip(rows, expected))
+        print(f"{name:<6} {pages_per_sec:>10,.1f} pages/s  peak {peak / 1024:>8,.0f} KiB/page  "
+              f"bs4と同じ結果: {same}/{len(corpus)}ページ")
+
+
+if __name__ == "__main__":
+    main()
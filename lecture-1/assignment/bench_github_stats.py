@@ -0,0 +1,115 @@
+"""github_stats の集計クエリと、インデックス・集計テーブルを使わない全件走査を比べる
+
+合成した repositories テーブル (既定で200万件) を一時ファイルに作って測る。
+
+    python bench_github_stats.py --rows 2000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import github_stats
+from github_scraper import CREATE_REPOSITORIES_SQL, INSERT_REPOSITORY_SQL
+
+LANGUAGES = ["Python", "JavaScript", "TypeScript", "Go", "Java", "C++", "Rust", "C", "Ruby", "PHP",
+             "Kotlin", "Swift", "Shell", "Scala", "Haskell", "Elixir", "Lua", "R", "Julia", "Zig", "N/A"]
+
+
+def make_rows(count, seed=0):
+    rng = random.Random(seed)
+    weights = [1 / (i + 1) for i in range(len(LANGUAGES))]
+    languages = rng.choices(LANGUAGES, weights, k=count)
+    for i, language in enumerate(languages):
+        yield f"org{i % 997}/repo-{i:08d}", language, int(rng.paretovariate(1.1)) - 1
+
+
+def timed(fn, repeat=5):
+    """repeat回の実行の中央値 (秒) と最後の結果を返す"""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), result
+
+
+def report(label, fast, slow):
+    print(f"{label:<28} 集計/インデックス {fast * 1e3:>9.3f} ms   全件走査 {slow * 1e3:>9.1f} ms   "
+          f"({slow / fast:,.0f}倍)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--language", default="Rust", help="言語別クエリで使う言語")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(CREATE_REPOSITORIES_SQL)
+
+        t0 = time.perf_counter()
+        with conn:
+            conn.executemany(INSERT_REPOSITORY_SQL, make_rows(args.rows))
+        print(f"{args.rows:,}件の読み込み (トリガーなし): {time.perf_counter() - t0:.1f}秒")
+        t0 = time.perf_counter()
+        github_stats.init_analytics(conn)
+        print(f"インデックス作成と集計の初期化: {time.perf_counter() - t0:.1f}秒")
+
+        lang = args.language
+        fast, _ = timed(lambda: github_stats.top_repos(conn, lang, args.k))
+        slow, _ = timed(lambda: conn.execute(
+            "SELECT repo_name, language, stars FROM repositories NOT INDEXED "
+            "WHERE language = ? ORDER BY stars DESC LIMIT ?", (lang, args.k)).fetchall(), repeat=1)
+        report(f"トップ{args.k} ({lang})", fast, slow)
+
+        fast, _ = timed(lambda: github_stats.top_repos(conn, None, args.k))
+        slow, _ = timed(lambda: conn.execute(
+            "SELECT repo_name, language, stars FROM repositories NOT INDEXED ORDER BY stars DESC LIMIT ?",
+            (args.k,)).fetchall(), repeat=1)
+        report(f"トップ{args.k} (全体)", fast, slow)
+
+        fast, median = timed(lambda: github_stats.median_stars(conn, lang))
+        slow, expected = timed(lambda: statistics.median(s for (s,) in conn.execute(
+            "SELECT stars FROM repositories NOT INDEXED WHERE language = ?", (lang,))), repeat=1)
+        assert median == expected, (median, expected)
+        report(f"中央値 ({lang})", fast, slow)
+
+        fast, _ = timed(lambda: github_stats.language_summary(conn))
+        slow, _ = timed(lambda: conn.execute(
+            "SELECT language, COUNT(*), SUM(stars), AVG(stars) FROM repositories NOT INDEXED "
+            "GROUP BY language ORDER BY 2 DESC").fetchall(), repeat=1)
+        report("言語別の件数・合計", fast, slow)
+
+        fast, _ = timed(lambda: github_stats.star_histogram(conn))
+        slow, _ = timed(lambda: conn.execute(
+            "SELECT stars, COUNT(*) FROM repositories NOT INDEXED GROUP BY stars").fetchall(), repeat=1)
+        report("ヒストグラム (全体)", fast, slow)
+
+        # トリガーによる書き込みの上乗せ分
+        updates = [(f"org{i % 997}/repo-{i:08d}", random.choice(LANGUAGES), random.randrange(5000))
+                   for i in random.Random(1).sample(range(args.rows), 20_000)]
+        t0 = time.perf_counter()
+        with conn:
+            conn.executemany(INSERT_REPOSITORY_SQL, updates)
+        elapsed = time.perf_counter() - t0
+        print(f"upsert 20,000件 (インデックス+トリガーあり): {20_000 / elapsed:,.0f} 行/秒")
+
+        # トリガーで更新した集計が作り直した結果と一致するか
+        before = (conn.execute("SELECT * FROM language_stats ORDER BY 1").fetchall(),
+                  conn.execute("SELECT * FROM language_star_counts ORDER BY 1, 2").fetchall())
+        github_stats.rebuild_aggregates(conn)
+        after = (conn.execute("SELECT * FROM language_stats ORDER BY 1").fetchall(),
+                 conn.execute("SELECT * FROM language_star_counts ORDER BY 1, 2").fetchall())
+        print("集計の整合性:", "OK" if before == after else "ずれています")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
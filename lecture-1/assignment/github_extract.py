@@ -0,0 +1,176 @@
+"""リポジトリ一覧ページのHTMLから (repo_name, language, stars) を取り出す
+
+バックエンドは2つある。
+
+- "fast": コンパイル済みの正規表現でHTMLを先頭から1回なめるだけの実装。
+  DOMツリーを作らないので速く、メモリもほとんど使わない
+- "bs4": ノートブック版と同じBeautifulSoupの実装。セレクタを順に試すので
+  レイアウトが変わっても拾えることが多いが、ページごとにツリーを作るので遅い
+
+"fast" はリポジトリのリンク (data-hovercard-type="repository") が
+1つも見つからないページを "bs4" に回すので、普段は "fast" を使えばよい。
+"""
+import html as html_lib
+import re
+
+from bs4 import BeautifulSoup
+
+# <a ... data-hovercard-type="repository" ...>name</a>
+REPO_LINK_RE = re.compile(
+    r'<a\b([^>]*\bdata-hovercard-type=["\']repository["\'][^>]*)>(.*?)</a\s*>',
+    re.IGNORECASE | re.DOTALL,
+)
+HREF_RE = re.compile(r'\bhref=["\']([^"\']*)["\']', re.IGNORECASE)
+LANGUAGE_RE = re.compile(
+    r'<span\b[^>]*\bitemprop=["\']programmingLanguage["\'][^>]*>(.*?)</span\s*>',
+    re.IGNORECASE | re.DOTALL,
+)
+STARS_RE = re.compile(
+    r'<a\b[^>]*\bhref=["\'][^"\']*/stargazers["\'][^>]*>(.*?)</a\s*>',
+    re.IGNORECASE | re.DOTALL,
+)
+TAG_RE = re.compile(r'<[^>]*>')
+
+
+def convert_stars_to_int(star_str):
+
+    if not star_str:
+        return 0
+    s = star_str.lower().replace(',', '').strip()
+    try:
+        if 'k' in s:
+            return int(float(s.replace('k', '')) * 1000)
+        return int(float(s))
+    except Exception:
+        return 0
+
+
+def _text(fragment):
+    """タグを除いたテキスト (前後の空白は落とす)"""
+    return html_lib.unescape(TAG_RE.sub('', fragment)).strip()
+
+
+def _repo_name(href, text, organization_name):
+    # bs4版と同じ規則: /org/name ならname、そうでなければリンクのテキスト
+    if href.startswith('/'):
+        parts = href.rstrip('/').split('/')
+        if len(parts) >= 2 and parts[-2].lower() == organization_name.lower():
+            return parts[-1]
+        return text
+    return text or href.rstrip('/').split('/')[-1]
+
+
+def extract_repos_fast(html, organization_name):
+    """1パスで抜き出す。リポジトリのリンクが無いページはbs4版に任せる"""
+    links = list(REPO_LINK_RE.finditer(html))
+    if not links:
+        return extract_repos_bs4(html, organization_name)
+
+    hrefs = []
+    for link in links:
+        m = HREF_RE.search(link.group(1))
+        hrefs.append(html_lib.unescape(m.group(1)) if m else '')
+    # 言語とスターは、次の別のリポジトリへのリンクまでの範囲にある
+    # (1つの行にアイコンと名前のように同じリポジトリへのリンクが並ぶことがある)
+    ends = [len(html)] * len(links)
+    for i in range(len(links) - 2, -1, -1):
+        ends[i] = links[i + 1].start() if hrefs[i + 1] != hrefs[i] else ends[i + 1]
+
+    repos = []
+    seen = set()
+    for i, link in enumerate(links):
+        href = hrefs[i]
+        text = _text(link.group(2))
+        key = href.strip() + text
+        if key in seen:
+            continue
+        seen.add(key)
+        repo_name = _repo_name(href, text, organization_name)
+        if not repo_name:
+            continue
+
+        lang = LANGUAGE_RE.search(html, link.end(), ends[i])
+        language = (_text(lang.group(1)) if lang else '') or 'N/A'
+        stars = STARS_RE.search(html, link.end(), ends[i])
+        repos.append((repo_name, language, convert_stars_to_int(_text(stars.group(1)) if stars else '')))
+    return repos
+
+
+def extract_repos_bs4(html, organization_name):
+    """一覧ページのHTMLから [(repo_name, language, stars), ...] を取り出す"""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    repo_links = []
+    repo_links.extend(soup.find_all('a', {'data-hovercard-type': 'repository'}))
+    if not repo_links:
+        repo_links.extend(soup.select('h3 a'))
+    if not repo_links:
+        repo_links.extend(soup.select('a[itemprop="name codeRepository"]'))
+    if not repo_links:
+        repo_links.extend([a for a in soup.find_all('a', href=True) if f'/{organization_name}/' in a['href']])
+
+    seen = set()
+    links = []
+    for a in repo_links:
+        href = a.get('href') or ''
+        key = href.strip() + (a.text or '').strip()
+        if key and key not in seen:
+            seen.add(key)
+            links.append(a)
+
+    repos = []
+    for link in links:
+        href = link.get('href', '') or ''
+
+        repo_name = ''
+        if href.startswith('/'):
+            parts = href.rstrip('/').split('/')
+            if len(parts) >= 2 and parts[-2].lower() == organization_name.lower():
+                repo_name = parts[-1]
+            else:
+                repo_name = link.text.strip()
+        else:
+            repo_name = link.text.strip() or href.rstrip('/').split('/')[-1]
+
+        if not repo_name:
+            continue
+        repo = link.find_parent('div', class_='Box-row') or link.find_parent('li') or link.find_parent('div')
+
+        language = 'N/A'
+        stars_text = ''
+
+        if repo:
+            lang_tag = repo.find('span', itemprop='programmingLanguage')
+            if lang_tag and lang_tag.text:
+                language = lang_tag.text.strip()
+            else:
+                # '.f6 .mr-3' だけだとスター数のリンク (a.mr-3) も当たってしまうのでspanに限る
+                alt = repo.select_one('[data-test-selector="repo-language-color"]') or repo.select_one('.f6 span.mr-3')
+                if alt and alt.text:
+                    language = alt.text.strip()
+
+            stars_tag = repo.find('a', href=lambda h: h and h.endswith('/stargazers'))
+            if not stars_tag:
+                stars_tag = repo.find('a', href=lambda h: h and 'stargazers' in h)
+            if not stars_tag:
+                stars_tag = repo.select_one('a[href$="/stargazers"]')
+
+            if stars_tag:
+                span = stars_tag.find('span')
+                stars_text = (span.text.strip() if span and span.text else stars_tag.text.strip())
+
+        repos.append((repo_name, language, convert_stars_to_int(stars_text)))
+    return repos
+
+
+EXTRACTORS = {
+    "fast": extract_repos_fast,
+    "bs4": extract_repos_bs4,
+}
+
+
+def get_extractor(name):
+    try:
+        return EXTRACTORS[name]
+    except KeyError:
+        raise ValueError(f"不明な抽出方法です: {name!r} ({', '.join(EXTRACTORS)})") from None
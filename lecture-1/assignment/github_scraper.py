@@ -0,0 +1,400 @@
+"""GitHub organizationのリポジトリ一覧をスクレイピングしてSQLiteに保存する
+
+assignment.ipynb の scrape_github_repos をモジュールにしたもの。
+ページの取得 -> HTMLの解析 -> DBへの書き込み をパイプラインにしていて、
+
+- 取得: 数ページ先まで並行して先読みする (トークンバケットで秒間リクエスト数を制限)
+- 解析: ワーカープールで行う (HTMLの解析はCPUを使うため。解析方法は github_extract.py)
+- 書き込み: 解析済みの行を batch_size 件ごとにcommitする
+
+先読みするページ数に上限があるので、大きなorganizationでもメモリ使用量は一定になる。
+
+    python github_scraper.py google
+    python github_scraper.py acme --base-url http://127.0.0.1:8766 --concurrency 8 --rate 0
+    python github_scraper.py google --save-pages fixtures/github   # テスト用に一覧ページを保存する
+"""
+import argparse
+import hashlib
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import requests
+# 計測APIとHTTPクライアントは天気アプリと共通のもの (pip install -e lecture-common)
+from lecture_common.http_client import CACHE_DIR, HttpClient
+from lecture_common.tracing import format_snapshot, tracer
+
+from github_extract import EXTRACTORS, get_extractor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_NAME = os.path.join(BASE_DIR, 'github_repos.db')
+GITHUB_URL = "https://github.com"
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
+    'Accept-Language': 'ja-JP,ja;q=0.9,en-US;q=0.8'
+}
+
+CREATE_REPOSITORIES_SQL = '''
+    CREATE TABLE IF NOT EXISTS repositories (
+        repo_name TEXT PRIMARY KEY,
+        language TEXT,
+        stars INTEGER
+    );
+'''
+# INSERT OR REPLACE は行を削除してから入れ直すが、そのときDELETEトリガーは
+# (recursive_triggers を有効にしない限り) 動かないので、集計 (github_stats.py) がずれる。
+# 結果は同じになるupsertで書く
+INSERT_REPOSITORY_SQL = '''
+    INSERT INTO repositories (repo_name, language, stars) VALUES (?, ?, ?)
+    ON CONFLICT(repo_name) DO UPDATE SET language = excluded.language, stars = excluded.stars
+'''
+
+
+class FetchError(Exception):
+    """リトライしてもページを取得できなかった"""
+
+
+class TokenBucket:
+    """スレッドセーフなトークンバケット (rate=0 なら制限しない)"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class PageFetcher:
+    """keep-aliveのセッションで一覧ページを取得する
+
+    cache_dir を渡すと、取得したページをディスクに保存しておき、次の実行では条件付きGETで
+    確かめて 304 なら保存したものを使う (lecture_common.http_client.HttpClient)。
+    """
+
+    def __init__(self, organization_name, base_url=GITHUB_URL, rate=1.0, retries=3, backoff=1.0,
+                 timeout=10, pool_size=8, cache_dir=None):
+        self.base_url = f"{base_url.rstrip('/')}/orgs/{organization_name}/repositories"
+        self.bucket = TokenBucket(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.client = HttpClient(cache_dir, pool_size=pool_size, timeout=timeout, headers=HEADERS)
+        self.bytes_received = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    def url(self, page):
+        return f"{self.base_url}?page={page}"
+
+    def fetch(self, page):
+        return self.fetch_conditional(page)[0]
+
+    def fetch_conditional(self, page, etag=None):
+        """(html, etag) を返す。etagが一致して 304 が返ったときは html が None"""
+        url = self.url(page)
+        headers = {"If-None-Match": etag} if etag else None
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            try:
+                with tracer.span("scraper.fetch", page=page, attempt=attempt):
+                    resp = self.client.get(url, headers=headers)
+                if resp.status_code == 304:
+                    with self._lock:
+                        self.not_modified += 1
+                    tracer.count("scraper.not_modified")
+                    return None, etag
+                resp.raise_for_status()
+                if not resp.from_cache:
+                    with self._lock:
+                        self.bytes_received += len(resp.content)
+                    tracer.count("scraper.bytes_received", len(resp.content))
+                return resp.text, resp.headers.get("ETag")
+            except requests.exceptions.RequestException as e:
+                error = e
+                tracer.count("scraper.fetch_errors")
+            if attempt < self.retries:
+                time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+        raise FetchError(f"{url}: {error}")
+
+    def close(self):
+        self.client.close()
+
+
+class _Resolved:
+    """結果が決まっているFuture (解析しないページ用)"""
+
+    def __init__(self, value):
+        self._value = value
+
+    def result(self):
+        return self._value
+
+    def cancel(self):
+        return True
+
+
+class _InlineExecutor:
+    """parse_workers=0 のときに使う、その場で実行するだけのExecutor"""
+
+    class _Done(_Resolved):
+        def __init__(self, fn, args):
+            self._fn, self._args = fn, args
+
+        def result(self):
+            return self._fn(*self._args)
+
+    def submit(self, fn, *args):
+        return self._Done(fn, args)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class Page(namedtuple("Page", "number rows content_hash etag")):
+    """取得・解析した1ページ分。内容が前回と同じで解析しなかったページは rows が None"""
+
+
+def content_hash(html):
+    return hashlib.sha1(html.encode("utf-8")).hexdigest()
+
+
+def _parse(extract, html, organization_name):
+    """(rows, 解析にかかったms) を返す。解析プロセスの中では計測できないので時間を持ち帰る"""
+    started = time.perf_counter()
+    rows = extract(html, organization_name)
+    return rows, (time.perf_counter() - started) * 1000
+
+
+def _fetch_page(fetcher, page, known):
+    """(html, content_hash, etag) を返す。304のときは html が None"""
+    prev_hash, prev_etag = known.get(page, (None, None))
+    html, etag = fetcher.fetch_conditional(page, prev_etag)
+    if html is None:
+        return None, prev_hash, etag
+    return html, content_hash(html), etag
+
+
+def iter_page_rows(organization_name, fetcher, concurrency=4, parse_workers=2, max_pages=None, stats=None,
+                   extractor="fast", start_page=1, known_pages=None):
+    """Page をページ順に返す。リポジトリが見つからないページで終わる
+
+    取得は concurrency ページ先まで、解析は parse_workers 個のプロセスで並行して行う。
+    known_pages ({page: (content_hash, etag)}) を渡すと、条件付きGETで取得し、
+    内容が変わっていないページは解析せずに rows=None で返す。
+    最後まで読み切ったときは stats["complete"] が True になる。
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault("pages", 0)
+    stats.setdefault("unchanged", 0)
+    stats["complete"] = False
+    known = known_pages or {}
+    extract = get_extractor(extractor)
+    parse_pool = ProcessPoolExecutor(parse_workers) if parse_workers else _InlineExecutor()
+    with ThreadPoolExecutor(concurrency, thread_name_prefix="github-fetch") as fetch_pool, parse_pool:
+        fetches = {}
+        parses = deque()
+        next_submit = start_page
+        next_fetch = start_page
+        error = None
+        try:
+            while True:
+                # 取得の先読み枠を埋める (解析待ちも含めてページ数を抑える)
+                while (error is None
+                       and len(fetches) + len(parses) < concurrency + max(parse_workers, 1)
+                       and (max_pages is None or next_submit <= max_pages)):
+                    fetches[next_submit] = fetch_pool.submit(_fetch_page, fetcher, next_submit, known)
+                    next_submit += 1
+
+                if error is None and next_fetch in fetches:
+                    try:
+                        html, digest, etag = fetches.pop(next_fetch).result()
+                    except FetchError as e:
+                        # 取得できたページまでは書き込んでから止める
+                        error = e
+                    else:
+                        if html is None or digest == known.get(next_fetch, (None,))[0]:
+                            future = _Resolved((None, 0.0))
+                        else:
+                            future = parse_pool.submit(_parse, extract, html, organization_name)
+                        parses.append((next_fetch, digest, etag, future))
+                        next_fetch += 1
+                        del html
+                        # 解析プールが埋まるまでは次のページの取得に進む
+                        if fetches and len(parses) < max(parse_workers, 1):
+                            continue
+
+                if not parses:
+                    break
+                page, digest, etag, future = parses.popleft()
+                with tracer.span("scraper.parse_wait", page=page):
+                    rows, parse_ms = future.result()
+                if rows is not None:
+                    tracer.observe("scraper.parse", parse_ms, page=page)
+                if rows is None:
+                    stats["unchanged"] += 1
+                elif not rows:
+                    print(f"ページ {page} でリポジトリリンクが見つかりませんでした。ページングを終了します。")
+                    stats["complete"] = True
+                    return
+                stats["pages"] += 1
+                yield Page(page, rows, digest, etag)
+        finally:
+            for future in fetches.values():
+                future.cancel()
+            for *_, future in parses:
+                future.cancel()
+        if error is not None:
+            raise error
+
+
+def scrape_github_repos(organization_name, base_url=GITHUB_URL, concurrency=4, rate=1.0,
+                        parse_workers=2, max_pages=None, extractor="fast", cache_dir=None):
+    """(repo_name, language, stars) を1件ずつ返すジェネレーター (ノートブック版と同じ形)"""
+    fetcher = PageFetcher(organization_name, base_url, rate=rate, pool_size=concurrency, cache_dir=cache_dir)
+    try:
+        for page in iter_page_rows(organization_name, fetcher, concurrency, parse_workers, max_pages,
+                                   extractor=extractor):
+            yield from page.rows
+    except FetchError as e:
+        print(f"リクエストエラー: {e}")
+    finally:
+        fetcher.close()
+
+
+def save_pages(organization_name, out_dir, pages=3, base_url=GITHUB_URL, rate=1.0):
+    """一覧ページのHTMLを解析せずに out_dir/{org}_page_N.html へ保存する。保存したパスのリストを返す
+
+    github_extract の2つの解析方法を実際のページで比べるためのもの (tests/test_github_extract.py)。
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    fetcher = PageFetcher(organization_name, base_url, rate=rate)
+    paths = []
+    try:
+        for page in range(1, pages + 1):
+            path = os.path.join(out_dir, f"{organization_name}_page_{page}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(fetcher.fetch(page))
+            paths.append(path)
+    finally:
+        fetcher.close()
+    return paths
+
+
+def init_db(db_path=DB_NAME):
+    conn = sqlite3.connect(db_path)
+    conn.execute(CREATE_REPOSITORIES_SQL)
+    conn.commit()
+    return conn
+
+
+def scrape_to_db(organization_name, db_path=DB_NAME, base_url=GITHUB_URL, concurrency=4, rate=1.0,
+                 parse_workers=2, batch_size=500, max_pages=None, replace=True, extractor="fast", cache_dir=None):
+    """スクレイピングしながら batch_size 件ごとにDBへcommitする。統計の辞書を返す
+
+    replace=True のときはノートブック版と同じく、最初に既存の行を削除する。
+    """
+    stats = {"pages": 0, "rows": 0, "commits": 0, "error": None}
+    fetcher = PageFetcher(organization_name, base_url, rate=rate, pool_size=concurrency, cache_dir=cache_dir)
+    conn = init_db(db_path)
+    started = time.perf_counter()
+    try:
+        if replace:
+            conn.execute('DELETE FROM repositories')
+        batch = []
+        try:
+            for page in iter_page_rows(organization_name, fetcher, concurrency, parse_workers,
+                                       max_pages, stats, extractor):
+                print(f"--- ページ {page.number} のスクレイピング完了。取得件数: {len(page.rows)} ---")
+                batch.extend(page.rows)
+                if len(batch) >= batch_size:
+                    with tracer.span("scraper.insert", rows=len(batch)):
+                        conn.executemany(INSERT_REPOSITORY_SQL, batch)
+                        conn.commit()
+                    stats["rows"] += len(batch)
+                    stats["commits"] += 1
+                    batch = []
+        except FetchError as e:
+            print(f"リクエストエラー: {e}")
+            stats["error"] = str(e)
+        with tracer.span("scraper.insert", rows=len(batch)):
+            if batch:
+                conn.executemany(INSERT_REPOSITORY_SQL, batch)
+                stats["rows"] += len(batch)
+            conn.commit()
+        stats["commits"] += 1
+    finally:
+        conn.close()
+        stats["http"] = fetcher.client.stats_snapshot()
+        fetcher.close()
+    stats["elapsed"] = time.perf_counter() - started
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("organization")
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--base-url", default=GITHUB_URL)
+    parser.add_argument("--concurrency", type=int, default=4, help="同時に先読みするページ数")
+    parser.add_argument("--rate", type=float, default=1.0, help="秒間リクエスト数 (0で無制限)")
+    parser.add_argument("--parse-workers", type=int, default=2, help="解析プロセス数 (0でメインスレッド)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--max-pages", type=int, default=None)
+    parser.add_argument("--extractor", choices=sorted(EXTRACTORS), default="fast", help="HTMLの解析方法")
+    parser.add_argument("--trace", action="store_true", help="取得・解析・書き込みの時間を集計して表示する")
+    parser.add_argument("--trace-log", default=None, help="計測した区間をJSON Linesで書き出すファイル")
+    parser.add_argument("--profile", choices=["cprofile", "sample"], default=None,
+                        help="プロファイラーを使う (結果は profiles/ に書く)")
+    parser.add_argument("--http-cache", default=CACHE_DIR, help="取得したページを保存しておくディレクトリ")
+    parser.add_argument("--no-http-cache", action="store_true", help="ページを保存せず毎回すべて取得する")
+    parser.add_argument("--save-pages", metavar="DIR", default=None,
+                        help="DBには書かず、一覧ページのHTMLを DIR に保存して終了する (--max-pages まで、既定3ページ)")
+    args = parser.parse_args()
+    if args.save_pages:
+        for path in save_pages(args.organization, args.save_pages, args.max_pages or 3, args.base_url, args.rate):
+            print(path)
+        return
+    if args.trace or args.trace_log or args.profile:
+        tracer.configure(log_path=args.trace_log, profile=args.profile)
+
+    with tracer.profile("scrape"):
+        stats = scrape_to_db(
+            args.organization, args.db, args.base_url, args.concurrency, args.rate,
+            args.parse_workers, args.batch_size, args.max_pages, extractor=args.extractor,
+            cache_dir=None if args.no_http_cache else args.http_cache,
+        )
+    print(f"\n**{stats['rows']}**件のデータがDBに挿入されました "
+          f"({stats['pages']}ページ, commit {stats['commits']}回, {stats['elapsed']:.1f}秒)")
+    http = stats["http"]
+    print(f"HTTP: {http['requests']}リクエスト, 304 {http['not_modified_rate']:.0%}, "
+          f"受信 {http['bytes_received']:,}バイト, キャッシュで節約 {http['bytes_saved']:,}バイト")
+
+    if tracer.enabled:
+        print("\n".join(format_snapshot(tracer.snapshot())))
+        tracer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""github_repos.db の repositories を言語別・スター数で集計する
+
+- インデックス: (language, stars DESC) と (stars DESC)。言語別・全体のトップKは
+  インデックスの先頭からK件読むだけになる
+- 集計テーブル: language_stats (言語ごとの件数・スター合計) と
+  language_star_counts (言語ごと・スター数ごとの件数)。repositories への
+  INSERT / UPDATE / DELETE のトリガーで差分だけ更新する
+- 中央値とヒストグラムは language_star_counts から求める。行数はリポジトリ数ではなく
+  「スター数の種類」なので、リポジトリが何百万件あっても全件は読まない
+- 言語が NULL の行は 'N/A' の行とはまとめず、別のグループにする (lecture-4/columnar.py と同じ)。
+  集計テーブルの主キーには NULL を入れられないので '(NULL)' (NULL_LANGUAGE) をキーにし、
+  language_summary では None として返す。言語を指定する関数にも NULL_LANGUAGE を渡す
+
+    python github_stats.py summary
+    python github_stats.py top --language Python -k 5
+    python github_stats.py hist --language Go
+"""
+import argparse
+import sqlite3
+
+from github_scraper import CREATE_REPOSITORIES_SQL, DB_NAME
+
+NO_LANGUAGE = 'N/A'
+NULL_LANGUAGE = '(NULL)'
+
+# 以前のトリガーは NULL を 'N/A' にまとめていたので、毎回作り直して古い定義を残さない
+ANALYTICS_SCHEMA = '''
+    CREATE INDEX IF NOT EXISTS idx_repositories_language_stars ON repositories(language, stars DESC);
+    CREATE INDEX IF NOT EXISTS idx_repositories_stars ON repositories(stars DESC);
+
+    CREATE TABLE IF NOT EXISTS language_stats (
+        language TEXT PRIMARY KEY,
+        repo_count INTEGER NOT NULL,
+        total_stars INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS language_star_counts (
+        language TEXT NOT NULL,
+        stars INTEGER NOT NULL,
+        repo_count INTEGER NOT NULL,
+        PRIMARY KEY (language, stars)
+    ) WITHOUT ROWID;
+
+    DROP TRIGGER IF EXISTS repositories_stats_insert;
+    DROP TRIGGER IF EXISTS repositories_stats_delete;
+    DROP TRIGGER IF EXISTS repositories_stats_update;
+
+    CREATE TRIGGER repositories_stats_insert AFTER INSERT ON repositories BEGIN
+        INSERT INTO language_stats (language, repo_count, total_stars)
+            VALUES (IFNULL(NEW.language, '(NULL)'), 1, IFNULL(NEW.stars, 0))
+            ON CONFLICT(language) DO UPDATE
+            SET repo_count = repo_count + 1, total_stars = total_stars + excluded.total_stars;
+        INSERT INTO language_star_counts (language, stars, repo_count)
+            VALUES (IFNULL(NEW.language, '(NULL)'), IFNULL(NEW.stars, 0), 1)
+            ON CONFLICT(language, stars) DO UPDATE SET repo_count = repo_count + 1;
+    END;
+
+    CREATE TRIGGER repositories_stats_delete AFTER DELETE ON repositories BEGIN
+        UPDATE language_stats
+            SET repo_count = repo_count - 1, total_stars = total_stars - IFNULL(OLD.stars, 0)
+            WHERE language = IFNULL(OLD.language, '(NULL)');
+        DELETE FROM language_stats WHERE language = IFNULL(OLD.language, '(NULL)') AND repo_count <= 0;
+        UPDATE language_star_counts SET repo_count = repo_count - 1
+            WHERE language = IFNULL(OLD.language, '(NULL)') AND stars = IFNULL(OLD.stars, 0);
+        DELETE FROM language_star_counts
+            WHERE language = IFNULL(OLD.language, '(NULL)') AND stars = IFNULL(OLD.stars, 0) AND repo_count <= 0;
+    END;
+
+    CREATE TRIGGER repositories_stats_update AFTER UPDATE OF language, stars ON repositories
+    WHEN OLD.language IS NOT NEW.language OR OLD.stars IS NOT NEW.stars BEGIN
+        UPDATE language_stats
+            SET repo_count = repo_count - 1, total_stars = total_stars - IFNULL(OLD.stars, 0)
+            WHERE language = IFNULL(OLD.language, '(NULL)');
+        DELETE FROM language_stats WHERE language = IFNULL(OLD.language, '(NULL)') AND repo_count <= 0;
+        UPDATE language_star_counts SET repo_count = repo_count - 1
+            WHERE language = IFNULL(OLD.language, '(NULL)') AND stars = IFNULL(OLD.stars, 0);
+        DELETE FROM language_star_counts
+            WHERE language = IFNULL(OLD.language, '(NULL)') AND stars = IFNULL(OLD.stars, 0) AND repo_count <= 0;
+        INSERT INTO language_stats (language, repo_count, total_stars)
+            VALUES (IFNULL(NEW.language, '(NULL)'), 1, IFNULL(NEW.stars, 0))
+            ON CONFLICT(language) DO UPDATE
+            SET repo_count = repo_count + 1, total_stars = total_stars + excluded.total_stars;
+        INSERT INTO language_star_counts (language, stars, repo_count)
+            VALUES (IFNULL(NEW.language, '(NULL)'), IFNULL(NEW.stars, 0), 1)
+            ON CONFLICT(language, stars) DO UPDATE SET repo_count = repo_count + 1;
+    END;
+'''
+
+
+def init_analytics(conn):
+    """インデックス・集計テーブル・トリガーを作る
+
+    集計が空のとき、または NULL の言語を 'N/A' にまとめていた以前の集計が残っているときは
+    今の行から作り直す。
+    """
+    conn.execute(CREATE_REPOSITORIES_SQL)
+    conn.executescript(ANALYTICS_SCHEMA)
+    empty = conn.execute("SELECT 1 FROM language_stats LIMIT 1").fetchone() is None
+    if empty and conn.execute("SELECT 1 FROM repositories LIMIT 1").fetchone() is not None:
+        rebuild_aggregates(conn)
+    elif (conn.execute("SELECT 1 FROM repositories WHERE language IS NULL LIMIT 1").fetchone() is not None
+          and language_stats(conn, NULL_LANGUAGE) is None):
+        rebuild_aggregates(conn)
+
+
+def open_db(db_path=DB_NAME):
+    conn = sqlite3.connect(db_path)
+    init_analytics(conn)
+    return conn
+
+
+def rebuild_aggregates(conn):
+    """集計テーブルを repositories の全件から作り直す
+
+    トリガーを置く前に書かれた行や、INSERT OR REPLACE で書かれた行があるときに使う。
+    """
+    with conn:
+        conn.execute("DELETE FROM language_stats")
+        conn.execute("DELETE FROM language_star_counts")
+        conn.execute(f'''
+            INSERT INTO language_stats (language, repo_count, total_stars)
+            SELECT IFNULL(language, '{NULL_LANGUAGE}'), COUNT(*), SUM(IFNULL(stars, 0))
+            FROM repositories GROUP BY 1
+        ''')
+        conn.execute(f'''
+            INSERT INTO language_star_counts (language, stars, repo_count)
+            SELECT IFNULL(language, '{NULL_LANGUAGE}'), IFNULL(stars, 0), COUNT(*)
+            FROM repositories GROUP BY 1, 2
+        ''')
+
+
+def language_label(language):
+    """language_summary の language (NULL は None) を、言語を指定する関数に渡せるキーにする"""
+    return NULL_LANGUAGE if language is None else language
+
+
+def language_summary(conn, limit=None):
+    """[(language, 件数, スター合計, 平均スター), ...] を件数の多い順に返す
+
+    言語が NULL のグループは language を None にして、同じ件数の中では最後に並べる。
+    """
+    sql = f'''
+        SELECT NULLIF(language, '{NULL_LANGUAGE}'), repo_count, total_stars, CAST(total_stars AS REAL) / repo_count
+        FROM language_stats ORDER BY repo_count DESC, language = '{NULL_LANGUAGE}', language
+    '''
+    if limit is not None:
+        return conn.execute(sql + " LIMIT ?", (limit,)).fetchall()
+    return conn.execute(sql).fetchall()
+
+
+def _star_counts(conn, language):
+    """[(stars, 件数), ...] をスター数の昇順で返す (language=None なら全言語)"""
+    if language is None:
+        return conn.execute(
+            "SELECT stars, SUM(repo_count) FROM language_star_counts GROUP BY stars ORDER BY stars").fetchall()
+    return conn.execute(
+        "SELECT stars, repo_count FROM language_star_counts WHERE language = ? ORDER BY stars", (language,)).fetchall()
+
+
+def median_stars(conn, language=None):
+    """スター数の中央値 (件数が偶数なら中央の2つの平均)。リポジトリが無ければNone"""
+    counts = _star_counts(conn, language)
+    total = sum(n for _, n in counts)
+    if not total:
+        return None
+    lower, upper = (total - 1) // 2, total // 2
+    seen = 0
+    low_value = None
+    for stars, n in counts:
+        seen += n
+        if low_value is None and seen > lower:
+            low_value = stars
+        if seen > upper:
+            return (low_value + stars) / 2
+    return None
+
+
+def language_stats(conn, language):
+    """{"count", "total", "mean", "median"} を返す。無い言語ならNone"""
+    row = conn.execute("SELECT repo_count, total_stars FROM language_stats WHERE language = ?",
+                       (language,)).fetchone()
+    if row is None:
+        return None
+    count, total = row
+    return {"count": count, "total": total, "mean": total / count, "median": median_stars(conn, language)}
+
+
+def top_repos(conn, language=None, k=10):
+    """スター数の多い順にK件の (repo_name, language, stars) を返す
+
+    language=None なら全言語、NULL_LANGUAGE なら言語が NULL の行だけ。
+    """
+    if language is None:
+        return conn.execute(
+            "SELECT repo_name, language, stars FROM repositories ORDER BY stars DESC LIMIT ?", (k,)).fetchall()
+    if language == NULL_LANGUAGE:
+        return conn.execute(
+            "SELECT repo_name, language, stars FROM repositories WHERE language IS NULL ORDER BY stars DESC LIMIT ?",
+            (k,)).fetchall()
+    return conn.execute(
+        "SELECT repo_name, language, stars FROM repositories WHERE language = ? ORDER BY stars DESC LIMIT ?",
+        (language, k)).fetchall()
+
+
+def star_histogram(conn, language=None):
+    """スター数を 0, 1, 2-3, 4-7, ... の区間に分けた [(下限, 上限, 件数), ...] を返す"""
+    buckets = {}
+    for stars, n in _star_counts(conn, language):
+        bucket = max(stars, 0).bit_length()
+        buckets[bucket] = buckets.get(bucket, 0) + n
+    return [
+        (0 if b == 0 else 1 << (b - 1), 0 if b == 0 else (1 << b) - 1, buckets[b])
+        for b in sorted(buckets)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["summary", "top", "hist", "rebuild"])
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--language")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    conn = open_db(args.db)
+    try:
+        if args.command == "rebuild":
+            rebuild_aggregates(conn)
+        elif args.command == "summary":
+            for language, count, total, mean in language_summary(conn, args.k):
+                label = language_label(language)
+                print(f"{label:<20} {count:>8,}件  スター合計 {total:>12,}  平均 {mean:>8.1f}  "
+                      f"中央値 {median_stars(conn, label):>8.1f}")
+        elif args.command == "top":
+            for name, language, stars in top_repos(conn, args.language, args.k):
+                print(f"{name:<50} {language_label(language):<15} {stars:>8,}")
+        else:
+            for lo, hi, n in star_histogram(conn, args.language):
+                print(f"{lo:>8,} - {hi:>8,}: {n:>10,}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
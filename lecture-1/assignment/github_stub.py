@@ -0,0 +1,195 @@
+"""GitHubのorganizationリポジトリ一覧ページを返すローカルHTTPサーバー
+
+acme の1〜3ページ目は fixtures/synthetic/ のHTMLを返し、それ以外のページは
+同じ形式のHTMLをその場で合成して返す。--pages より後ろのページは空の一覧になる。
+どちらも render_org_page で作った合成ページで、GitHubから保存したものではない
+(GitHubの実際のページは github_scraper.py --save-pages で fixtures/github/ に保存する)。
+(ナビゲーションのリンクは /{org}/ を含まない形にしてあるので、空のページからは何も取れない)
+
+    python github_stub.py --port 8766 --pages 50
+    python github_scraper.py acme --base-url http://127.0.0.1:8766
+"""
+import argparse
+import glob
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BASE_DIR, 'fixtures')
+# render_org_page で作ってファイルにしたページ
+SYNTHETIC_DIR = os.path.join(FIXTURE_DIR, 'synthetic')
+FIXTURE_ORG = "acme"
+# github.com から保存した一覧ページ ({org}_page_N.html)
+SAVED_PAGES_DIR = os.path.join(FIXTURE_DIR, 'github')
+
+ORG_PATH_RE = re.compile(r"^/orgs/([^/]+)/repositories$")
+LANGUAGES = ["Python", "Go", "C++", "TypeScript", "Java", "Rust", "Kotlin", None]
+
+PAGE_HEAD = """<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>{org} repositories</title></head>
+<body>
+<header><nav><a href="/{org}">Overview</a> <a href="/{org}?tab=repositories">Repositories</a>
+<a href="/{org}?tab=projects">Projects</a> <a href="/{org}?tab=people">People</a></nav></header>
+<main><div id="org-repositories"><div class="Box"><ul data-filterable-for="your-repos-filter">
+"""
+REPO_ITEM = """<li class="Box-row" itemprop="owns" itemscope itemtype="http://schema.org/Code">
+  <div class="d-flex flex-justify-between">
+    <h3 class="wb-break-all"><a href="/{org}/{name}" data-hovercard-type="repository" itemprop="name codeRepository" class="d-inline-block">{name}</a></h3>
+  </div>
+  <p class="color-fg-muted mb-0 wb-break-word" itemprop="description">{description}</p>
+  <div class="f6 color-fg-muted mt-2">
+    {language}<a class="Link--muted mr-3" href="/{org}/{name}/stargazers"><svg aria-label="stars" class="octicon octicon-star" height="16" width="16"></svg> {stars}</a>
+    <a class="Link--muted mr-3" href="/{org}/{name}/forks"><svg aria-label="fork" class="octicon octicon-repo-forked" height="16" width="16"></svg> {forks}</a>
+    <span class="no-wrap">Updated <relative-time datetime="2026-10-0{day}T12:00:00Z">Oct {day}, 2026</relative-time></span>
+  </div>
+</li>
+"""
+LANGUAGE_SPAN = """<span class="mr-3"><span class="repo-language-color" style="background-color: #3572A5"></span> <span itemprop="programmingLanguage">{language}</span></span>
+    """
+PAGE_TAIL = """</ul></div>
+<div class="paginate-container"><div class="pagination">{pagination}</div></div>
+</div></main>
+</body></html>
+"""
+
+
+def format_stars(stars):
+    """GitHubの表示形式 (1,234 / 12.3k) にする"""
+    if stars >= 1000:
+        return f"{stars / 1000:.1f}k".replace(".0k", "k")
+    return f"{stars:,}"
+
+
+def render_org_page(org, page, per_page=30, pages=3, seed=0):
+    """page番目の一覧ページのHTMLを作る (pagesより後ろは空の一覧)"""
+    rng = random.Random(f"{org}:{page}:{seed}")
+    items = []
+    if page <= pages:
+        for i in range(per_page):
+            name = f"{org}-repo-{(page - 1) * per_page + i + 1:05d}"
+            language = rng.choice(LANGUAGES)
+            items.append(REPO_ITEM.format(
+                org=org,
+                name=name,
+                description=f"Sample project {name} " + "lorem ipsum " * rng.randint(1, 8),
+                language=LANGUAGE_SPAN.format(language=language) if language else "",
+                stars=format_stars(int(rng.paretovariate(1.2) * 10) - 10),
+                forks=rng.randint(0, 500),
+                day=rng.randint(1, 9),
+            ))
+    links = []
+    if page > 1:
+        links.append(f'<a class="previous_page" href="?page={page - 1}">Previous</a>')
+    if page < pages:
+        links.append(f'<a class="next_page" href="?page={page + 1}">Next</a>')
+    return PAGE_HEAD.format(org=org) + "".join(items) + PAGE_TAIL.format(pagination=" ".join(links))
+
+
+def fixture_path(page):
+    return os.path.join(SYNTHETIC_DIR, f"{FIXTURE_ORG}_page_{page}.html")
+
+
+def saved_pages(directory=SAVED_PAGES_DIR):
+    """保存した一覧ページの [(org, path), ...] (ファイル名の "_page_" より前をorganization名とする)"""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, "*_page_*.html"))):
+        org = os.path.basename(path).rsplit("_page_", 1)[0]
+        pages.append((org, path))
+    return pages
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # ヘッダーと本体を別々に書くので、Nagle と遅延ACKで1往復40msほど待たされないようにする
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        server.request_count += 1
+        if server.latency:
+            time.sleep(server.latency)
+        url = urlsplit(self.path)
+        m = ORG_PATH_RE.match(url.path)
+        if not m:
+            self._send(404, b"not found")
+            return
+        org = m.group(1)
+        page = int(parse_qs(url.query).get("page", ["1"])[0])
+        body = server.overrides.get((org, page))
+        if body is None and org == FIXTURE_ORG and os.path.exists(fixture_path(page)):
+            with open(fixture_path(page), "rb") as f:
+                body = f.read()
+        if body is None:
+            body = render_org_page(org, page, server.per_page, server.pages, server.seed).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            server.not_modified_count += 1
+            self._send(304, b"", etag)
+            return
+        self._send(200, body, etag)
+
+    def _send(self, status, body, etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(host="127.0.0.1", port=0, pages=3, per_page=30, latency=0.0, seed=0):
+    """スタブサーバーを別スレッドで起動し、(server, base_url) を返す
+
+    server.overrides[(org, page)] にbytesを入れると、そのページの内容を差し替えられる。
+    レスポンスには内容から作ったETagを付け、If-None-Matchが一致すれば 304 を返す。
+    """
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.pages = pages
+    server.per_page = per_page
+    server.latency = latency
+    server.seed = seed
+    server.request_count = 0
+    server.not_modified_count = 0
+    server.overrides = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--per-page", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--save-fixtures", action="store_true", help="fixtures/synthetic/ に acme の合成ページを書き出して終了する")
+    args = parser.parse_args()
+
+    if args.save_fixtures:
+        os.makedirs(SYNTHETIC_DIR, exist_ok=True)
+        for page in range(1, args.pages + 1):
+            with open(fixture_path(page), "w", encoding="utf-8") as f:
+                f.write(render_org_page(FIXTURE_ORG, page, args.per_page, args.pages))
+        return
+
+    server, base_url = start_stub_server(port=args.port, pages=args.pages, per_page=args.per_page, latency=args.latency)
+    print(f"GitHub stub server: {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
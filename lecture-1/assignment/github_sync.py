@@ -0,0 +1,242 @@
+"""repositories テーブルを差分で同期する (全削除 -> 全件挿入 をしない)
+
+github_repos.db に次のテーブルを足して、前回の取得結果を覚えておく。
+
+- sync_state: organizationごとの実行状態 (実行中なら、どのページまで終わったか)
+- sync_pages: ページごとのHTMLのハッシュ・ETag・抽出した行のハッシュ
+- sync_repos: どのリポジトリがどのページにあったかと、最後に一覧で見た実行 (seen_run)
+
+repositories には organization の列が無いので、新しい実行を始めるときに sync_repos に無い行
+(ノートブックや以前のスクレイピングで入れたもの) を、同期する organization のものとして登録する。
+
+ページは条件付きGET (If-None-Match) で取得し、304 やHTMLが同じときは解析もしない。
+HTMLが変わっていても抽出した行が同じなら書き込まない。行が変わったページだけ、値の違う行をupsertする。
+削除は一覧を最後のページまで取得し終えてから行い、今回の実行で一度も見なかったリポジトリだけを消す
+(ページをまたいで移動したリポジトリを消して入れ直すことはない)。
+1ページ分の書き込みとチェックポイントの更新は1つのトランザクションなので、
+途中で落ちても次の実行は最後に終わったページの次から再開する。
+
+    python github_sync.py google
+    python github_sync.py acme --base-url http://127.0.0.1:8766 --rate 0
+"""
+import argparse
+import hashlib
+import sqlite3
+import time
+
+from github_extract import EXTRACTORS
+from github_scraper import (
+    CREATE_REPOSITORIES_SQL, DB_NAME, GITHUB_URL, FetchError, PageFetcher, iter_page_rows,
+)
+
+SYNC_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS sync_state (
+        org TEXT PRIMARY KEY,
+        run_id INTEGER NOT NULL,
+        status TEXT NOT NULL,           -- 'running' / 'done'
+        last_page INTEGER NOT NULL,     -- この実行で書き込みが終わった最後のページ
+        started_at REAL,
+        finished_at REAL
+    );
+    CREATE TABLE IF NOT EXISTS sync_pages (
+        org TEXT NOT NULL,
+        page INTEGER NOT NULL,
+        content_hash TEXT,
+        etag TEXT,
+        rows_hash TEXT,
+        repo_count INTEGER,
+        PRIMARY KEY (org, page)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS sync_repos (
+        org TEXT NOT NULL,
+        repo_name TEXT NOT NULL,
+        page INTEGER NOT NULL,
+        seen_run INTEGER,               -- 最後に一覧で見た run_id
+        PRIMARY KEY (org, repo_name)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_sync_repos_page ON sync_repos(org, page);
+'''
+
+# 古い sync_repos に後から追加した列
+SYNC_REPOS_EXTRA_COLUMNS = (
+    ("seen_run", "INTEGER"),
+)
+# どの organization にも登録されていない repositories の行を、同期する organization のものとして登録する
+SEED_SYNC_REPOS_SQL = '''
+    INSERT OR IGNORE INTO sync_repos (org, repo_name, page, seen_run)
+    SELECT ?, repo_name, 0, NULL FROM repositories
+    WHERE repo_name NOT IN (SELECT repo_name FROM sync_repos)
+'''
+MARK_REPO_SQL = "INSERT OR REPLACE INTO sync_repos (org, repo_name, page, seen_run) VALUES (?, ?, ?, ?)"
+
+# 値が変わらない行は書き換えない (changes() にも数えられない)
+UPSERT_REPOSITORY_SQL = '''
+    INSERT INTO repositories (repo_name, language, stars) VALUES (?, ?, ?)
+    ON CONFLICT(repo_name) DO UPDATE SET language = excluded.language, stars = excluded.stars
+    WHERE language IS NOT excluded.language OR stars IS NOT excluded.stars
+'''
+
+
+def init_sync_db(db_path=DB_NAME):
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(CREATE_REPOSITORIES_SQL)
+    conn.executescript(SYNC_SCHEMA)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(sync_repos)")}
+    for name, col_type in SYNC_REPOS_EXTRA_COLUMNS:
+        if name not in columns:
+            conn.execute(f"ALTER TABLE sync_repos ADD COLUMN {name} {col_type}")
+    return conn
+
+
+def rows_hash(rows):
+    h = hashlib.sha1()
+    for name, language, stars in rows:
+        h.update(f"{name}\t{language}\t{stars}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def begin_run(conn, org):
+    """(run_id, 開始ページ) を返す。前回が途中で終わっていればその続きから (呼び出し側のトランザクションの中で使う)"""
+    row = conn.execute("SELECT run_id, status, last_page FROM sync_state WHERE org = ?", (org,)).fetchone()
+    if row and row[1] == "running":
+        return row[0], row[2] + 1
+    run_id = row[0] + 1 if row else 1
+    conn.execute(
+        "INSERT OR REPLACE INTO sync_state (org, run_id, status, last_page, started_at) VALUES (?, ?, 'running', 0, ?)",
+        (org, run_id, time.time()),
+    )
+    conn.execute(SEED_SYNC_REPOS_SQL, (org,))
+    return run_id, 1
+
+
+def known_pages(conn, org):
+    return {
+        page: (content_hash, etag)
+        for page, content_hash, etag in conn.execute(
+            "SELECT page, content_hash, etag FROM sync_pages WHERE org = ?", (org,))
+    }
+
+
+def apply_page(conn, org, run_id, page, stats):
+    """1ページ分を書き込む (呼び出し側のトランザクションの中で使う)"""
+    if page.rows is None:
+        # HTMLが前回と同じ (304 を含む)。ETagが変わっていれば覚え直し、前回このページにあったものを見たことにする
+        conn.execute("UPDATE sync_pages SET etag = ? WHERE org = ? AND page = ? AND etag IS NOT ?",
+                     (page.etag, org, page.number, page.etag))
+        conn.execute("UPDATE sync_repos SET seen_run = ? WHERE org = ? AND page = ?", (run_id, org, page.number))
+        stats["pages_skipped"] += 1
+        return
+
+    digest = rows_hash(page.rows)
+    prev = conn.execute("SELECT rows_hash FROM sync_pages WHERE org = ? AND page = ?",
+                        (org, page.number)).fetchone()
+    conn.execute(
+        "INSERT OR REPLACE INTO sync_pages (org, page, content_hash, etag, rows_hash, repo_count) VALUES (?, ?, ?, ?, ?, ?)",
+        (org, page.number, page.content_hash, page.etag, digest, len(page.rows)),
+    )
+    # 別のページから移ってきたものは page を付け替えるだけ (削除は finish_run でまとめて行う)
+    conn.executemany(MARK_REPO_SQL, [(org, row[0], page.number, run_id) for row in page.rows])
+    if prev and prev[0] == digest:
+        stats["pages_skipped"] += 1
+        return
+
+    stats["pages_changed"] += 1
+    before = conn.total_changes
+    conn.executemany(UPSERT_REPOSITORY_SQL, page.rows)
+    stats["rows_changed"] += conn.total_changes - before
+
+
+def _delete_repos(conn, org, names, stats):
+    params = [(org, name) for name in names]
+    conn.executemany("DELETE FROM sync_repos WHERE org = ? AND repo_name = ?", params)
+    before = conn.total_changes
+    conn.executemany("DELETE FROM repositories WHERE repo_name = ?", [(name,) for name in names])
+    stats["rows_deleted"] += conn.total_changes - before
+
+
+def finish_run(conn, org, run_id, last_page, stats):
+    """一覧の全ページを取得し終えたあとで、今回一度も見なかったリポジトリと余ったページを消して完了にする"""
+    gone = [name for (name,) in conn.execute(
+        "SELECT repo_name FROM sync_repos WHERE org = ? AND seen_run IS NOT ?", (org, run_id))]
+    if gone:
+        _delete_repos(conn, org, gone, stats)
+    conn.execute("DELETE FROM sync_pages WHERE org = ? AND page > ?", (org, last_page))
+    conn.execute("UPDATE sync_state SET status = 'done', finished_at = ? WHERE org = ?", (time.time(), org))
+
+
+def sync_org(organization_name, db_path=DB_NAME, base_url=GITHUB_URL, concurrency=4, rate=1.0,
+             parse_workers=2, extractor="fast", max_pages=None):
+    """organizationのリポジトリ一覧を差分で同期して、統計の辞書を返す
+
+    max_pages で止めたときやページの取得に失敗したときは実行中のままになり、
+    次の呼び出しがその続きから再開する。
+    """
+    stats = {
+        "pages": 0, "pages_skipped": 0, "pages_changed": 0, "not_modified": 0,
+        "rows_changed": 0, "rows_deleted": 0, "bytes": 0,
+        "resumed_from": None, "complete": False, "error": None,
+    }
+    conn = init_sync_db(db_path)
+    fetcher = PageFetcher(organization_name, base_url, rate=rate, pool_size=concurrency)
+    started = time.perf_counter()
+    try:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            run_id, start_page = begin_run(conn, organization_name)
+        if start_page > 1:
+            stats["resumed_from"] = start_page
+            print(f"前回の実行 (run {run_id}) のページ {start_page} から再開します")
+        last_page = start_page - 1
+        pages = iter_page_rows(organization_name, fetcher, concurrency, parse_workers, max_pages, stats,
+                               extractor, start_page=start_page,
+                               known_pages=known_pages(conn, organization_name))
+        try:
+            for page in pages:
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    apply_page(conn, organization_name, run_id, page, stats)
+                    conn.execute("UPDATE sync_state SET last_page = ? WHERE org = ?",
+                                 (page.number, organization_name))
+                last_page = page.number
+        except FetchError as e:
+            print(f"リクエストエラー: {e}")
+            stats["error"] = str(e)
+        if stats["complete"]:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                finish_run(conn, organization_name, run_id, last_page, stats)
+    finally:
+        conn.close()
+        fetcher.close()
+    stats["not_modified"] = fetcher.not_modified
+    stats["bytes"] = fetcher.bytes_received
+    stats["elapsed"] = time.perf_counter() - started
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("organization")
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--base-url", default=GITHUB_URL)
+    parser.add_argument("--concurrency", type=int, default=4, help="同時に先読みするページ数")
+    parser.add_argument("--rate", type=float, default=1.0, help="秒間リクエスト数 (0で無制限)")
+    parser.add_argument("--parse-workers", type=int, default=2, help="解析プロセス数 (0でメインスレッド)")
+    parser.add_argument("--extractor", choices=sorted(EXTRACTORS), default="fast", help="HTMLの解析方法")
+    parser.add_argument("--max-pages", type=int, default=None, help="このページまでで止める (次回はその続きから)")
+    args = parser.parse_args()
+
+    stats = sync_org(
+        args.organization, args.db, args.base_url, args.concurrency, args.rate,
+        args.parse_workers, args.extractor, args.max_pages,
+    )
+    print(f"\n{stats['pages']}ページ (変更 {stats['pages_changed']}, スキップ {stats['pages_skipped']}, "
+          f"304 {stats['not_modified']}) / 行の変更 {stats['rows_changed']}, 削除 {stats['rows_deleted']} / "
+          f"受信 {stats['bytes'] / 1024:.0f} KiB, {stats['elapsed']:.1f}秒"
+          + ("" if stats["complete"] else " (未完了: 次回はこの続きから)"))
+
+
+if __name__ == "__main__":
+    main()
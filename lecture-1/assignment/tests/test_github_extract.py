@@ -0,0 +1,78 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("bs4")
+from github_extract import extract_repos_bs4, extract_repos_fast  # noqa: E402
+from github_stub import FIXTURE_ORG, fixture_path, render_org_page, saved_pages  # noqa: E402
+
+ORG = "octo"
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def row(name, inner, icon=False):
+    link = f'<a href="/{ORG}/{name}" data-hovercard-type="repository">{name}</a>'
+    if icon:
+        link = f'<a href="/{ORG}/{name}" data-hovercard-type="repository"><img alt=""></a>\n' + link
+    return f'<li class="Box-row">{link}<div class="f6 color-fg-muted">{inner}</div></li>\n'
+
+
+LANGUAGE = '<span class="mr-3"><span itemprop="programmingLanguage">{}</span></span>'
+STARS = '<a class="Link--muted mr-3" href="/{}/{}/stargazers"><svg aria-label="stars"></svg>\n  {}\n</a>'
+
+# 合成ページ (render_org_page) に無い書き方
+VARIANTS = {
+    "no_language": row("a", STARS.format(ORG, "a", "7")),
+    "no_stars": row("a", LANGUAGE.format("Go")),
+    "thousands": row("a", LANGUAGE.format("C++") + STARS.format(ORG, "a", "12.3k"))
+    + row("b", STARS.format(ORG, "b", "1,234")),
+    "icon_link": row("a", LANGUAGE.format("Go") + STARS.format(ORG, "a", "5"), icon=True)
+    + row("b", LANGUAGE.format("Rust") + STARS.format(ORG, "b", "6"), icon=True),
+    "single_quotes": "<li class='Box-row'><a data-hovercard-type='repository' href='/octo/a'>a</a>"
+    "<span itemprop='programmingLanguage'>Jupyter Notebook</span>"
+    "<a href='/octo/a/stargazers'>3</a></li>",
+    "entities": row("a-b", LANGUAGE.format("C&#35;") + STARS.format(ORG, "a-b", "1")),
+    "no_hovercard": '<li class="Box-row"><h3><a href="/octo/a">a</a></h3>'
+    '<span itemprop="programmingLanguage">Go</span></li>',
+}
+
+
+def test_saved_github_pages_match_bs4():
+    pages = saved_pages()
+    if not pages:
+        pytest.skip("GitHubから保存した一覧ページがありません (github_scraper.py ORG --save-pages fixtures/github)")
+    for org, path in pages:
+        html = read(path)
+        assert extract_repos_fast(html, org) == extract_repos_bs4(html, org), path
+
+
+@pytest.mark.parametrize("page", [1, 2, 3])
+def test_synthetic_fixtures_match_bs4(page):
+    html = read(fixture_path(page))
+    rows = extract_repos_fast(html, FIXTURE_ORG)
+    assert rows and rows == extract_repos_bs4(html, FIXTURE_ORG)
+
+
+@pytest.mark.parametrize("name", sorted(VARIANTS))
+def test_markup_variants_match_bs4(name):
+    html = f"<html><body><ul>{VARIANTS[name]}</ul></body></html>"
+    rows = extract_repos_fast(html, ORG)
+    assert rows and rows == extract_repos_bs4(html, ORG)
+
+
+def test_icon_link_keeps_language_and_stars():
+    html = f"<ul>{VARIANTS['icon_link']}</ul>"
+    assert ("a", "Go", 5) in extract_repos_fast(html, ORG)
+    assert ("b", "Rust", 6) in extract_repos_fast(html, ORG)
+
+
+def test_empty_page():
+    html = render_org_page(ORG, 2, pages=1)
+    assert extract_repos_fast(html, ORG) == extract_repos_bs4(html, ORG) == []
@@ -0,0 +1,92 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+# lecture_common は pip install -e lecture-common していなくても読めるようにする
+sys.path.append(os.path.join(TESTS_DIR, os.pardir, os.pardir, os.pardir, "lecture-common", "src"))
+
+from github_extract import extract_repos_fast  # noqa: E402
+from github_scraper import FetchError, PageFetcher, save_pages, scrape_github_repos, scrape_to_db  # noqa: E402
+from github_stub import FIXTURE_ORG, render_org_page, saved_pages, start_stub_server  # noqa: E402
+
+ORG = "octo"
+PAGES = 4
+PER_PAGE = 5
+
+
+@pytest.fixture
+def stub():
+    server, base_url = start_stub_server(pages=PAGES, per_page=PER_PAGE)
+    yield server, base_url
+    server.shutdown()
+    server.server_close()
+
+
+def expected_rows(org=ORG):
+    rows = []
+    for page in range(1, PAGES + 1):
+        rows.extend(extract_repos_fast(render_org_page(org, page, PER_PAGE, PAGES), org))
+    return rows
+
+
+@pytest.mark.parametrize("parse_workers", [0, 2])
+def test_scrape_yields_every_page_in_order(stub, parse_workers):
+    _, base_url = stub
+    rows = list(scrape_github_repos(ORG, base_url, concurrency=3, rate=0, parse_workers=parse_workers))
+    assert rows == expected_rows()
+
+
+def test_max_pages(stub):
+    _, base_url = stub
+    rows = list(scrape_github_repos(ORG, base_url, rate=0, parse_workers=0, max_pages=2))
+    assert rows == expected_rows()[:2 * PER_PAGE]
+
+
+def test_saved_fixture_pages_are_served(stub):
+    server, base_url = stub
+    rows = list(scrape_github_repos(FIXTURE_ORG, base_url, rate=0, parse_workers=0, max_pages=1))
+    assert rows and server.request_count >= 1
+
+
+def test_scrape_to_db_commits_in_batches(stub, tmp_path):
+    _, base_url = stub
+    db_path = str(tmp_path / "repos.db")
+    stats = scrape_to_db(ORG, db_path, base_url, rate=0, parse_workers=0, batch_size=PER_PAGE * 2)
+    assert stats["error"] is None
+    assert stats["rows"] == PAGES * PER_PAGE
+    assert stats["commits"] == 3  # 2ページずつ2回と、最後の空のページの後の1回
+    conn = sqlite3.connect(db_path)
+    stored = conn.execute("SELECT repo_name, language, stars FROM repositories ORDER BY repo_name").fetchall()
+    conn.close()
+    assert stored == sorted(expected_rows())
+
+
+def test_second_run_is_revalidated(stub, tmp_path):
+    server, base_url = stub
+    db_path = str(tmp_path / "repos.db")
+    cache_dir = str(tmp_path / "http_cache")
+    scrape_to_db(ORG, db_path, base_url, rate=0, parse_workers=0, cache_dir=cache_dir)
+    stats = scrape_to_db(ORG, db_path, base_url, rate=0, parse_workers=0, cache_dir=cache_dir)
+    assert stats["rows"] == PAGES * PER_PAGE
+    # 先読みで終わりより後ろのページをいくつ取るかは実行ごとに違うので、1〜5ページ目 (5は空) だけ数える
+    assert stats["http"]["not_modified"] >= PAGES + 1
+    assert server.not_modified_count == stats["http"]["not_modified"]
+
+
+def test_fetch_error_after_retries():
+    fetcher = PageFetcher(ORG, "http://127.0.0.1:9", rate=0, retries=1, backoff=0, timeout=1)
+    with pytest.raises(FetchError):
+        fetcher.fetch(1)
+    fetcher.close()
+
+
+def test_save_pages(stub, tmp_path):
+    _, base_url = stub
+    paths = save_pages(ORG, str(tmp_path), pages=2, base_url=base_url, rate=0)
+    assert [org for org, _ in saved_pages(str(tmp_path))] == [ORG, ORG]
+    with open(paths[1], encoding="utf-8") as f:
+        assert f.read() == render_org_page(ORG, 2, PER_PAGE, PAGES)
@@ -0,0 +1,114 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+# lecture_common は pip install -e lecture-common していなくても読めるようにする
+sys.path.append(os.path.join(TESTS_DIR, os.pardir, os.pardir, os.pardir, "lecture-common", "src"))
+
+import github_stats  # noqa: E402
+from github_scraper import CREATE_REPOSITORIES_SQL, INSERT_REPOSITORY_SQL  # noqa: E402
+from github_stats import NO_LANGUAGE, NULL_LANGUAGE  # noqa: E402
+
+REPOS = [
+    ("a", "Python", 10), ("b", "Python", 30), ("c", NO_LANGUAGE, 5),
+    ("d", None, 7), ("e", None, None), ("f", "Go", 1), ("g", "Go", 1),
+]
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = github_stats.open_db(str(tmp_path / "repos.db"))
+    with conn:
+        conn.executemany(INSERT_REPOSITORY_SQL, REPOS)
+    yield conn
+    conn.close()
+
+
+def aggregates(conn):
+    return (conn.execute("SELECT * FROM language_stats ORDER BY 1").fetchall(),
+            conn.execute("SELECT * FROM language_star_counts ORDER BY 1, 2").fetchall())
+
+
+def recomputed(conn):
+    """repositories の全件を GROUP BY し直した集計 (トリガーで保っている集計と同じになるはず)"""
+    stats = conn.execute(f'''
+        SELECT IFNULL(language, '{NULL_LANGUAGE}'), COUNT(*), SUM(IFNULL(stars, 0))
+        FROM repositories GROUP BY 1 ORDER BY 1
+    ''').fetchall()
+    star_counts = conn.execute(f'''
+        SELECT IFNULL(language, '{NULL_LANGUAGE}'), IFNULL(stars, 0), COUNT(*)
+        FROM repositories GROUP BY 1, 2 ORDER BY 1, 2
+    ''').fetchall()
+    return stats, star_counts
+
+
+def test_insert_keeps_aggregates(conn):
+    assert aggregates(conn) == recomputed(conn)
+    assert github_stats.language_stats(conn, NULL_LANGUAGE)["count"] == 2
+    assert github_stats.language_stats(conn, NO_LANGUAGE)["count"] == 1
+
+
+@pytest.mark.parametrize("row", [
+    ("a", "Python", 11),  # スター数だけ
+    ("a", "Rust", 10),  # 言語だけ (新しい言語)
+    ("c", None, 5),  # 'N/A' -> NULL
+    ("d", NO_LANGUAGE, 7),  # NULL -> 'N/A'
+    ("e", None, 3),  # NULL のスター数 -> 数
+    ("f", "Go", None),  # 数 -> NULL のスター数
+    ("f", "Go", 1),  # 変わらない
+])
+def test_upsert_keeps_aggregates(conn, row):
+    with conn:
+        conn.execute(INSERT_REPOSITORY_SQL, row)
+    assert aggregates(conn) == recomputed(conn)
+
+
+def test_update_and_delete_keep_aggregates(conn):
+    with conn:
+        conn.execute("UPDATE repositories SET language = NULL WHERE language = 'Python'")
+        conn.execute("UPDATE repositories SET stars = stars * 2")
+    assert aggregates(conn) == recomputed(conn)
+    with conn:
+        conn.execute("DELETE FROM repositories WHERE repo_name IN ('d', 'f')")
+    assert aggregates(conn) == recomputed(conn)
+    with conn:
+        conn.execute("DELETE FROM repositories")
+    assert aggregates(conn) == ([], [])
+
+
+def test_null_language_is_its_own_group(conn):
+    assert github_stats.language_summary(conn) == [
+        ("Go", 2, 2, 1.0),
+        ("Python", 2, 40, 20.0),
+        (None, 2, 7, 3.5),
+        (NO_LANGUAGE, 1, 5, 5.0),
+    ]
+    assert github_stats.median_stars(conn, NULL_LANGUAGE) == 3.5
+    assert github_stats.top_repos(conn, NO_LANGUAGE) == [("c", NO_LANGUAGE, 5)]
+    assert github_stats.top_repos(conn, NULL_LANGUAGE) == [("d", None, 7), ("e", None, None)]
+
+
+def test_aggregates_that_merged_null_into_na_are_rebuilt(conn):
+    # 以前のトリガーの集計: NULL の行が 'N/A' に数えられていて '(NULL)' のキーが無い
+    with conn:
+        conn.execute(f"DELETE FROM language_stats WHERE language = '{NULL_LANGUAGE}'")
+        conn.execute(f"UPDATE language_stats SET repo_count = 3, total_stars = 12 WHERE language = '{NO_LANGUAGE}'")
+    github_stats.init_analytics(conn)
+    assert aggregates(conn) == recomputed(conn)
+
+
+def test_triggers_are_replaced(tmp_path):
+    path = str(tmp_path / "old.db")
+    old = sqlite3.connect(path)
+    old.execute(CREATE_REPOSITORIES_SQL)
+    old.executescript(github_stats.ANALYTICS_SCHEMA.replace(f"'{NULL_LANGUAGE}'", f"'{NO_LANGUAGE}'"))
+    old.close()
+    conn = github_stats.open_db(path)
+    with conn:
+        conn.executemany(INSERT_REPOSITORY_SQL, REPOS)
+    assert aggregates(conn) == recomputed(conn)
+    conn.close()
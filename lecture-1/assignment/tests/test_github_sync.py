@@ -0,0 +1,97 @@
+import os
+import re
+import sqlite3
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+# lecture_common は pip install -e lecture-common していなくても読めるようにする
+sys.path.append(os.path.join(TESTS_DIR, os.pardir, os.pardir, os.pardir, "lecture-common", "src"))
+
+from github_stub import render_org_page, start_stub_server  # noqa: E402
+from github_sync import init_sync_db, sync_org  # noqa: E402
+
+ORG = "octo"
+ITEM_RE = re.compile(r'<li class="Box-row".*?</li>\n', re.S)
+
+
+@pytest.fixture
+def stub():
+    server, base_url = start_stub_server(pages=2, per_page=3)
+    yield server, base_url
+    server.shutdown()
+    server.server_close()
+
+
+def sync(db_path, base_url, **kwargs):
+    return sync_org(ORG, str(db_path), base_url, concurrency=2, rate=0, parse_workers=0, **kwargs)
+
+
+def repo_names(db_path):
+    conn = sqlite3.connect(db_path)
+    names = {name for (name,) in conn.execute("SELECT repo_name FROM repositories")}
+    conn.close()
+    return names
+
+
+def listing(page, items, pages=2):
+    """render_org_page と同じ形で、一覧の項目だけを items にしたページ"""
+    html = render_org_page(ORG, page, per_page=3, pages=pages)
+    start = html.index('<li class="Box-row"')
+    end = html.rindex("</li>\n") + len("</li>\n")
+    return (html[:start] + "".join(items) + html[end:]).encode("utf-8")
+
+
+def test_rows_inserted_outside_the_sync_are_pruned(stub, tmp_path):
+    server, base_url = stub
+    db_path = tmp_path / "repos.db"
+    conn = init_sync_db(str(db_path))
+    # ノートブックで入れた行 (sync_repos には載っていない)
+    conn.execute("INSERT INTO repositories VALUES ('old-notebook-repo', 'Python', 3)")
+    conn.close()
+
+    stats = sync(db_path, base_url)
+    assert stats["complete"]
+    assert stats["rows_deleted"] == 1
+    assert repo_names(db_path) == {f"{ORG}-repo-{i:05d}" for i in range(1, 7)}
+
+
+def test_repo_moving_to_the_next_page_is_not_deleted_and_reinserted(stub, tmp_path):
+    server, base_url = stub
+    db_path = tmp_path / "repos.db"
+    sync(db_path, base_url)
+
+    page1 = ITEM_RE.findall(render_org_page(ORG, 1, per_page=3, pages=2))
+    page2 = ITEM_RE.findall(render_org_page(ORG, 2, per_page=3, pages=2))
+    # 1ページ目の最後のリポジトリが2ページ目の先頭に移る
+    server.overrides[(ORG, 1)] = listing(1, page1[:2])
+    server.overrides[(ORG, 2)] = listing(2, page1[2:] + page2)
+
+    stats = sync(db_path, base_url)
+    assert stats["complete"]
+    assert stats["pages_changed"] == 2
+    assert stats["rows_changed"] == 0
+    assert stats["rows_deleted"] == 0
+    assert len(repo_names(db_path)) == 6
+
+
+def test_nothing_is_deleted_until_the_listing_is_complete(stub, tmp_path):
+    server, base_url = stub
+    db_path = tmp_path / "repos.db"
+    sync(db_path, base_url)
+    page1 = ITEM_RE.findall(render_org_page(ORG, 1, per_page=3, pages=2))
+    server.overrides[(ORG, 1)] = listing(1, page1[:1])  # 1ページ目の2件が消えた
+
+    stats = sync(db_path, base_url, max_pages=1)
+    assert not stats["complete"]
+    assert stats["rows_deleted"] == 0
+    assert len(repo_names(db_path)) == 6
+
+    # 続きから再開して一覧を最後まで取得した時点で消える
+    stats = sync(db_path, base_url)
+    assert stats["complete"]
+    assert stats["resumed_from"] == 2
+    assert stats["rows_deleted"] == 2
+    assert repo_names(db_path) == {f"{ORG}-repo-{i:05d}" for i in (1, 4, 5, 6)}
@@ -1,8 +1,51 @@
+import json
+import os
+import threading
+
 import flet as ft
 import requests
+# 共有のHTTPクライアント (keep-alive と条件付きGETのキャッシュ) とUIのワーカー (pip install -e lecture-common)
+from lecture_common.http_client import shared_client
+from lecture_common.ui_worker import LatencyProbe, LatestRequestRunner
 
 AREA_URL = "https://www.jma.go.jp/bosai/common/const/area.json"
 FORECAST_URL = "https://www.jma.go.jp/bosai/forecast/data/forecast/{}.json"
+# 前回取得したarea.jsonと検証子(ETag/Last-Modified)の保存先
+AREA_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "area_cache.json")
+
+
+def load_area_cache():
+    try:
+        with open(AREA_CACHE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def refresh_area_cache(cache=None):
+    """条件付きGETでarea.jsonを確認し、新しい内容ならファイルに保存して返す"""
+    headers = {}
+    if cache is not None:
+        if cache.get("etag"):
+            headers["If-None-Match"] = cache["etag"]
+        if cache.get("last_modified"):
+            headers["If-Modified-Since"] = cache["last_modified"]
+
+    r = shared_client().get(AREA_URL, headers=headers, timeout=10)
+    if r.status_code == 304 and cache is not None:
+        return cache
+    r.raise_for_status()
+
+    cache = {
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+        "data": r.json(),
+    }
+    tmp_path = AREA_CACHE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp_path, AREA_CACHE)
+    return cache
 
 
 def main(page: ft.Page):
@@ -71,38 +114,72 @@ def main(page: ft.Page):
 
     tabs.on_change = lambda e: update_weather_by_tab(e.control.selected_index)
 
-#データの取得
-    def show_weather(area_code: str):
-        weather_list.controls.clear()
-
+#データの取得 (ワーカースレッドで実行する)
+    def fetch_weather(area_code: str):
         url = FORECAST_URL.format(area_code)
-        r = requests.get(url)
+        r = shared_client().get(url, timeout=10)
 
         if r.status_code != 200:
-            weather_list.controls.append(
-                ft.Text("天気データを取得できません", color=ft.Colors.RED)
-            )
-            page.update()
-            return
+            return "天気データを取得できません"
 
         try:
             data = r.json()
         except ValueError:
-            weather_list.controls.append(
-                ft.Text("JSONの解析に失敗しました", color=ft.Colors.RED)
-            )
-            page.update()
-            return
+            return "JSONの解析に失敗しました"
 
         ts = data[0]["timeSeries"][0]
-        current_weather["times"] = ts.get("timeDefines", [])
-        current_weather["weathers"] = ts.get("areas", [])[0].get("weathers", [])
+        return ts.get("timeDefines", []), ts.get("areas", [])[0].get("weathers", [])
+
+#クリックから描画までの時間は、WEATHER_LATENCY_LOG にファイル名を指定したときだけ記録に残す
+    latency_probe = LatencyProbe(os.environ.get("WEATHER_LATENCY_LOG"))
+    # 最後にクリックしたエリアの結果だけを画面に出す
+    runner = LatestRequestRunner(max_workers=2)
+
+    def show_error(message: str):
+        weather_list.controls.clear()
+        weather_list.controls.append(ft.Text(message, color=ft.Colors.RED))
+        page.update()
+
+    def show_weather(area_code: str):
+        latency_probe.click(area_code)
+        weather_list.controls.clear()
+        weather_list.controls.append(
+            ft.Row([ft.ProgressRing(width=20, height=20), ft.Text("取得中...", color=ft.Colors.BLACK)])
+        )
+        page.update()
+        latency_probe.paint(area_code, "placeholder")
+
+        def on_done(result):
+            if isinstance(result, str):
+                show_error(result)
+                return
+            current_weather["times"], current_weather["weathers"] = result
+            tabs.selected_index = 0
+            update_weather_by_tab(0)
+            latency_probe.paint(area_code, "forecast", final=True)
+
+        def on_error(e):
+            # 通信エラーでも、JSONの形が想定と違う (KeyError/IndexError など) ときでも、取得中の表示を消す
+            if isinstance(e, requests.RequestException):
+                show_error("天気データを取得できません")
+            else:
+                show_error(f"天気データを読み取れません ({type(e).__name__})")
+
+        runner.submit(lambda: fetch_weather(area_code), on_done, on_error=on_error)
 
-        tabs.selected_index = 0
-        update_weather_by_tab(0)
+    # 地域データ取得 (前回保存したものがあればそれで画面を出し、裏で更新を確認する)
+    area_cache = load_area_cache()
+    if area_cache is None:
+        area_cache = refresh_area_cache()
+    else:
+        def revalidate():
+            try:
+                refresh_area_cache(area_cache)
+            except (requests.RequestException, ValueError) as e:
+                print(f"area.jsonの更新確認に失敗しました: {e}")
 
-    # 地域データ取得
-    area_json = requests.get(AREA_URL).json()
+        threading.Thread(target=revalidate, daemon=True).start()
+    area_json = area_cache["data"]
     centers = area_json["centers"]
     offices = area_json["offices"]
 
@@ -121,7 +198,7 @@ def main(page: ft.Page):
         )
     )
 
-    for center in centers.values():
+    def build_prefecture_tiles(center):
         prefecture_tiles = []
 
         for office_code in center["children"]:
@@ -140,6 +217,16 @@ def main(page: ft.Page):
                 )
             )
 
+        return prefecture_tiles
+
+#地方のタイルを開いたときに、はじめて中の都道府県タイルを作る
+    def on_center_expand(e, center):
+        tile = e.control
+        if e.data == "true" and not tile.controls:
+            tile.controls = build_prefecture_tiles(center)
+            tile.update()
+
+    for center in centers.values():
         left_column.controls.append(
             ft.ExpansionTile(
                 title=ft.Text(
@@ -147,11 +234,11 @@ def main(page: ft.Page):
                     weight=ft.FontWeight.BOLD,
                     color=ft.Colors.BLACK
                 ),
-                controls=prefecture_tiles,
                 text_color=ft.Colors.BLACK,
                 collapsed_text_color=ft.Colors.BLACK,
                 icon_color=ft.Colors.BLACK,
                 collapsed_icon_color=ft.Colors.BLACK,
+                on_change=lambda e, c=center: on_center_expand(e, c),
             )
         )
 
@@ -0,0 +1,122 @@
+import bisect
+import unicodedata
+
+import flet as ft
+
+
+def normalize(text: str) -> str:
+    """全角/半角や大文字/小文字の違いを吸収した検索用の文字列"""
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+class AreaPrefixIndex:
+    """エリア名とエリアコードの前方一致検索用インデックス
+
+    (正規化したキー, 行番号) をソートして持ち、bisectで前方一致の範囲を探す。
+    """
+
+    def __init__(self, db_areas):
+        self.areas = list(db_areas)
+        keys = []
+        for i, (code, name, center_name) in enumerate(self.areas):
+            keys.append((normalize(name), i))
+            keys.append((normalize(code), i))
+        keys.sort()
+        self._keys = [k for k, _ in keys]
+        self._rows = [i for _, i in keys]
+
+    def search(self, prefix: str, limit=20):
+        prefix = normalize(prefix.strip())
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self._keys, prefix)
+        found = []
+        for pos in range(start, len(self._keys)):
+            if not self._keys[pos].startswith(prefix):
+                break
+            i = self._rows[pos]
+            if i not in found:
+                found.append(i)
+                if len(found) >= limit:
+                    break
+        return [self.areas[i] for i in found]
+
+
+def area_tile(code, name, on_select):
+    return ft.ListTile(
+        title=ft.Text(name, color=ft.Colors.BLUE_900),
+        on_click=lambda e, c=code: on_select(c),
+    )
+
+
+def group_by_center(db_areas):
+    """ORDER BY center_name 済みの行を [(center_name, [(code, name), ...]), ...] にまとめる"""
+    groups = []
+    for code, name, center_name in db_areas:
+        if not groups or groups[-1][0] != center_name:
+            groups.append((center_name, []))
+        groups[-1][1].append((code, name))
+    return groups
+
+
+def build_center_tiles(db_areas, on_select, lazy=True):
+    """地方ごとのExpansionTileを作る
+
+    lazy=True のときは、最初に開かれるまで中のListTileを作らない。
+    """
+    tiles = []
+    for center_name, offices in group_by_center(db_areas):
+        tile = ft.ExpansionTile(
+            title=ft.Text(center_name, weight="bold", color=ft.Colors.BLUE_800)
+        )
+        if lazy:
+            def on_change(e, tile=tile, offices=offices):
+                if e.data == "true" and not tile.controls:
+                    tile.controls = [area_tile(code, name, on_select) for code, name in offices]
+                    tile.update()
+
+            tile.on_change = on_change
+        else:
+            tile.controls = [area_tile(code, name, on_select) for code, name in offices]
+        tiles.append(tile)
+    return tiles
+
+
+def build_area_sidebar(db_areas, on_select, lazy=True):
+    """検索ボックス付きのサイドバーを作る"""
+    index = AreaPrefixIndex(db_areas)
+    center_tiles = build_center_tiles(db_areas, on_select, lazy=lazy)
+    results = ft.Column(visible=False)
+    tree = ft.Column(controls=center_tiles)
+
+    def on_search(e):
+        matches = index.search(e.control.value or "")
+        has_query = bool((e.control.value or "").strip())
+        results.controls = [area_tile(code, f"{name} ({code})", on_select) for code, name, _ in matches]
+        if has_query and not matches:
+            results.controls = [ft.Text("該当するエリアがありません", color=ft.Colors.GREY)]
+        results.visible = has_query
+        tree.visible = not has_query
+        results.update()
+        tree.update()
+
+    search_box = ft.TextField(
+        hint_text="エリア名・コードで検索",
+        prefix_icon=ft.Icons.SEARCH,
+        dense=True,
+        on_change=on_search,
+    )
+    return ft.Column(expand=True, scroll=ft.ScrollMode.AUTO, controls=[search_box, results, tree])
+
+
+def count_controls(control):
+    """サイドバーが作ったコントロールの数を数える
+
+    このモジュールで組み立てる入れ子 (Column / ExpansionTile の controls と、ExpansionTile / ListTile の title)
+    だけを辿る (Flet の内部の子の一覧は使わない)。
+    """
+    children = list(getattr(control, "controls", None) or [])
+    title = getattr(control, "title", None)
+    if isinstance(title, ft.Control):
+        children.append(title)
+    return 1 + sum(count_controls(c) for c in children)
@@ -0,0 +1,127 @@
+"""area.json のスナップショットをDBに保存し、裏でETag/Last-Modifiedによる再検証を行う
+
+起動時は areas テーブルだけを読んで画面を出し、
+気象庁への問い合わせ (条件付きGET) は別スレッドで行う。
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+
+import requests
+from lecture_common.http_client import shared_client
+
+logger = logging.getLogger(__name__)
+
+CREATE_AREA_SNAPSHOTS_SQL = """
+    CREATE TABLE IF NOT EXISTS area_snapshots (
+        version INTEGER PRIMARY KEY AUTOINCREMENT,
+        etag TEXT,
+        last_modified TEXT,
+        content_hash TEXT,
+        body BLOB,
+        fetched_at REAL,
+        checked_at REAL
+    )
+"""
+SNAPSHOT_SCHEMA = (CREATE_AREA_SNAPSHOTS_SQL,)
+
+SELECT_LATEST_SQL = """
+    SELECT version, etag, last_modified, content_hash, fetched_at, checked_at
+    FROM area_snapshots ORDER BY version DESC LIMIT 1
+"""
+
+
+def latest_snapshot(conn):
+    """最新スナップショットのメタ情報を辞書で返す (無ければNone)"""
+    row = conn.execute(SELECT_LATEST_SQL).fetchone()
+    if row is None:
+        return None
+    keys = ("version", "etag", "last_modified", "content_hash", "fetched_at", "checked_at")
+    return dict(zip(keys, row))
+
+
+def load_snapshot_body(conn, version=None):
+    """保存しておいた area.json を辞書で返す"""
+    if version is None:
+        row = conn.execute("SELECT body FROM area_snapshots ORDER BY version DESC LIMIT 1").fetchone()
+    else:
+        row = conn.execute("SELECT body FROM area_snapshots WHERE version = ?", (version,)).fetchone()
+    if row is None or row[0] is None:
+        return None
+    return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+
+def revalidate_areas(repo, area_url, session=None, timeout=10):
+    """条件付きGETでarea.jsonを確認し、内容が変わっていればareasを入れ替える
+
+    戻り値は "created" / "updated" / "not_modified" / "unchanged" のいずれか。
+    通信に失敗した場合は requests.RequestException を、DBへの書き込みに失敗した場合は
+    sqlite3.Error を送出する。
+    """
+    with repo.connection() as conn:
+        current = latest_snapshot(conn)
+    headers = {}
+    if current is not None:
+        if current["etag"]:
+            headers["If-None-Match"] = current["etag"]
+        if current["last_modified"]:
+            headers["If-Modified-Since"] = current["last_modified"]
+
+    # 検証子を付けたときは、共有クライアントは自分のキャッシュを使わずに 304 をそのまま返す
+    r = (session or shared_client()).get(area_url, headers=headers, timeout=timeout)
+    now = time.time()
+    if r.status_code == 304 and current is not None:
+        with repo.transaction() as conn:
+            conn.execute("UPDATE area_snapshots SET checked_at = ? WHERE version = ?", (now, current["version"]))
+        return "not_modified"
+    r.raise_for_status()
+
+    content_hash = hashlib.sha256(r.content).hexdigest()
+    etag = r.headers.get("ETag")
+    last_modified = r.headers.get("Last-Modified")
+    if current is not None and current["content_hash"] == content_hash:
+        # 検証子だけ変わった場合は中身を入れ替えない
+        with repo.transaction() as conn:
+            conn.execute(
+                "UPDATE area_snapshots SET etag = ?, last_modified = ?, checked_at = ? WHERE version = ?",
+                (etag, last_modified, now, current["version"]),
+            )
+        return "unchanged"
+
+    area_data = r.json()
+    with repo.transaction() as conn:
+        # 廃止されたofficeが残らないように全件入れ替える
+        conn.execute("DELETE FROM areas")
+        repo.save_areas(area_data)
+        conn.execute(
+            "INSERT INTO area_snapshots (etag, last_modified, content_hash, body, fetched_at, checked_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (etag, last_modified, content_hash, zlib.compress(r.content), now, now),
+        )
+        # 古いスナップショットは本体だけ捨ててメタ情報を残す
+        conn.execute("UPDATE area_snapshots SET body = NULL WHERE version < (SELECT MAX(version) FROM area_snapshots)")
+    return "created" if current is None else "updated"
+
+
+def revalidate_in_background(repo, area_url, on_changed=None, on_error=None):
+    """revalidate_areasを別スレッドで実行し、内容が変わったときだけ on_changed() を呼ぶ"""
+
+    def run():
+        try:
+            result = revalidate_areas(repo, area_url)
+        except (requests.RequestException, ValueError, sqlite3.Error) as e:
+            # DBがロックされている・ディスクがいっぱいなどもここで受け、スレッドを黙って終わらせない
+            logger.warning("area.json を再検証できませんでした: %s", e)
+            if on_error is not None:
+                on_error(e)
+            return
+        if result in ("created", "updated") and on_changed is not None:
+            on_changed()
+
+    thread = threading.Thread(target=run, name="area-revalidate", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,109 @@
+"""bracket_checker とノートブック版 format_checker (1文字ずつのループ) のスループットを比べる
+
+一時ディレクトリに、括弧の少ないログ風のファイルと括弧の多いテンプレート風のファイル、
+バッチモード用の小さなファイル群を作って測る。
+
+    python bench_bracket_checker.py --mb 64 --files 64
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from bracket_checker import check_file, check_paths
+
+
+def format_checker_notebook(text: str) -> bool:
+    """Python演習3.ipynb の実装 (比較用にそのまま写したもの)"""
+    stack = []
+    bracket_map = {')': '(', ']': '[', '}': '{'}
+    opening = bracket_map.values()
+
+    for char in text:
+        if char in opening:
+            stack.append(char)
+        elif char in bracket_map:
+            if not stack or stack.pop() != bracket_map[char]:
+                return False
+
+    return len(stack) == 0
+
+
+def log_line(rng, i):
+    return (f"2026-10-18T12:{i % 60:02d}:{rng.randrange(60):02d} INFO worker-{rng.randrange(16)} "
+            f"request id={rng.getrandbits(64):016x} path=/api/v1/items status=200 "
+            f"elapsed_ms={rng.random() * 100:.2f} user=東京 [cache hit] (shard {rng.randrange(8)})\n")
+
+
+def template_line(rng, i):
+    return (f"<li>{{{{ items[{i % 97}]['name'] }}}} ({{{{ fmt(items[{i % 13}]['price'], "
+            f"{{'unit': '円'}}) }}}})</li>\n")
+
+
+def write_file(path, size, make_line, seed=0):
+    rng = random.Random(seed)
+    written = 0
+    i = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < size:
+            line = make_line(rng, i)
+            f.write(line)
+            written += len(line.encode("utf-8"))
+            i += 1
+    return written
+
+
+def throughput(size, elapsed):
+    return size / 1e6 / elapsed
+
+
+def bench_single(path, label):
+    size = os.path.getsize(path)
+    t0 = time.perf_counter()
+    with open(path, encoding="utf-8") as f:
+        ok_notebook = format_checker_notebook(f.read())
+    notebook = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    result = check_file(path)
+    fast = time.perf_counter() - t0
+    assert result.ok == ok_notebook
+    print(f"{label:<12} {size / 1e6:>7.1f} MB  notebook {throughput(size, notebook):>8.1f} MB/s   "
+          f"check_file {throughput(size, fast):>8.1f} MB/s  ({notebook / fast:.1f}倍)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=int, default=64, help="単一ファイルの大きさ")
+    parser.add_argument("--files", type=int, default=64, help="バッチモード用のファイル数 (各1MB)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "app.log")
+        template_path = os.path.join(tmp, "page.html")
+        write_file(log_path, args.mb * 1_000_000, log_line)
+        write_file(template_path, args.mb * 1_000_000, template_line)
+        bench_single(log_path, "ログ")
+        bench_single(template_path, "テンプレート")
+        # 末尾で崩れているファイルは、速い確認のあとに位置を求める2回目の走査が入る
+        with open(template_path, "a", encoding="utf-8") as f:
+            f.write("]\n")
+        bench_single(template_path, "末尾がNG")
+
+        batch_dir = os.path.join(tmp, "batch")
+        os.mkdir(batch_dir)
+        total = 0
+        for i in range(args.files):
+            make_line = log_line if i % 2 else template_line
+            total += write_file(os.path.join(batch_dir, f"{i:04d}.txt"), 1_000_000, make_line, seed=i)
+        for workers in (0, args.workers):
+            t0 = time.perf_counter()
+            results = check_paths([batch_dir], workers)
+            elapsed = time.perf_counter() - t0
+            assert all(r.ok for _, r in results)
+            print(f"バッチ {len(results)}ファイル workers={workers or 1:<3} {throughput(total, elapsed):>8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
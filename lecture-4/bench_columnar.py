@@ -0,0 +1,135 @@
+"""列指向の書き出し (columnar.py) と、今のカーソルで1行ずつ読む集計を比べる
+
+合成した repositories / weather_forecasts を一時ディレクトリのDBに作り、
+
+- cursor: SELECT の行 (Pythonのタプル) を1行ずつ読んで辞書に集計する
+- columnar: 一度だけ列ごとのファイルに書き出し (export)、memmap で開いて NumPy で集計する
+
+の時間とピークメモリ (tracemalloc) を表示する。集計結果が一致することも確かめる。
+memmap したファイルのページは tracemalloc に数えられないので、columnar のピークは
+集計に使った一時的な配列の分になる。
+
+    python bench_columnar.py --rows 2000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+import columnar
+
+
+def make_db(path, rows, seed=0):
+    rng = random.Random(seed)
+    # スクレイパーが入れる 'N/A' と NULL は別の言語として数える
+    languages = ["Python", "Go", "C++", "TypeScript", "Java", "Rust", "Kotlin", columnar.NO_LANGUAGE, None]
+    weathers = ["晴れ", "くもり", "雨", "晴れ　時々　くもり", "くもり　時々　雨", "雪", "くもり　後　晴れ"]
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE repositories (repo_name TEXT PRIMARY KEY, language TEXT, stars INTEGER)")
+    conn.execute("""
+        CREATE TABLE weather_forecasts (
+            area_code TEXT, date TEXT, weather_text TEXT, fetched_at REAL, report_datetime TEXT,
+            PRIMARY KEY (area_code, date)
+        )
+    """)
+    conn.executemany("INSERT INTO repositories VALUES (?, ?, ?)", (
+        (f"org/repo-{i:08d}", rng.choice(languages), int(rng.paretovariate(1.2) * 10) - 10)
+        for i in range(rows)
+    ))
+    conn.executemany("INSERT INTO weather_forecasts VALUES (?, ?, ?, ?, ?)", (
+        (f"{i // 1000:06d}", f"2026-{i % 1000 // 31 % 12 + 1:02d}-{i % 31 + 1:02d}T{i % 1000:03d}",
+         rng.choice(weathers), 1.76e9 + i, "2026-10-18T11:00:00+09:00")
+        for i in range(rows)
+    ))
+    conn.commit()
+    return conn
+
+
+def measure(label, fn):
+    """時間は計測なしで、ピークメモリは tracemalloc を有効にしてもう1回実行して測る"""
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:<34} {elapsed:8.3f}秒  ピーク {peak / 1024 / 1024:8.1f} MiB")
+    return result
+
+
+def cursor_language_summary(conn):
+    """今のやり方: 行をタプルで読み、言語ごとのスター数のリストを作って集計する"""
+    stars_by_language = defaultdict(list)
+    for language, stars in conn.execute("SELECT language, stars FROM repositories"):
+        stars_by_language[language].append(stars or 0)
+    summary = [
+        (language, len(stars), sum(stars), sum(stars) / len(stars), float(statistics.median(stars)))
+        for language, stars in stars_by_language.items()
+    ]
+    summary.sort(key=columnar.summary_order)
+    return summary
+
+
+def cursor_weather_counts(conn):
+    counts = defaultdict(int)
+    for area_code, weather_text in conn.execute("SELECT area_code, weather_text FROM weather_forecasts"):
+        counts[area_code, weather_text] += 1
+    return counts
+
+
+def columnar_weather_counts(table):
+    area_codes, texts, matrix = columnar.weather_counts(table)
+    return {(area_codes[a], texts[w]): int(matrix[a, w]) for a, w in zip(*matrix.nonzero())}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000, help="各テーブルの行数")
+    parser.add_argument("--chunk-size", type=int, default=columnar.CHUNK_SIZE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        conn = make_db(os.path.join(tmp, "bench.db"), args.rows)
+        print(f"{args.rows:,}行 x 2テーブルのDBを作成 ({time.perf_counter() - started:.1f}秒)")
+        out_dir = os.path.join(tmp, "columns")
+
+        print("--- repositories: 言語別の件数・合計・平均・中央値 ---")
+        expected = measure("cursor (1行ずつ)", lambda: cursor_language_summary(conn))
+        measure("columnar export (1回だけ)",
+                lambda: columnar.export_table(conn, "repositories", out_dir, args.chunk_size))
+        table = columnar.open_table("repositories", out_dir)
+        summary = measure("columnar language_summary", lambda: columnar.language_summary(table))
+        assert [r[:3] + (round(r[3], 6), r[4]) for r in summary] == \
+            [r[:3] + (round(r[3], 6), r[4]) for r in expected], (summary, expected)
+        top = measure("columnar top_repos k=10", lambda: columnar.top_repos(table, k=10))
+        assert [r[2] for r in top] == [r[0] for r in conn.execute(
+            "SELECT stars FROM repositories ORDER BY stars DESC LIMIT 10")]
+
+        print("--- weather_forecasts: エリア x 天気 の件数 ---")
+        expected = measure("cursor (1行ずつ)", lambda: cursor_weather_counts(conn))
+        measure("columnar export (1回だけ)",
+                lambda: columnar.export_table(conn, "weather_forecasts", out_dir, args.chunk_size))
+        table = columnar.open_table("weather_forecasts", out_dir)
+        counts = measure("columnar weather_counts", lambda: columnar.weather_counts(table))
+        assert columnar_weather_counts(table) == expected
+        print(f"{'':<34} エリア {len(counts[0]):,} x 天気 {len(counts[1]) - 1}")
+
+        try:
+            import pandas  # noqa: F401
+        except ImportError:
+            print("pandas が無いので to_pandas() は飛ばします")
+        else:
+            frame = measure("to_pandas (weather_forecasts)", table.to_pandas)
+            assert len(frame) == args.rows
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
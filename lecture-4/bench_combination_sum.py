@@ -0,0 +1,101 @@
+"""combination_sum の各方法の時間とピークメモリを、target を大きくしながら比べる
+
+    python bench_combination_sum.py
+    python bench_combination_sum.py --candidates 2 9 11 --targets 100 200 300 400
+"""
+import argparse
+import time
+import tracemalloc
+from collections import deque
+
+from combination_sum import (
+    CombinationMemo, combination_sum, combination_sum_memo, count_combinations, iter_combinations,
+)
+
+
+def combination_sum_notebook(candidates, target):
+    """Python演習3.ipynb の実装 (比較用にそのまま写したもの)"""
+    results = []
+
+    def backtrack(remain, combo, start):
+        if remain == 0:
+            results.append(list(combo))
+            return
+        elif remain < 0:
+            return
+
+        for i in range(start, len(candidates)):
+            combo.append(candidates[i])
+            backtrack(remain - candidates[i], combo, i)
+            combo.pop()
+
+    backtrack(target, [], 0)
+    return results
+
+
+def stream_only(candidates, target):
+    """組み合わせを保持せずに流すだけ (個数を返す)"""
+    count = 0
+    for count, _ in enumerate(iter_combinations(candidates, target), 1):
+        pass
+    return count
+
+
+METHODS = [
+    ("notebook", lambda c, t: len(combination_sum_notebook(c, t))),
+    ("list", lambda c, t: len(combination_sum(c, t))),
+    ("stream", stream_only),
+    ("memo", lambda c, t: len(combination_sum_memo(c, t))),
+    ("count DP", count_combinations),
+]
+
+
+def measure(fn, candidates, target):
+    """(件数, 秒, ピークKiB) を返す。メモリは時間とは別に測る"""
+    t0 = time.perf_counter()
+    count = fn(candidates, target)
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    fn(candidates, target)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, elapsed, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, nargs="+", default=[2, 3, 5])
+    parser.add_argument("--targets", type=int, nargs="+", default=[20, 40, 60, 80, 100, 120])
+    parser.add_argument("--timeout", type=float, default=10.0, help="これより遅くなった方法は以降のtargetで省く")
+    args = parser.parse_args()
+
+    print(f"candidates = {args.candidates}")
+    print(f"{'target':>7} {'method':<10} {'件数':>12} {'時間(ms)':>12} {'ピーク(KiB)':>12}")
+    # 同じ候補で何度も問い合わせる場合: 最大のtargetまで先にメモを作っておき、引くだけの時間を測る
+    shared = CombinationMemo(args.candidates)
+    shared.solutions(max(args.targets))
+    methods = METHODS + [("memo reuse", lambda c, t: len(combination_sum_memo(c, t, shared)))]
+
+    skipped = set()
+    for target in args.targets:
+        for name, fn in methods:
+            if name in skipped:
+                continue
+            count, elapsed, peak = measure(fn, sorted(args.candidates), target)
+            print(f"{target:>7} {name:<10} {count:>12,} {elapsed * 1000:>12.2f} {peak:>12,.0f}")
+            if elapsed > args.timeout:
+                skipped.add(name)
+    # 件数が多すぎて列挙できない大きさでも、DPなら個数はすぐ出る
+    big = args.targets[-1] * 100
+    t0 = time.perf_counter()
+    count = count_combinations(args.candidates, big)
+    print(f"count DP: target={big:,} -> {count:,} 通り ({(time.perf_counter() - t0) * 1000:.1f} ms)")
+    # 先頭の数件だけ欲しいときはストリームで止められる
+    t0 = time.perf_counter()
+    first = deque(zip(range(3), iter_combinations(args.candidates, big)), maxlen=3)
+    print(f"stream: target={big:,} の先頭3件 {(time.perf_counter() - t0) * 1000:.1f} ms "
+          f"(最初の組み合わせの長さ {len(first[0][1]) if first else 0})")
+
+
+if __name__ == "__main__":
+    main()
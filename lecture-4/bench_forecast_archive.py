@@ -0,0 +1,118 @@
+"""forecast_archive に合成データを入れて、DBサイズと検索時間を測る
+
+    python bench_forecast_archive.py --rows 10000000
+    python bench_forecast_archive.py --rows 1000000 --db /tmp/archive.db --drift-all
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import forecast_archive
+from weather_db import WeatherRepository
+
+WEATHER_WORDS = ["晴れ", "くもり", "雨", "雪"]
+LINKS = ["　時々　", "　後　", "　一時　", "　夜　"]
+# 予報を取り直す回数 (1日3回の発表 × 3日先まで)
+VERSIONS_PER_TARGET = 9
+
+
+def synthetic_rows(total, areas, start_day, texts):
+    """(area_code, target_day, fetched_at, text_id) を total 行生成する"""
+    rng = random.Random(0)
+    base = forecast_archive.day_number(start_day) * forecast_archive.SECONDS_PER_DAY
+    per_area = total // (len(areas) * VERSIONS_PER_TARGET) + 1
+    produced = 0
+    for code in areas:
+        for target in range(per_area):
+            target_day = forecast_archive.day_number(start_day) + target
+            for v in range(VERSIONS_PER_TARGET):
+                if produced >= total:
+                    return
+                # 対象日の3日前から8時間おきに取り直した想定
+                fetched_at = base + (target - 3) * forecast_archive.SECONDS_PER_DAY + v * 8 * 3600
+                yield (code, target_day, fetched_at, rng.choice(texts))
+                produced += 1
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--areas", type=int, default=58)
+    parser.add_argument("--db", default=None, help="既存のベンチ用DBを使い回す場合のパス")
+    parser.add_argument("--drift-all", action="store_true", help="全エリアのドリフト集計も測る")
+    args = parser.parse_args()
+
+    tmp = None
+    db_path = args.db
+    if db_path is None:
+        tmp = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp.name, "archive.db")
+
+    repo = WeatherRepository(db_path, archive=True)
+    repo.init_schema()
+    with repo.connection() as conn:
+        areas = [int(f"{i:02d}0000") for i in range(1, args.areas + 1)]
+
+        existing = conn.execute("SELECT COUNT(*) FROM forecast_archive").fetchone()[0]
+        if existing < args.rows:
+            with repo.transaction() as conn:
+                texts = [
+                    repo.texts(conn).id_for(conn, a + link + b)
+                    for a in WEATHER_WORDS for link in LINKS for b in WEATHER_WORDS
+                ] + [repo.texts(conn).id_for(conn, w) for w in WEATHER_WORDS]
+            started = time.perf_counter()
+            with repo.transaction() as conn:
+                conn.executemany(
+                    forecast_archive.INSERT_ARCHIVE_SQL,
+                    synthetic_rows(args.rows, areas, "2000-01-01", texts),
+                )
+            elapsed = time.perf_counter() - started
+            print(f"insert: {args.rows:,} rows in {elapsed:.1f}s ({args.rows / elapsed:,.0f} rows/s)")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        rows = conn.execute("SELECT COUNT(*) FROM forecast_archive").fetchone()[0]
+        size = os.path.getsize(db_path)
+        print(f"rows={rows:,}  db size={size / 1e6:.1f}MB  ({size / max(rows, 1):.1f} bytes/row)")
+
+        rng = random.Random(1)
+        max_day = conn.execute("SELECT MAX(target_day) FROM forecast_archive").fetchone()[0]
+        min_day = conn.execute("SELECT MIN(target_day) FROM forecast_archive").fetchone()[0]
+
+        def history_query():
+            code = rng.choice(areas)
+            start = rng.randint(min_day, max(min_day, max_day - 30))
+            repo.forecast_history(
+                f"{code:06d}",
+                forecast_archive.day_to_date(start),
+                forecast_archive.day_to_date(start + 30),
+            )
+
+        p50, worst = timed(history_query, 200)
+        print(f"history (30 days, 1 area): p50={p50:.2f}ms max={worst:.2f}ms")
+
+        p50, worst = timed(lambda: repo.forecast_drift(f"{rng.choice(areas):06d}"), 5)
+        print(f"drift (1 area):            p50={p50:.1f}ms max={worst:.1f}ms")
+
+        if args.drift_all:
+            p50, worst = timed(repo.forecast_drift, 1)
+            print(f"drift (all areas):         {p50:.0f}ms")
+
+    repo.close()
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""固定のforecast JSONを数百件取り込み、1秒あたりの書き込み行数を測る
+
+    python bench_forecast_ingest.py --payloads 500
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from jma_stub import load_fixture
+from weather_db import WeatherRepository
+
+
+def make_payloads(count):
+    """officeコードと発表時刻をずらした forecast JSON を作る"""
+    template = json.dumps(load_fixture("forecast_130000.json"), ensure_ascii=False)
+    for i in range(count):
+        office_code = f"{(i % 99) + 1:02d}0000"
+        hour = (5, 11, 17)[i % 3]
+        text = template.replace("1300", office_code[:4]).replace("T11:00:00", f"T{hour:02d}:00:00")
+        yield office_code, json.loads(text)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--payloads", type=int, default=300)
+    args = parser.parse_args()
+
+    payloads = list(make_payloads(args.payloads))
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = WeatherRepository(os.path.join(tmp, "ingest.db"))
+        repo.init_schema()
+
+        started = time.perf_counter()
+        rows = repo.ingest_forecasts(payloads)
+        elapsed = time.perf_counter() - started
+
+        with repo.connection() as conn:
+            stored = conn.execute("SELECT COUNT(*) FROM forecast_values").fetchone()[0]
+        repo.close()
+
+    print(f"payloads={args.payloads}  rows written={rows}  rows stored={stored}")
+    print(f"elapsed={elapsed:.3f}s  {rows / elapsed:,.0f} rows/s  {args.payloads / elapsed:,.0f} payloads/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""forecast_server の負荷試験: 同時に動く端末 (クライアント) の数を変えて req/s と遅延を測る
+
+気象庁の代わりに jma_stub (--latency で上流の遅さを再現) を使う。比べるのは
+
+- direct: 各端末が上流へ直接取りに行く (今の weather-v2 をたくさん動かした場合)
+- server: 各端末が forecast_server 経由で読む (上流への取得はサーバーだけ)
+
+最初に全端末が同じエリアを同時に開く場面 (cold burst) で、上流へのリクエストが1回にまとまるかも確かめる。
+
+    python bench_forecast_server.py --clients 1 4 16 32 --requests 200 --latency 0.05
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+import requests
+
+from forecast_client import ForecastClient
+from forecast_server import FORECAST_PATH, start_forecast_server, stop_forecast_server
+from jma_stub import start_stub_server
+from weather_db import WeatherRepository
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def make_workload(area_codes, count, seed):
+    """よく見られるエリアに偏らせた (Zipf風) エリアコードの列"""
+    rng = random.Random(seed)
+    weights = [1 / (i + 1) for i in range(len(area_codes))]
+    return rng.choices(area_codes, weights, k=count)
+
+
+def run_clients(clients, requests_per_client, area_codes, make_get):
+    """clients 個のスレッドで同時に取得し、(req/s, 遅延のリスト[ms], エラー数) を返す"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    barrier = threading.Barrier(clients + 1)
+
+    def worker(i):
+        get, close = make_get()
+        workload = make_workload(area_codes, requests_per_client, seed=i)
+        local = []
+        failed = 0
+        barrier.wait()
+        for code in workload:
+            t0 = time.perf_counter()
+            if not get(code):
+                failed += 1
+            local.append((time.perf_counter() - t0) * 1000)
+        close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    return len(latencies) / elapsed, sorted(latencies), errors[0]
+
+
+def direct_getter(upstream):
+    def make_get():
+        session = requests.Session()
+
+        def get(code):
+            r = session.get(upstream + FORECAST_PATH.format(code), timeout=10)
+            return r.status_code == 200 and r.json()
+        return get, session.close
+    return make_get
+
+
+def server_getter(url):
+    def make_get():
+        client = ForecastClient(url)
+        return client.get, client.close
+    return make_get
+
+
+def report(label, clients, rps, latencies, errors, upstream):
+    print(f"{label:<7} clients={clients:>3}  {rps:>8.0f} req/s  p50={statistics.median(latencies):7.2f}ms  "
+          f"p95={percentile(latencies, 0.95):7.2f}ms  p99={percentile(latencies, 0.99):7.2f}ms  "
+          f"上流へのリクエスト {upstream:>5}  エラー {errors}")
+
+
+def cold_burst(url, stub, clients, area_code):
+    """全端末が同時に同じエリアを開いたときの上流リクエスト数"""
+    before = stub.request_count
+    barrier = threading.Barrier(clients)
+    results = []
+
+    def worker():
+        client = ForecastClient(url)
+        barrier.wait()
+        results.append(bool(client.get(area_code)))
+        client.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"cold burst: {clients}端末が同時に {area_code} を取得 -> 上流へのリクエスト "
+          f"{stub.request_count - before}回 (成功 {sum(results)}/{clients})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--requests", type=int, default=200, help="1端末あたりのリクエスト数")
+    parser.add_argument("--latency", type=float, default=0.05, help="上流 (スタブ) の応答にかかる秒数")
+    args = parser.parse_args()
+
+    stub, upstream = start_stub_server(latency=args.latency)
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = WeatherRepository(os.path.join(tmp, "shared.db"), pool_size=16)
+        repo.init_schema()
+        server, url = start_forecast_server(repo, upstream)
+        area_codes = [code for code, _, _ in ForecastClient(url).get_areas()]
+        print(f"エリア {len(area_codes)}件, 上流の遅延 {args.latency * 1000:.0f}ms")
+
+        cold_burst(url, stub, max(args.clients), area_codes[0])
+        for clients in args.clients:
+            before = stub.request_count
+            rps, latencies, errors = run_clients(clients, args.requests, area_codes, direct_getter(upstream))
+            report("direct", clients, rps, latencies, errors, stub.request_count - before)
+
+            before = stub.request_count
+            rps, latencies, errors = run_clients(clients, args.requests, area_codes, server_getter(url))
+            report("server", clients, rps, latencies, errors, stub.request_count - before)
+        print(f"server cache: {server.cache.snapshot_stats()}")
+        stop_forecast_server(server)
+        repo.close()
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
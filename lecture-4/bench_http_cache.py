@@ -0,0 +1,156 @@
+"""lecture_common.http_client (共有のHTTPクライアント) をローカルのスタブで確かめ、304の割合と節約できたバイト数を測る
+
+- 気象庁スタブ (jma_stub) の予報を --rounds 回ずつ取得する。比べるのは
+  requests.get (毎回新しい接続)・HttpClient (keep-aliveのみ)・HttpClient (ディスクキャッシュあり)
+- キャッシュは再起動 (新しい HttpClient) の後も使われるか、内容が変わったら新しい本体を返すか、
+  max_bytes を超えたら古いものから捨てるか
+- GitHubスタブの一覧ページを PageFetcher で2回取得し、2回目は 304 で同じ行になるか
+
+    python bench_http_cache.py --areas 50 --rounds 5 --latency 0.005
+"""
+import argparse
+import copy
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import requests
+from lecture_common.http_client import HttpClient
+
+from jma_stub import FORECAST_PATH_RE, set_forecast_template, start_stub_server
+
+GITHUB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "lecture-1", "assignment")
+FORECAST_PATH = "/bosai/forecast/data/forecast/{}.json"
+assert FORECAST_PATH_RE.match(FORECAST_PATH.format("130000"))
+
+
+def area_codes(count):
+    return [f"{i % 99 + 1:02d}{i // 99:02d}00" for i in range(count)]
+
+
+def fetch_rounds(label, get, base_url, codes, rounds, stats=None):
+    """全エリアを rounds 回取得して、req/s とラウンドごとの304の割合を表示する"""
+    payloads = {}
+    for round_no in range(1, rounds + 1):
+        before = dict(stats()) if stats else None
+        started = time.perf_counter()
+        for code in codes:
+            r = get(base_url + FORECAST_PATH.format(code))
+            assert r.status_code == 200, r.status_code
+            payloads[code] = r.json()
+        elapsed = time.perf_counter() - started
+        line = f"{label:<22} round {round_no}: {len(codes) / elapsed:>8,.0f} req/s"
+        if stats:
+            after = stats()
+            not_modified = after["not_modified"] - before["not_modified"]
+            line += (f"  304 {not_modified / len(codes):4.0%}  受信 {after['bytes_received'] - before['bytes_received']:>9,}B"
+                     f"  節約 {after['bytes_saved'] - before['bytes_saved']:>9,}B")
+        print(line)
+    return payloads
+
+
+def check_forecasts(base_url, codes, rounds, cache_dir):
+    fetch_rounds("requests.get", lambda url: requests.get(url, timeout=10), base_url, codes, rounds)
+
+    client = HttpClient(cache_dir=None)
+    fetch_rounds("keep-alive", client.get, base_url, codes, rounds, client.stats_snapshot)
+    client.close()
+
+    client = HttpClient(cache_dir)
+    fresh = fetch_rounds("keep-alive + cache", client.get, base_url, codes, rounds, client.stats_snapshot)
+    stats = client.stats_snapshot()
+    client.close()
+    print(f"{'':<22} 合計: 304 {stats['not_modified_rate']:.0%}, 受信 {stats['bytes_received']:,}B, "
+          f"節約 {stats['bytes_saved']:,}B, キャッシュ {stats['cache_bytes']:,}B")
+    return fresh
+
+
+def check_restart_and_change(server, base_url, codes, cache_dir, fresh):
+    # 再起動してもディスクのキャッシュで 304 になり、内容も同じ
+    client = HttpClient(cache_dir)
+    for code in codes:
+        r = client.get(base_url + FORECAST_PATH.format(code))
+        assert r.from_cache and r.json() == fresh[code]
+    assert client.stats["revalidated"] == len(codes)
+    print(f"再起動後: {len(codes)}件すべて 304 (保存した本体と同じ内容)")
+
+    # 上流の内容が変わったら、新しい本体を返して保存し直す
+    template = copy.deepcopy(server.forecast_template)
+    template[0]["publishingOffice"] = "変更後"
+    set_forecast_template(server, template)
+    for code in codes:
+        r = client.get(base_url + FORECAST_PATH.format(code))
+        assert not r.from_cache and r.json()[0]["publishingOffice"] == "変更後"
+        r = client.get(base_url + FORECAST_PATH.format(code))
+        assert r.from_cache and r.json()[0]["publishingOffice"] == "変更後"
+    print("内容の変更: 新しい本体を取得し、次からはそれで 304")
+    client.close()
+
+
+def check_eviction(base_url, codes, tmp):
+    cache_dir = os.path.join(tmp, "small")
+    probe = HttpClient(cache_dir=None)
+    size = len(probe.get(base_url + FORECAST_PATH.format(codes[0])).content)
+    probe.close()
+    client = HttpClient(cache_dir, max_cache_bytes=size * 10)
+    for code in codes:
+        client.get(base_url + FORECAST_PATH.format(code))
+    stats = client.stats_snapshot()
+    assert stats["cache_bytes"] <= size * 10 and stats["evicted"] == len(codes) - 10
+    objects = sum(len(files) for _, _, files in os.walk(os.path.join(cache_dir, "objects")))
+    assert objects == 10, objects
+    # 最近使った10件は残っている
+    for code in codes[-10:]:
+        assert client.get(base_url + FORECAST_PATH.format(code)).from_cache
+    client.close()
+    print(f"上限 {size * 10:,}B: {len(codes)}件中 {stats['evicted']}件を捨て、使用量 {stats['cache_bytes']:,}B")
+
+
+def check_github(tmp):
+    sys.path.insert(0, GITHUB_DIR)
+    from github_extract import get_extractor
+    from github_scraper import PageFetcher
+    from github_stub import FIXTURE_ORG, start_stub_server as start_github_stub
+
+    server, base_url = start_github_stub(pages=5)
+    extract = get_extractor("fast")
+    cache_dir = os.path.join(tmp, "github")
+    results = []
+    for run in range(2):
+        fetcher = PageFetcher(FIXTURE_ORG, base_url, rate=0, cache_dir=cache_dir)
+        rows = [extract(fetcher.fetch(page), FIXTURE_ORG) for page in range(1, 6)]
+        stats = fetcher.client.stats_snapshot()
+        fetcher.close()
+        results.append(rows)
+        print(f"GitHub {run + 1}回目: 304 {stats['not_modified_rate']:.0%}, 受信 {stats['bytes_received']:,}B, "
+              f"節約 {stats['bytes_saved']:,}B")
+    assert results[0] == results[1]
+    assert server.not_modified_count == 5
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--areas", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0, help="スタブの応答にかかる秒数")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(latency=args.latency)
+    codes = area_codes(args.areas)
+    tmp = tempfile.mkdtemp()
+    try:
+        cache_dir = os.path.join(tmp, "cache")
+        fresh = check_forecasts(base_url, codes, args.rounds, cache_dir)
+        check_restart_and_change(server, base_url, codes, cache_dir, fresh)
+        check_eviction(base_url, codes, tmp)
+        check_github(tmp)
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""nabeatsu を1つずつ呼ぶ場合と、範囲API (count_range / classify_range) を比べる
+
+1つずつ呼ぶ方は 10^8 回だと時間がかかりすぎるので、既定では --sample 個だけ測って
+全体の時間を見積もる (--full で全部測る)。
+
+    python bench_nabeatsu.py --n 100000000 --workers 4
+"""
+import argparse
+import os
+import time
+from collections import Counter
+
+from nabeatsu import CATEGORY_NAMES, classify_range, count_range, nabeatsu
+
+
+def per_call_counts(start, stop):
+    counts = Counter()
+    for n in range(start, stop):
+        result = nabeatsu(n)
+        counts[result if result in ("hoge", "huga", "piyo") else "number"] += 1
+    return {name: counts[name] for name in CATEGORY_NAMES}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=10 ** 8)
+    parser.add_argument("--sample", type=int, default=10 ** 6)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--full", action="store_true", help="1つずつ呼ぶ方も全範囲を測る")
+    args = parser.parse_args()
+
+    n = args.n
+    sample = n if args.full else min(args.sample, n)
+    t0 = time.perf_counter()
+    expected = per_call_counts(1, sample + 1)
+    per_call = (time.perf_counter() - t0) * n / sample
+    note = "" if sample == n else f" ({sample:,}個から見積もり)"
+    print(f"nabeatsu を1つずつ: {per_call:8.2f}秒{note}  {n / per_call / 1e6:8.1f} M/s")
+
+    assert count_range(1, sample + 1) == expected
+
+    t0 = time.perf_counter()
+    counts = count_range(1, n + 1)
+    elapsed = time.perf_counter() - t0
+    print(f"count_range:        {elapsed:8.2f}秒  {n / elapsed / 1e6:8.1f} M/s  ({per_call / elapsed:,.0f}倍)")
+
+    if args.workers and args.workers > 1:
+        t0 = time.perf_counter()
+        parallel = count_range(1, n + 1, workers=args.workers)
+        elapsed = time.perf_counter() - t0
+        assert parallel == counts
+        print(f"count_range x{args.workers:<3}    {elapsed:8.2f}秒  {n / elapsed / 1e6:8.1f} M/s")
+
+    # 分類コードの配列を作る場合 (1要素1バイト)
+    size = min(n, 10 ** 8)
+    t0 = time.perf_counter()
+    codes = classify_range(1, size + 1)
+    elapsed = time.perf_counter() - t0
+    print(f"classify_range:     {elapsed:8.2f}秒  {size / elapsed / 1e6:8.1f} M/s  "
+          f"({codes.nbytes / 1e6:.0f} MB, {size:,}個)")
+    print(counts)
+
+
+if __name__ == "__main__":
+    main()
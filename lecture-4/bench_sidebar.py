@@ -0,0 +1,56 @@
+"""サイドバーを一括構築した場合と遅延構築した場合の
+コントロール数・構築時間・クライアントへ送るコマンド数を比べる
+
+    python bench_sidebar.py
+"""
+import argparse
+import json
+import time
+
+from area_sidebar import AreaPrefixIndex, build_area_sidebar, count_controls
+from jma_stub import load_fixture
+from weather_db import area_rows
+
+
+def synthetic_areas(count):
+    """全国規模を想定したエリア一覧 (code, name, center_name)"""
+    centers = [f"地方{i:02d}" for i in range(11)]
+    rows = [(f"{i:06d}", f"エリア{i:04d}", centers[i % len(centers)]) for i in range(count)]
+    return sorted(rows, key=lambda r: r[2])
+
+
+def measure(label, db_areas, lazy):
+    t0 = time.perf_counter()
+    sidebar = build_area_sidebar(db_areas, lambda code: None, lazy=lazy)
+    # page.add() が行うのと同じく、追加コマンドに変換するまでを構築時間とみなす
+    commands = sidebar._build_add_commands(index={})
+    elapsed = (time.perf_counter() - t0) * 1000
+    payload = len(json.dumps([c.__dict__ for c in commands], default=str))
+    print(f"{label:<6} controls={count_controls(sidebar):>6}  build={elapsed:8.2f}ms  payload≈{payload / 1024:8.1f}KB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--areas", type=int, default=0, help="0のときは fixtures/area.json を使う")
+    args = parser.parse_args()
+
+    if args.areas:
+        db_areas = synthetic_areas(args.areas)
+    else:
+        db_areas = sorted(area_rows(load_fixture("area.json")), key=lambda r: r[2])
+
+    print(f"areas={len(db_areas)}")
+    measure("eager", db_areas, lazy=False)
+    measure("lazy", db_areas, lazy=True)
+
+    index = AreaPrefixIndex(db_areas)
+    queries = [name[:n] for _, name, _ in db_areas for n in (1, 2, 3)]
+    t0 = time.perf_counter()
+    for q in queries:
+        index.search(q)
+    elapsed = time.perf_counter() - t0
+    print(f"prefix search: {len(queries)} queries, {elapsed / len(queries) * 1e6:.1f}us/query")
+
+
+if __name__ == "__main__":
+    main()
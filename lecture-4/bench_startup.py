@@ -0,0 +1,102 @@
+"""起動から最初の描画(サイドバー構築)までの時間を、
+毎回area.jsonを取得する方式とスナップショット方式で比べる
+
+ネットワークありはローカルのスタブサーバー、なしは誰も待ち受けていないポートを使う。
+
+    python bench_startup.py --latency 0.3
+"""
+import argparse
+import os
+import socket
+import statistics
+import tempfile
+import time
+
+import requests
+
+from area_sidebar import build_area_sidebar
+from area_snapshot import revalidate_areas, revalidate_in_background
+from jma_stub import AREA_PATH, start_stub_server
+from weather_db import WeatherRepository
+
+
+def unreachable_url():
+    """接続を拒否されるURL (空いているポートを取ってすぐ閉じる)"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}{AREA_PATH}"
+
+
+def legacy_startup(repo, area_url):
+    """従来のweather-v2/weatherと同じく、起動時にarea.jsonを取りに行く"""
+    area_json = requests.get(area_url, timeout=5).json()
+    repo.save_areas(area_json)
+    return build_area_sidebar(repo.get_areas(), lambda code: None)
+
+
+def snapshot_startup(repo, area_url):
+    """ローカルのareasで描画し、再検証は裏に回す"""
+    sidebar = build_area_sidebar(repo.get_areas(), lambda code: None)
+    thread = revalidate_in_background(repo, area_url)
+    return sidebar, thread
+
+
+def run(label, fn, repeat):
+    samples = []
+    errors = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        try:
+            fn()
+        except requests.RequestException:
+            errors += 1
+            continue
+        samples.append((time.perf_counter() - t0) * 1000)
+    if samples:
+        print(f"{label:<32} first paint p50={statistics.median(samples):8.2f}ms  max={max(samples):8.2f}ms")
+    else:
+        print(f"{label:<32} 起動できず ({errors}/{repeat} 回失敗)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.2, help="スタブサーバーの応答遅延(秒)")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(latency=args.latency)
+    online_url = base_url + AREA_PATH
+    offline_url = unreachable_url()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = WeatherRepository(os.path.join(tmp, "startup.db"))
+        repo.init_schema()
+
+        run("legacy / online", lambda: legacy_startup(repo, online_url), args.repeat)
+        run("legacy / offline", lambda: legacy_startup(repo, offline_url), args.repeat)
+
+        # スナップショットを作っておく
+        revalidate_areas(repo, online_url)
+        threads = []
+
+        def online():
+            _, thread = snapshot_startup(repo, online_url)
+            threads.append(thread)
+
+        def offline():
+            _, thread = snapshot_startup(repo, offline_url)
+            threads.append(thread)
+
+        run("snapshot / online", online, args.repeat)
+        run("snapshot / offline", offline, args.repeat)
+        for thread in threads:
+            thread.join()
+        repo.close()
+
+    print(f"304 Not Modified: {server.not_modified_count}件")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
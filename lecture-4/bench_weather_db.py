@@ -0,0 +1,92 @@
+"""weather-v2のDB処理を、毎回connect/closeする方式とWeatherRepositoryで比較する
+
+    python bench_weather_db.py --clicks 5000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from weather_db import WeatherRepository
+
+TIMES = [f"2026-01-{d:02d}T17:00:00+09:00" for d in (1, 2, 3)]
+WEATHERS = ["晴れ　時々　くもり", "くもり　夜　雨", "雨　後　晴れ"]
+
+
+# --- 従来の1呼び出し1接続の実装 ---
+def legacy_save_forecast(db_name, area_code, times, weathers):
+    conn = sqlite3.connect(db_name)
+    cur = conn.cursor()
+    sql = "INSERT OR REPLACE INTO weather_forecasts VALUES (?, ?, ?);"
+    forecast_data = [(area_code, t[:10], w) for t, w in zip(times, weathers)]
+    cur.executemany(sql, forecast_data)
+    conn.commit()
+    conn.close()
+
+
+def legacy_get_forecast(db_name, area_code):
+    conn = sqlite3.connect(db_name)
+    cur = conn.cursor()
+    cur.execute("SELECT date, weather_text FROM weather_forecasts WHERE area_code = ? ORDER BY date ASC", (area_code,))
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+
+def legacy_init(db_name):
+    conn = sqlite3.connect(db_name)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS weather_forecasts (
+            area_code TEXT, date TEXT, weather_text TEXT,
+            PRIMARY KEY (area_code, date)
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+
+def run(label, clicks, area_codes, save, get):
+    latencies = []
+    for _ in range(clicks):
+        code = random.choice(area_codes)
+        t0 = time.perf_counter()
+        save(code, TIMES, WEATHERS)
+        get(code)
+        latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1e6
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1e6
+    total = sum(latencies)
+    print(f"{label:<12} clicks={clicks:>6}  total={total:7.3f}s  p50={p50:8.1f}us  p99={p99:8.1f}us")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clicks", type=int, default=3000)
+    parser.add_argument("--areas", type=int, default=58)
+    args = parser.parse_args()
+
+    area_codes = [f"{i:02d}0000" for i in range(1, args.areas + 1)]
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_db = os.path.join(tmp, "legacy.db")
+        legacy_init(legacy_db)
+        legacy = run(
+            "open/close", args.clicks, area_codes,
+            lambda c, t, w: legacy_save_forecast(legacy_db, c, t, w),
+            lambda c: legacy_get_forecast(legacy_db, c),
+        )
+
+        repo = WeatherRepository(os.path.join(tmp, "pooled.db"))
+        repo.init_schema()
+        pooled = run("pooled", args.clicks, area_codes, repo.save_forecast, repo.get_forecast)
+        repo.close()
+
+    print(f"speedup: x{legacy / pooled:.1f}")
+
+
+if __name__ == "__main__":
+    main()
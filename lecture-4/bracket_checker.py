@@ -0,0 +1,261 @@
+"""Python演習3 問3 の format_checker を、大きなファイルや大量のファイルに使えるようにしたもの
+
+    >>> format_checker('Hello I’m [(firstname) (lastname)] and I’m {age} years old!')
+    True
+    >>> check_bytes(b'Hello I am [(firstname) (lastname]) ...')
+    CheckResult(ok=False, offset=33, reason="'(' に対して ']' で閉じています")
+
+- ファイルはmmapして、チャンクごとにスタックを引き継ぎながら調べる (全体を文字列にしない)
+- まず位置を記録しない速い方法で正しいかだけを調べる。括弧以外を bytes.translate で消し、
+  隣り合った "()" "[]" "{}" を bytes.replace で消すのを繰り返す (どれもC実装なので速い)
+- 正しくなかったときだけ、正規表現で括弧の位置を拾いながら崩れたチャンクを調べ直して offset を求める
+- 括弧はASCIIなので、UTF-8のファイルはデコードせずにバイト列のまま調べる。offset はバイト位置
+- 複数のファイルはプロセスプールで並列に調べる (check_paths)
+
+    python bracket_checker.py app.log templates/ --workers 8 --glob "*.html"
+"""
+import argparse
+import fnmatch
+import mmap
+import os
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+CHUNK_SIZE = 4 * 1024 * 1024
+
+BRACKET_RE = re.compile(rb'[()\[\]{}]')
+OPEN_FOR = {ord(')'): ord('('), ord(']'): ord('['), ord('}'): ord('{')}
+OPENING = frozenset(OPEN_FOR.values())
+OPENING_BYTES = b"([{"
+NON_BRACKET_BYTES = bytes(b for b in range(256) if b not in b"()[]{}")
+MAX_REPLACE_PASSES = 32
+
+
+class CheckResult(namedtuple("CheckResult", "ok offset reason")):
+    """ok: 正しいか / offset: 最初に対応が崩れた位置 (バイト) / reason: その説明"""
+
+
+def format_checker(text: str) -> bool:
+    """ノートブック版と同じく、正しければTrueを返す"""
+    return check_bytes(text.encode("utf-8")).ok
+
+
+class BracketChecker:
+    """チャンクを順に feed して、最後に finish で結果を受け取る"""
+
+    def __init__(self):
+        self.stack = []  # (開き括弧, 位置)
+        self.position = 0  # 次のチャンクの先頭の位置
+        self.error = None
+
+    def feed(self, chunk, start=0, end=None):
+        """chunk[start:end] を調べる。対応が崩れたらFalseを返し、それ以降は何もしない"""
+        if self.error is not None:
+            return False
+        if end is None:
+            end = len(chunk)
+        base = self.position - start
+        stack = self.stack
+        for m in BRACKET_RE.finditer(chunk, start, end):
+            ch = chunk[m.start()]
+            if ch in OPENING:
+                stack.append((ch, base + m.start()))
+                continue
+            offset = base + m.start()
+            if not stack:
+                self.error = CheckResult(False, offset, f"閉じ括弧 {chr(ch)!r} に対応する開き括弧がありません")
+                return False
+            opened, _ = stack.pop()
+            if opened != OPEN_FOR[ch]:
+                self.error = CheckResult(False, offset, f"{chr(opened)!r} に対して {chr(ch)!r} で閉じています")
+                return False
+        self.position += end - start
+        return True
+
+    def finish(self):
+        if self.error is not None:
+            return self.error
+        if self.stack:
+            opened, offset = self.stack[-1]
+            return CheckResult(False, offset, f"{chr(opened)!r} が閉じられていません")
+        return CheckResult(True, None, None)
+
+
+def _reduce(brackets, carry):
+    """前のチャンクから残った開き括弧 carry に brackets を続け、対応の取れた組を消した残りを返す
+
+    残りに閉じ括弧が含まれるなら対応が崩れているのでNoneを返す。
+    """
+    s = carry + brackets
+    # 1回で消えるのは一番内側の組だけなので、入れ子が深いと回数がかかる。途中からはスタックで処理する
+    for _ in range(MAX_REPLACE_PASSES):
+        reduced = s.replace(b"()", b"").replace(b"[]", b"").replace(b"{}", b"")
+        if len(reduced) == len(s):
+            return None if reduced.translate(None, OPENING_BYTES) else reduced
+        s = reduced
+    stack = bytearray()
+    for ch in s:
+        if ch in OPENING:
+            stack.append(ch)
+        elif not stack or stack.pop() != OPEN_FOR[ch]:
+            return None
+    return bytes(stack)
+
+
+def _scan(buffer, chunk_size):
+    """速い方法で調べて (ok, 崩れたチャンクの先頭, そのチャンクの前に残っていた開き括弧) を返す
+
+    最後まで崩れずに開き括弧が残ったときは、崩れたチャンクの先頭は None。
+    """
+    carry = b""
+    for start in range(0, len(buffer), chunk_size):
+        reduced = _reduce(buffer[start:start + chunk_size].translate(None, NON_BRACKET_BYTES), carry)
+        if reduced is None:
+            return False, start, carry
+        carry = reduced
+    return not carry, None, carry
+
+
+def is_balanced(buffer, chunk_size=CHUNK_SIZE):
+    """位置は求めずに、正しいかどうかだけを返す (buffer は bytes / mmap など)"""
+    return _scan(buffer, chunk_size)[0]
+
+
+def locate_error(buffer, chunk_size=CHUNK_SIZE, start=0, carry=b""):
+    """括弧の位置を拾いながら調べて CheckResult を返す
+
+    start から調べるときは、それより前に残っていた開き括弧を carry に渡す (その位置は分からない)。
+    """
+    checker = BracketChecker()
+    checker.stack = [(ch, None) for ch in carry]
+    checker.position = start
+    for pos in range(start, len(buffer), chunk_size):
+        # 正規表現は buffer (mmapでもよい) を直接なめるので、チャンクをコピーしない
+        if not checker.feed(buffer, pos, min(pos + chunk_size, len(buffer))):
+            break
+    return checker.finish()
+
+
+def check_bytes(data, chunk_size=CHUNK_SIZE):
+    ok, failed_at, carry = _scan(data, chunk_size)
+    if ok:
+        return CheckResult(True, None, None)
+    if failed_at is not None:
+        # 崩れたチャンクだけを調べ直せばよい
+        return locate_error(data, chunk_size, failed_at, carry)
+    # 閉じられていない開き括弧の位置は、最初から調べ直さないと分からない
+    return locate_error(data, chunk_size)
+
+
+def check_stream(chunks):
+    """バイト列のチャンクのイテラブル (ファイルを少しずつ読んだものなど) を調べる
+
+    読み直せないので、最初から位置を拾う方法で調べる。
+    """
+    checker = BracketChecker()
+    for chunk in chunks:
+        if not checker.feed(chunk):
+            break
+    return checker.finish()
+
+
+def check_file(path, chunk_size=CHUNK_SIZE):
+    """ファイルをmmapしてチャンクごとに調べる"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return CheckResult(True, None, None)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return check_bytes(mm, chunk_size)
+
+
+def line_and_column(path, offset):
+    """バイト位置を (行, 列) (どちらも1始まり、列はバイト単位) にする"""
+    line, column = 1, offset + 1
+    with open(path, "rb") as f:
+        read = 0
+        while read < offset:
+            block = f.read(min(CHUNK_SIZE, offset - read))
+            if not block:
+                break
+            newlines = block.count(b"\n")
+            if newlines:
+                line += newlines
+                column = offset - (read + block.rfind(b"\n"))
+            read += len(block)
+    return line, column
+
+
+def _check_path(path):
+    try:
+        return path, check_file(path)
+    except OSError as e:
+        return path, CheckResult(False, None, f"読み込めません: {e}")
+
+
+def iter_files(paths, pattern="*"):
+    """ファイルはそのまま、ディレクトリは pattern に合うファイルを再帰的に列挙する"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if fnmatch.fnmatch(name, pattern):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def check_paths(paths, workers=None, pattern="*"):
+    """ファイル・ディレクトリをまとめて調べ、(path, CheckResult) を入力の順に返す
+
+    大きいファイルから先にワーカーへ渡して、最後に1つだけ大きいファイルが残るのを避ける。
+    """
+    files = list(iter_files(paths, pattern))
+    order = sorted(range(len(files)), key=lambda i: -_size(files[i]))
+    results = [None] * len(files)
+    if workers == 0 or len(files) <= 1:
+        for i in order:
+            results[i] = _check_path(files[i])
+        return results
+    with ProcessPoolExecutor(workers) as pool:
+        for i, result in zip(order, pool.map(_check_path, [files[i] for i in order], chunksize=4)):
+            results[i] = result
+    return results
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="+", help="ファイルまたはディレクトリ")
+    parser.add_argument("--workers", type=int, default=None, help="プロセス数 (0で並列にしない)")
+    parser.add_argument("--glob", default="*", help="ディレクトリの中で調べるファイル名のパターン")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    results = check_paths(args.paths, args.workers, args.glob)
+    elapsed = time.perf_counter() - t0
+    total = sum(_size(path) for path, _ in results)
+    bad = 0
+    for path, result in results:
+        if result.ok:
+            continue
+        bad += 1
+        if result.offset is None:
+            print(f"{path}: {result.reason}")
+        else:
+            line, column = line_and_column(path, result.offset)
+            print(f"{path}:{line}:{column}: {result.reason} (offset {result.offset})")
+    print(f"{len(results)}ファイル ({total / 1e6:.1f} MB) を {elapsed:.2f}秒で確認, "
+          f"NG {bad}ファイル ({total / 1e6 / max(elapsed, 1e-9):.0f} MB/s)")
+    raise SystemExit(1 if bad else 0)
+
+
+if __name__ == "__main__":
+    main()
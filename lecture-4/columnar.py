@@ -0,0 +1,388 @@
+"""SQLiteのテーブルを列ごとのファイル (列指向) に書き出し、memmap で読んで集計する
+
+天気アプリの weather_forecasts / areas と、スクレイパーの repositories を対象にする。
+1テーブル = 1ディレクトリで、列ごとに次のファイルを持つ (大きさと型は _meta.json に書く)。
+
+- int / float: <列>.bin (int64 / float64 の生の配列)。NULL があれば <列>.valid.bin (bool)
+- category: <列>.bin (int32 のコード、NULL は -1)。値の一覧は _meta.json に持つ
+  (エリアコード・天気の文章・言語のように種類が少ない列)
+- text: <列>.offsets.bin (int64, 行数+1) と <列>.data.bin (UTF-8 をつなげたもの)
+
+書き出しは fetchmany() で chunk_size 行ずつ追記するので、行数が増えてもメモリは一定。
+読むときは np.memmap で開くだけで、集計は NumPy の配列演算で行う (Pythonのタプルを作らない)。
+
+    python columnar.py export                       # 両方のDBを columns/ に書き出す
+    python columnar.py repos -k 10                  # 言語別の件数・スター合計・平均・中央値
+    python columnar.py weather
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+COLUMNS_DIR = os.path.join(BASE_DIR, "columns")
+# weather_db.DB_NAME と同じファイル (weather_db を読み込むと requests や lecture_common まで読み込まれるので使わない)
+WEATHER_DB = os.path.join(BASE_DIR, "weather_forecast.db")
+GITHUB_DB = os.path.join(BASE_DIR, os.pardir, "lecture-1", "assignment", "github_repos.db")
+CHUNK_SIZE = 65536
+# スクレイパーが言語の無いリポジトリに入れる値。言語が NULL の行とは別のグループにして、表示するときだけ区別する
+NO_LANGUAGE = "N/A"
+NULL_LANGUAGE = "(NULL)"
+META_FILE = "_meta.json"
+
+# テーブル名 -> [(列名, 種類), ...]
+TABLES = {
+    "weather_forecasts": [("area_code", "category"), ("date", "category"), ("weather_text", "category"),
+                          ("fetched_at", "float"), ("report_datetime", "category")],
+    "areas": [("code", "text"), ("name", "text"), ("center_name", "category")],
+    "repositories": [("repo_name", "text"), ("language", "category"), ("stars", "int")],
+}
+NUMBER_DTYPES = {"int": np.int64, "float": np.float64}
+
+
+# --- 書き出し ---
+class _NumberWriter:
+    def __init__(self, directory, name, kind):
+        self.dtype = NUMBER_DTYPES[kind]
+        self.path = os.path.join(directory, name)
+        self._data = open(self.path + ".bin", "wb")
+        self._valid = open(self.path + ".valid.bin", "wb")
+        self.has_null = False
+
+    def write(self, values):
+        valid = np.fromiter((v is not None for v in values), bool, len(values))
+        if not valid.all():
+            self.has_null = True
+            values = [0 if v is None else v for v in values]
+        np.asarray(values, dtype=self.dtype).tofile(self._data)
+        valid.tofile(self._valid)
+
+    def finish(self):
+        self._data.close()
+        self._valid.close()
+        if not self.has_null:
+            os.remove(self.path + ".valid.bin")
+        return {"nullable": self.has_null}
+
+
+class _CategoryWriter:
+    def __init__(self, directory, name, kind):
+        self._codes = open(os.path.join(directory, name + ".bin"), "wb")
+        self._lookup = {None: -1}
+
+    def write(self, values):
+        lookup = self._lookup
+        codes = np.fromiter((lookup.setdefault(v, len(lookup) - 1) for v in values), np.int32, len(values))
+        codes.tofile(self._codes)
+
+    def finish(self):
+        self._codes.close()
+        return {"categories": [v for v in self._lookup if v is not None]}
+
+
+class _TextWriter:
+    def __init__(self, directory, name, kind):
+        path = os.path.join(directory, name)
+        self._offsets = open(path + ".offsets.bin", "wb")
+        self._data = open(path + ".data.bin", "wb")
+        self._end = 0
+        np.zeros(1, np.int64).tofile(self._offsets)
+
+    def write(self, values):
+        encoded = [(v or "").encode("utf-8") for v in values]
+        lengths = np.fromiter(map(len, encoded), np.int64, len(encoded))
+        offsets = np.cumsum(lengths) + self._end
+        if len(offsets):
+            self._end = int(offsets[-1])
+        offsets.tofile(self._offsets)
+        self._data.write(b"".join(encoded))
+
+    def finish(self):
+        self._offsets.close()
+        self._data.close()
+        return {}
+
+
+WRITERS = {"int": _NumberWriter, "float": _NumberWriter, "category": _CategoryWriter, "text": _TextWriter}
+
+
+def export_query(conn, sql, columns, directory, chunk_size=CHUNK_SIZE):
+    """sql の結果を directory に列ごとに書き出し、行数を返す
+
+    書き終わるまでは directory.tmp に書き、最後に入れ替えるので、読む側が途中の状態を見ることはない。
+    """
+    tmp_dir = directory + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    writers = [WRITERS[kind](tmp_dir, name, kind) for name, kind in columns]
+    rows = 0
+    cursor = conn.execute(sql)
+    while True:
+        chunk = cursor.fetchmany(chunk_size)
+        if not chunk:
+            break
+        for writer, values in zip(writers, zip(*chunk)):
+            writer.write(values)
+        rows += len(chunk)
+    meta = {"rows": rows, "columns": {}}
+    for (name, kind), writer in zip(columns, writers):
+        meta["columns"][name] = dict(kind=kind, **writer.finish())
+    with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+    return rows
+
+
+def select_sql(conn, table, columns):
+    """列を選ぶSELECT文。古いDBファイルに無い列 (後から追加した列) は NULL にする"""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    exprs = [name if name in existing else f"NULL AS {name}" for name, _ in columns]
+    return f"SELECT {', '.join(exprs)} FROM {table}"
+
+
+def export_table(conn, table, out_dir=COLUMNS_DIR, chunk_size=CHUNK_SIZE):
+    columns = TABLES[table]
+    return export_query(conn, select_sql(conn, table, columns), columns, os.path.join(out_dir, table), chunk_size)
+
+
+# --- 読み込み ---
+def _map(path, dtype, count):
+    """ファイルを読み取り専用で memmap する (0行ならファイルを開かずに空の配列)"""
+    if count == 0:
+        return np.empty(0, dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+class CategoryColumn:
+    """codes (int32, NULLは-1) と categories (値の一覧) の組"""
+
+    def __init__(self, codes, categories):
+        self.codes = codes
+        self.categories = categories
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        code = int(self.codes[i])
+        return None if code < 0 else self.categories[code]
+
+    def code_of(self, value):
+        """値のコード。無い値なら None"""
+        try:
+            return self.categories.index(value)
+        except ValueError:
+            return None
+
+
+class TextColumn:
+    """offsets (int64) と UTF-8 のバイト列。i行目は読むときにはじめて str にする"""
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+
+class ColumnTable:
+    """export_table() で書いたディレクトリを開く。列は最初に使うときに memmap する"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.rows = meta["rows"]
+        self.schema = meta["columns"]
+        self._columns = {}
+
+    @property
+    def columns(self):
+        return list(self.schema)
+
+    def _path(self, name, suffix):
+        return os.path.join(self.directory, name + suffix)
+
+    def __getitem__(self, name):
+        if name not in self._columns:
+            info = self.schema[name]
+            kind = info["kind"]
+            if kind in NUMBER_DTYPES:
+                column = _map(self._path(name, ".bin"), NUMBER_DTYPES[kind], self.rows)
+            elif kind == "category":
+                column = CategoryColumn(_map(self._path(name, ".bin"), np.int32, self.rows), info["categories"])
+            else:
+                column = TextColumn(
+                    _map(self._path(name, ".offsets.bin"), np.int64, self.rows + 1),
+                    _map(self._path(name, ".data.bin"), np.uint8, os.path.getsize(self._path(name, ".data.bin"))),
+                )
+            self._columns[name] = column
+        return self._columns[name]
+
+    def valid(self, name):
+        """数値の列の NULL でない行のマスク (NULL の無い列では None)"""
+        if not self.schema[name].get("nullable"):
+            return None
+        return _map(self._path(name, ".valid.bin"), np.bool_, self.rows)
+
+    def to_pandas(self):
+        """pandas.DataFrame にする。数値とカテゴリの列は memmap をそのまま使う (text の列だけ str を作る)"""
+        import pandas as pd
+
+        data = {}
+        for name, info in self.schema.items():
+            column = self[name]
+            if info["kind"] == "category":
+                data[name] = pd.Categorical.from_codes(column.codes, info["categories"])
+            elif info["kind"] == "text":
+                data[name] = [column[i] for i in range(len(column))]
+            else:
+                valid = self.valid(name)
+                if valid is None:
+                    data[name] = pd.Series(column, copy=False)
+                elif info["kind"] == "int":
+                    data[name] = pd.arrays.IntegerArray(np.asarray(column), ~np.asarray(valid))
+                else:
+                    data[name] = pd.arrays.FloatingArray(np.asarray(column), ~np.asarray(valid))
+        return pd.DataFrame(data, copy=False)
+
+
+def open_table(table, out_dir=COLUMNS_DIR):
+    return ColumnTable(os.path.join(out_dir, table))
+
+
+# --- 集計 ---
+def _stars(table):
+    """NULL を 0 にしたスター数 (github_stats の IFNULL(stars, 0) と同じ扱い)"""
+    stars = table["stars"]
+    valid = table.valid("stars")
+    return stars if valid is None else np.where(valid, stars, 0)
+
+
+def summary_order(row):
+    """language_summary の並び: 件数の多い順、同じ件数なら言語名の順で、NULL (None) は最後"""
+    return -row[1], row[0] is None, row[0] or ""
+
+
+def language_label(language):
+    return NULL_LANGUAGE if language is None else language
+
+
+def language_summary(table, limit=None):
+    """[(language, 件数, スター合計, 平均スター, 中央値), ...] を件数の多い順に返す (github_stats と同じ並び)
+
+    言語が NULL の行は language を None にした1つのグループになる ('N/A' の行とはまとめない)。
+
+    言語ごとの件数・合計は bincount、中央値は (言語, スター数) を1つの整数にしてソートして求める。
+    """
+    language = table["language"]
+    stars = _stars(table)
+    groups = np.asarray(language.codes, dtype=np.int64) + 1  # NULL (-1) を 0 番にする
+    n_groups = len(language.categories) + 1
+    counts = np.bincount(groups, minlength=n_groups)
+    totals = np.bincount(groups, weights=stars, minlength=n_groups)
+    # スター数は 2**40 未満なので、上位ビットに言語を入れて1回のソートで言語ごとに並べる
+    # (一時的な配列を増やさないように、groups をそのまま並べ替え用のキーにする)
+    ordered = groups
+    ordered <<= 40
+    ordered |= stars
+    ordered.sort()
+    ordered &= (1 << 40) - 1
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    names = [None] + list(language.categories)
+    summary = []
+    for g in np.flatnonzero(counts):
+        count, start = int(counts[g]), int(starts[g])
+        median = (ordered[start + (count - 1) // 2] + ordered[start + count // 2]) / 2
+        summary.append((names[g], count, int(totals[g]), totals[g] / count, float(median)))
+    summary.sort(key=summary_order)
+    return summary[:limit] if limit is not None else summary
+
+
+def top_repos(table, language=None, k=10):
+    """スター数の多い順にK件の (repo_name, language, stars) を返す。名前はK件分だけ読む
+
+    language=None なら全言語、NULL_LANGUAGE なら言語が NULL の行だけ (github_stats.top_repos と同じ)。
+    """
+    stars = _stars(table)
+    indices = None
+    if language is not None:
+        code = -1 if language == NULL_LANGUAGE else table["language"].code_of(language)
+        if code is None:
+            return []
+        indices = np.flatnonzero(np.asarray(table["language"].codes) == code)
+        stars = stars[indices]
+    if len(stars) > k:
+        top = np.argpartition(stars, len(stars) - k)[len(stars) - k:]
+    else:
+        top = np.arange(len(stars))
+    top = top[np.argsort(-stars[top], kind="stable")]
+    rows = top if indices is None else indices[top]
+    names, languages = table["repo_name"], table["language"]
+    return [(names[int(r)], languages[int(r)], int(stars[i])) for r, i in zip(rows, top)]
+
+
+def weather_counts(table):
+    """エリア × 天気の文章 ごとの予報の件数。(エリアコードの一覧, 天気の一覧, 件数の行列) を返す"""
+    areas, weathers = table["area_code"], table["weather_text"]
+    n_areas, n_weathers = len(areas.categories), len(weathers.categories) + 1
+    codes = np.asarray(areas.codes, dtype=np.int64) * n_weathers + np.asarray(weathers.codes) + 1
+    valid = np.asarray(areas.codes) >= 0
+    matrix = np.bincount(codes[valid], minlength=n_areas * n_weathers).reshape(n_areas, n_weathers)
+    return areas.categories, [None] + list(weathers.categories), matrix
+
+
+def rain_ratio(table):
+    """[(area_code, 予報の件数, 「雨」を含む予報の割合), ...] を割合の高い順に返す"""
+    area_codes, texts, matrix = weather_counts(table)
+    rainy = np.array([text is not None and "雨" in text for text in texts])
+    totals = matrix.sum(axis=1)
+    ratios = matrix[:, rainy].sum(axis=1) / np.maximum(totals, 1)
+    order = np.lexsort((area_codes, -ratios))
+    return [(area_codes[i], int(totals[i]), float(ratios[i])) for i in order if totals[i]]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["export", "repos", "top", "weather"])
+    parser.add_argument("--weather-db", default=WEATHER_DB)
+    parser.add_argument("--github-db", default=GITHUB_DB)
+    parser.add_argument("--out", default=COLUMNS_DIR)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--language")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        for db_path, tables in ((args.weather_db, ("weather_forecasts", "areas")), (args.github_db, ("repositories",))):
+            if not os.path.exists(db_path):
+                print(f"{db_path} がありません", file=sys.stderr)
+                continue
+            conn = sqlite3.connect(db_path)
+            for table in tables:
+                rows = export_table(conn, table, args.out, args.chunk_size)
+                print(f"{table}: {rows:,}行 -> {os.path.join(args.out, table)}")
+            conn.close()
+    elif args.command == "repos":
+        for language, count, total, mean, median in language_summary(open_table("repositories", args.out), args.k):
+            print(f"{language_label(language):<20} {count:>8,}件  スター合計 {total:>12,}  平均 {mean:>8.1f}  中央値 {median:>8.1f}")
+    elif args.command == "top":
+        for name, language, stars in top_repos(open_table("repositories", args.out), args.language, args.k):
+            print(f"{stars:>8,}  {language_label(language):<12} {name}")
+    else:
+        for area_code, count, ratio in rain_ratio(open_table("weather_forecasts", args.out))[:args.k]:
+            print(f"{area_code}  {count:>6,}件  雨 {ratio:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Python演習3 問2 の combination_sum をモジュールにしたもの
+
+    >>> combination_sum([2, 3, 6, 7], 7)
+    [[2, 2, 3], [7]]
+    >>> count_combinations([2, 9, 11], 100)
+    31
+
+ノートブック版は候補をソートせず、remain < 0 になるまで全部の枝を再帰でたどり、
+見つけた組み合わせを全部リストに溜めていた。ここでは
+
+- 候補をソートして、remain を超えた候補でループを打ち切る
+- 「候補 i 以降で remain を作れるか」を先にDPで求めておき、答えにつながらない枝には入らない
+- 再帰ではなく自前のスタックでたどり、組み合わせを1つずつyieldする (iter_combinations)
+- 個数だけなら組み合わせを作らずにDPで数える (count_combinations)
+- (開始位置, 残り) ごとの部分解をメモ化して、何度も問い合わせるときに使い回す (CombinationMemo)
+
+どの方法でも、組み合わせはソート済みの候補の辞書順で並ぶ。
+"""
+import argparse
+import time
+
+
+def prepare_candidates(candidates):
+    """重複を除いて昇順に並べる。自然数でない値があればValueError"""
+    values = sorted(set(candidates))
+    if values and (values[0] <= 0 or any(not isinstance(v, int) for v in values)):
+        raise ValueError(f"候補は自然数にしてください: {candidates!r}")
+    return values
+
+
+def reachable_table(values, target):
+    """reach[i][r]: values[i:] を何度でも使って r を作れるなら 1"""
+    n = len(values)
+    reach = [None] * (n + 1)
+    last = bytearray(target + 1)
+    last[0] = 1
+    reach[n] = last
+    for i in range(n - 1, -1, -1):
+        c = values[i]
+        row = bytearray(last)
+        for r in range(c, target + 1):
+            if row[r - c]:
+                row[r] = 1
+        reach[i] = row
+        last = row
+    return reach
+
+
+def iter_combinations(candidates, target):
+    """合計が target になる組み合わせを1つずつタプルでyieldする"""
+    if target < 0:
+        return
+    values = prepare_candidates(candidates)
+    n = len(values)
+    reach = reachable_table(values, target)
+    if not reach[0][target]:
+        return
+
+    combo = []  # 選んだ値
+    chosen = []  # 選んだ値の位置
+    remain = target
+    i = 0
+    while True:
+        if remain == 0:
+            yield tuple(combo)
+        else:
+            # i 以降で、選んだ後も残りを作れる最初の候補を探す (ソート済みなので超えたら打ち切り)
+            j = i
+            while j < n and values[j] <= remain and not reach[j][remain - values[j]]:
+                j += 1
+            if j < n and values[j] <= remain:
+                combo.append(values[j])
+                chosen.append(j)
+                remain -= values[j]
+                i = j
+                continue
+        # 1つ戻って、次の候補から探し直す
+        if not chosen:
+            return
+        i = chosen.pop() + 1
+        remain += combo.pop()
+
+
+def combination_sum(candidates: list, target: int) -> list:
+    """ノートブック版と同じく [[2, 2, 3], [7]] の形のリストで返す"""
+    return [list(combo) for combo in iter_combinations(candidates, target)]
+
+
+def count_combinations(candidates, target):
+    """組み合わせの個数だけを O(候補数 × target) のDPで数える"""
+    if target < 0:
+        return 0
+    ways = [0] * (target + 1)
+    ways[0] = 1
+    for c in prepare_candidates(candidates):
+        for r in range(c, target + 1):
+            ways[r] += ways[r - c]
+    return ways[target]
+
+
+class CombinationMemo:
+    """(開始位置, 残り) ごとの部分解をメモ化して、同じ候補で何度も問い合わせるときに使い回す
+
+    部分解はタプルのタプルで持ち、上位の解は下位の解を共有して作る。
+    1回だけなら iter_combinations の方が速くメモリも少ないが、
+    target を変えて何度も聞くときは、2回目以降はメモを引くだけになる。
+    """
+
+    def __init__(self, candidates):
+        self.values = prepare_candidates(candidates)
+        self.memo = {}
+        self.filled = -1  # 残りがこの値以下の部分問題はすべてメモ済み
+
+    def _solve(self, start, remain):
+        if remain == 0:
+            return ((),)
+        found = []
+        memo = self.memo
+        for j in range(start, len(self.values)):
+            c = self.values[j]
+            if c > remain:
+                break
+            # 残りの小さい部分問題は先に埋めてあるので、ここで再帰はしない
+            for rest in memo.get((j, remain - c), ()):
+                found.append((c,) + rest)
+        return tuple(found)
+
+    def solutions(self, target):
+        """組み合わせのタプルのタプルを返す"""
+        if target < 0:
+            return ()
+        if target == 0:
+            return ((),)
+        # 残りの小さい方から順に埋める (再帰の深さが target / 最小の候補 にならないように)
+        for remain in range(self.filled + 1, target + 1):
+            for start in range(len(self.values) - 1, -1, -1):
+                result = self._solve(start, remain)
+                if result:
+                    self.memo[(start, remain)] = result
+        self.filled = max(self.filled, target)
+        return self.memo.get((0, target), ())
+
+
+def combination_sum_memo(candidates, target, memo=None):
+    """CombinationMemo を使って組み合わせのリストを作る。memo を渡すと使い回す"""
+    if memo is None:
+        memo = CombinationMemo(candidates)
+    return [list(combo) for combo in memo.solutions(target)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("target", type=int)
+    parser.add_argument("candidates", type=int, nargs="+")
+    parser.add_argument("--count", action="store_true", help="個数だけを数える")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    if args.count:
+        print(count_combinations(args.candidates, args.target))
+    else:
+        for combo in iter_combinations(args.candidates, args.target):
+            print(list(combo))
+    print(f"({(time.perf_counter() - t0) * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""取得した予報を上書きせずに積み上げていく履歴アーカイブ
+
+日付は1970-01-01からの日数、取得時刻はepoch秒の整数で持ち、
+天気の文章 (「晴れ　時々　くもり」など) は weather_texts に1度だけ保存してIDで参照する。
+主キーが (area_code, target_day, fetched_at) なので、
+「エリアXの日付A〜Bの予報」は主キーの範囲検索だけで済む。
+"""
+from datetime import date, datetime, timedelta, timezone
+
+JST = timezone(timedelta(hours=9))
+EPOCH = date(1970, 1, 1)
+SECONDS_PER_DAY = 86400
+JST_OFFSET = 9 * 3600
+
+CREATE_WEATHER_TEXTS_SQL = """
+    CREATE TABLE IF NOT EXISTS weather_texts (
+        id INTEGER PRIMARY KEY,
+        text TEXT UNIQUE
+    )
+"""
+CREATE_FORECAST_ARCHIVE_SQL = """
+    CREATE TABLE IF NOT EXISTS forecast_archive (
+        area_code INTEGER,
+        target_day INTEGER,
+        fetched_at INTEGER,
+        text_id INTEGER,
+        PRIMARY KEY (area_code, target_day, fetched_at)
+    ) WITHOUT ROWID
+"""
+ARCHIVE_SCHEMA = (CREATE_WEATHER_TEXTS_SQL, CREATE_FORECAST_ARCHIVE_SQL)
+
+INSERT_ARCHIVE_SQL = "INSERT OR IGNORE INTO forecast_archive VALUES (?, ?, ?, ?)"
+INSERT_TEXT_SQL = "INSERT OR IGNORE INTO weather_texts (text) VALUES (?)"
+
+SELECT_HISTORY_SQL = """
+    SELECT a.target_day, a.fetched_at, t.text
+    FROM forecast_archive a JOIN weather_texts t ON t.id = a.text_id
+    WHERE a.area_code = ? AND a.target_day BETWEEN ? AND ?
+    ORDER BY a.target_day, a.fetched_at
+"""
+# 対象日ごとに最後に取得した予報を「答え」とみなし、
+# 何日前の予報がそれと一致していたかをリードタイム別に集計する
+DRIFT_SQL = """
+    WITH versions AS (
+        SELECT area_code, target_day, text_id,
+               target_day - (fetched_at + {offset}) / {day} AS lead_days,
+               LAST_VALUE(text_id) OVER (
+                   PARTITION BY area_code, target_day ORDER BY fetched_at
+                   ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+               ) AS final_text_id
+        FROM forecast_archive
+        {where}
+    )
+    SELECT area_code, lead_days, COUNT(*) AS versions,
+           AVG(text_id = final_text_id) AS match_rate
+    FROM versions
+    GROUP BY area_code, lead_days
+    ORDER BY area_code, lead_days DESC
+"""
+
+
+def day_number(value):
+    """'2026-10-18' / date / datetime を1970-01-01からの日数にする"""
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    elif isinstance(value, datetime):
+        value = value.date()
+    return (value - EPOCH).days
+
+
+def day_to_date(day):
+    return EPOCH + timedelta(days=day)
+
+
+class TextDictionary:
+    """weather_texts の文字列 -> ID を接続ごとにキャッシュする"""
+
+    def __init__(self):
+        self._ids = {}
+
+    def id_for(self, conn, text):
+        text_id = self._ids.get(text)
+        if text_id is None:
+            conn.execute(INSERT_TEXT_SQL, (text,))
+            text_id = conn.execute("SELECT id FROM weather_texts WHERE text = ?", (text,)).fetchone()[0]
+            self._ids[text] = text_id
+        return text_id
+
+
+def archive_rows(conn, texts, area_code, times, weathers, fetched_at):
+    code = int(area_code)
+    fetched = int(fetched_at)
+    for t, w in zip(times, weathers):
+        yield (code, day_number(t), fetched, texts.id_for(conn, w))
+
+
+def append_forecast(conn, texts, area_code, times, weathers, fetched_at):
+    """1回分の取得結果をアーカイブに追記する (同じ取得時刻の重複は無視)"""
+    rows = list(archive_rows(conn, texts, area_code, times, weathers, fetched_at))
+    conn.executemany(INSERT_ARCHIVE_SQL, rows)
+
+
+def forecast_history(conn, area_code, start, end):
+    """エリアの start〜end (両端含む) の予報履歴を [(date, fetched_at, text), ...] で返す"""
+    rows = conn.execute(SELECT_HISTORY_SQL, (int(area_code), day_number(start), day_number(end)))
+    return [
+        (day_to_date(day).isoformat(), datetime.fromtimestamp(fetched, JST), text)
+        for day, fetched, text in rows
+    ]
+
+
+def forecast_drift(conn, area_code=None):
+    """リードタイム別に最終予報と一致した割合を返す
+
+    [(area_code, lead_days, versions, match_rate), ...]
+    """
+    where, params = "", ()
+    if area_code is not None:
+        where, params = "WHERE area_code = ?", (int(area_code),)
+    sql = DRIFT_SQL.format(offset=JST_OFFSET, day=SECONDS_PER_DAY, where=where)
+    return [
+        (f"{code:06d}", lead_days, versions, match_rate)
+        for code, lead_days, versions, match_rate in conn.execute(sql, params)
+    ]
@@ -0,0 +1,241 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from lecture_common.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+JST = timezone(timedelta(hours=9))
+# 気象庁の天気予報は 5時・11時・17時 に発表される
+JMA_REPORT_HOURS = (5, 11, 17)
+# 発表からJSONに反映されるまでの猶予
+REPORT_GRACE = timedelta(minutes=10)
+
+
+def extract_weathers(data):
+    """forecast JSONから (report_datetime, times, weathers) を取り出す"""
+    head = data[0]
+    ts = head["timeSeries"][0]
+    return (
+        head.get("reportDatetime"),
+        ts.get("timeDefines", []),
+        ts.get("areas", [])[0].get("weathers", []),
+    )
+
+
+def next_report_time(report_datetime):
+    """reportDatetimeの次に予定されている発表時刻(epoch秒)を返す"""
+    try:
+        reported = datetime.fromisoformat(report_datetime).astimezone(JST)
+    except (TypeError, ValueError):
+        return None
+    day = reported.replace(hour=0, minute=0, second=0, microsecond=0)
+    for offset in (0, 1):
+        for hour in JMA_REPORT_HOURS:
+            candidate = day + timedelta(days=offset, hours=hour)
+            if candidate > reported:
+                return (candidate + REPORT_GRACE).timestamp()
+    return None
+
+
+class CacheEntry:
+    __slots__ = ("rows", "fetched_at", "expires_at")
+
+    def __init__(self, rows, fetched_at, expires_at):
+        self.rows = rows
+        self.fetched_at = fetched_at
+        self.expires_at = expires_at
+
+
+class ForecastCache:
+    """メモリ上のLRU + SQLite(weather_forecasts)の2段キャッシュ
+
+    エントリは取得から ttl 秒、または次回の気象庁発表時刻のどちらか早い方まで新鮮とみなす。
+    期限切れのエントリは即座に返し、裏で再取得する (stale-while-revalidate)。
+    同じエリアの取得が同時に起きたときは、上流へのリクエストは1回にまとめて結果を共有する。
+    """
+
+    def __init__(self, repo, fetcher, ttl=600, min_ttl=60, max_entries=64, max_workers=2, clock=time.time):
+        self.repo = repo
+        self.fetcher = fetcher  # area_code -> forecast JSON (失敗時はNone)
+        self.ttl = ttl
+        self.min_ttl = min_ttl  # 発表が遅れているときに毎回取りに行かないための下限
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._inflight = {}  # area_code -> 取得中の Future
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="forecast-refresh")
+        self.stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "db_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "upstream_fetches": 0,
+            "upstream_errors": 0,
+            "coalesced": 0,
+        }
+
+    def _count(self, name):
+        # get() は複数のUIワーカーから、再取得は executor のスレッドから呼ばれる
+        with self._lock:
+            self.stats[name] += 1
+
+    def _expires_at(self, fetched_at, report_datetime):
+        expires_at = fetched_at + self.ttl
+        next_report = next_report_time(report_datetime)
+        if next_report is not None:
+            expires_at = min(expires_at, max(next_report, fetched_at + self.min_ttl))
+        return expires_at
+
+    def _put(self, area_code, entry):
+        with self._lock:
+            self._entries[area_code] = entry
+            self._entries.move_to_end(area_code)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def _lookup(self, area_code):
+        with self._lock:
+            entry = self._entries.get(area_code)
+            if entry is not None:
+                self._entries.move_to_end(area_code)
+            return entry
+
+    def _load_from_db(self, area_code):
+        rows, fetched_at, report_datetime = self.repo.get_forecast_with_meta(area_code)
+        if not rows:
+            return None
+        if fetched_at is None:
+            # fetched_at列追加前の行は期限切れ扱いにする
+            fetched_at = 0.0
+        entry = CacheEntry(rows, fetched_at, self._expires_at(fetched_at, report_datetime))
+        self._put(area_code, entry)
+        return entry
+
+    def _fetch(self, area_code):
+        """上流から取得してDBとメモリを更新する。失敗時はNone"""
+        self._count("upstream_fetches")
+        try:
+            data = self.fetcher(area_code)
+            if data is None:
+                raise ValueError("empty response")
+            with tracer.span("weather.extract", area=area_code):
+                report_datetime, times, weathers = extract_weathers(data)
+        except Exception as e:
+            self._count("upstream_errors")
+            tracer.count("weather.upstream_errors")
+            logger.warning("予報を取得できませんでした: %s (%s)", area_code, e)
+            return None
+        fetched_at = self.clock()
+        with tracer.span("weather.store", area=area_code), self.repo.transaction():
+            self.repo.save_forecast(area_code, times, weathers, fetched_at, report_datetime)
+            self.repo.ingest_forecast(area_code, data)
+        entry = CacheEntry(
+            self.repo.get_forecast(area_code),
+            fetched_at,
+            self._expires_at(fetched_at, report_datetime),
+        )
+        self._put(area_code, entry)
+        return entry
+
+    def _fetch_coalesced(self, area_code, refresh=False):
+        """_fetch と同じだが、同じエリアを取得中のスレッドがあればその結果を待って使う
+
+        refresh=False のときは、待っている間に他のスレッドが新しいエントリを入れていればそれを返す。
+        """
+        with self._lock:
+            future = self._inflight.get(area_code)
+            leader = future is None
+            if leader:
+                future = self._inflight[area_code] = Future()
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            tracer.count("weather.coalesced")
+            return future.result()
+        try:
+            entry = None if refresh else self._lookup(area_code)
+            if entry is None or entry.expires_at <= self.clock():
+                entry = self._fetch(area_code)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(entry)
+        finally:
+            with self._lock:
+                del self._inflight[area_code]
+        return entry
+
+    def _refresh_in_background(self, area_code, on_refresh):
+        with self._lock:
+            if area_code in self._refreshing:
+                return
+            self._refreshing.add(area_code)
+
+        def task():
+            # executor の Future は誰も見ないので、例外はここでログに出す
+            try:
+                entry = self._fetch_coalesced(area_code, refresh=True)
+                if entry is not None and on_refresh is not None:
+                    on_refresh(area_code, entry.rows)
+            except Exception:
+                logger.exception("予報の再取得に失敗しました: %s", area_code)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(area_code)
+
+        self._executor.submit(task)
+
+    def get(self, area_code, on_refresh=None):
+        """予報の行 [(date, weather_text), ...] を返す
+
+        期限切れのデータを返した場合は裏で再取得し、完了後に
+        on_refresh(area_code, rows) を呼ぶ。
+        """
+        entry = self._lookup(area_code)
+        if entry is None:
+            entry = self._load_from_db(area_code)
+            if entry is not None:
+                self._count("db_hits")
+
+        if entry is None:
+            self._count("misses")
+            tracer.count("weather.cache_misses")
+            entry = self._fetch_coalesced(area_code)
+            return entry.rows if entry is not None else []
+
+        if entry.expires_at > self.clock():
+            self._count("hits")
+            tracer.count("weather.cache_hits")
+        else:
+            self._count("stale_hits")
+            tracer.count("weather.cache_stale_hits")
+            self._refresh_in_background(area_code, on_refresh)
+        return entry.rows
+
+    def invalidate(self, area_code=None):
+        with self._lock:
+            if area_code is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(area_code, None)
+
+    def snapshot_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = (lookups - stats["misses"]) / lookups if lookups else 0.0
+        return stats
+
+    def close(self):
+        self._executor.shutdown(wait=True)
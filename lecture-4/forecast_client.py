@@ -0,0 +1,64 @@
+"""forecast_server.py を読むクライアント (weather-v2 のクライアントモード用)
+
+ForecastCache と同じ get(area_code, on_refresh=None) を持つので、アプリ側は差し替えるだけでよい。
+前回のレスポンスとETagを覚えておき、条件付きGETで変わっていなければそれを使う。
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from lecture_common.tracing import tracer
+
+
+class ForecastClient:
+    def __init__(self, base_url, timeout=10, pool_size=4):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self._cached = {}  # path -> (etag, 変換済みの値)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "not_modified": 0, "errors": 0}
+
+    def _get(self, path, convert):
+        with self._lock:
+            etag, value = self._cached.get(path, (None, None))
+            self.stats["requests"] += 1
+        headers = {"If-None-Match": etag} if etag else None
+        with tracer.span("client.request", path=path):
+            r = self.session.get(self.base_url + path, headers=headers, timeout=self.timeout)
+        if r.status_code == 304 and value is not None:
+            with self._lock:
+                self.stats["not_modified"] += 1
+            return value
+        if r.status_code != 200:
+            with self._lock:
+                self.stats["errors"] += 1
+            r.raise_for_status()
+            raise requests.HTTPError(f"unexpected status {r.status_code}", response=r)
+        value = convert(r.json())
+        with self._lock:
+            self._cached[path] = (r.headers.get("ETag"), value)
+        return value
+
+    def get_areas(self):
+        """[(code, name, center_name), ...] (areasテーブルと同じ形)"""
+        return self._get("/areas", lambda rows: [tuple(r) for r in rows])
+
+    def get(self, area_code, on_refresh=None):
+        """予報の行 [(date, weather_text), ...]。取得できなければ空のリスト
+
+        再取得はサーバー側で行うので on_refresh は使わない (ForecastCache と揃えるための引数)。
+        """
+        try:
+            return self._get(f"/forecast/{area_code}", lambda data: [tuple(r) for r in data["forecast"]])
+        except requests.RequestException:
+            return []
+
+    def server_stats(self):
+        r = self.session.get(self.base_url + "/stats", timeout=self.timeout)
+        r.raise_for_status()
+        return r.json()
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,136 @@
+"""気象庁forecast JSONの全timeSeriesを正規化テーブルに取り込む
+
+forecast JSON は [直近3日の予報, 週間予報] の2要素の配列で、それぞれの timeSeries に
+weathers / winds / waves / pops / temps / tempsMin ... といった要素が並んでいる。
+これを (office, area, element, series, time) ごとの1行に展開して保存する。
+"""
+
+CREATE_FORECAST_AREAS_SQL = """
+    CREATE TABLE IF NOT EXISTS forecast_areas (
+        code TEXT PRIMARY KEY,
+        name TEXT,
+        office_code TEXT
+    )
+"""
+CREATE_FORECAST_ELEMENTS_SQL = """
+    CREATE TABLE IF NOT EXISTS forecast_elements (
+        id INTEGER PRIMARY KEY,
+        name TEXT UNIQUE
+    )
+"""
+# series: 0 = 直近の予報, 1 = 週間予報
+CREATE_FORECAST_VALUES_SQL = """
+    CREATE TABLE IF NOT EXISTS forecast_values (
+        area_code TEXT,
+        element_id INTEGER,
+        series INTEGER,
+        time_define TEXT,
+        office_code TEXT,
+        value TEXT,
+        report_datetime TEXT,
+        PRIMARY KEY (area_code, element_id, series, time_define)
+    ) WITHOUT ROWID
+"""
+# office単位で「ある要素の時系列」を引くときにテーブル本体を見なくて済むようにする
+CREATE_FORECAST_VALUES_INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS idx_forecast_values_office
+    ON forecast_values (office_code, element_id, series, time_define, area_code, value)
+"""
+INGEST_SCHEMA = (
+    CREATE_FORECAST_AREAS_SQL,
+    CREATE_FORECAST_ELEMENTS_SQL,
+    CREATE_FORECAST_VALUES_SQL,
+    CREATE_FORECAST_VALUES_INDEX_SQL,
+)
+
+INSERT_VALUE_SQL = "INSERT OR REPLACE INTO forecast_values VALUES (?, ?, ?, ?, ?, ?, ?)"
+INSERT_ELEMENT_SQL = "INSERT OR IGNORE INTO forecast_elements (id, name) VALUES (?, ?)"
+INSERT_FORECAST_AREA_SQL = "INSERT OR REPLACE INTO forecast_areas VALUES (?, ?, ?)"
+
+AVERAGE_KEYS = ("tempAverage", "precipAverage")
+
+
+class ElementIds:
+    """要素名 -> ID の対応表。新しい要素は取り込み後にまとめて登録する"""
+
+    def __init__(self, conn):
+        self._ids = dict((name, id_) for id_, name in conn.execute("SELECT id, name FROM forecast_elements"))
+        self._next = max(self._ids.values(), default=0) + 1
+        self.new = []
+
+    def __call__(self, name):
+        id_ = self._ids.get(name)
+        if id_ is None:
+            id_ = self._ids[name] = self._next
+            self._next += 1
+            self.new.append((id_, name))
+        return id_
+
+    def flush(self, conn):
+        if self.new:
+            conn.executemany(INSERT_ELEMENT_SQL, self.new)
+            self.new = []
+
+
+def iter_forecast_values(office_code, data, element_id, area_names):
+    """JSONを1回なめながら forecast_values の行を順に返す
+
+    途中で見つけた地域名は area_names に詰める。
+    """
+    for series, report in enumerate(data):
+        report_datetime = report.get("reportDatetime")
+        for ts in report.get("timeSeries", []):
+            times = ts.get("timeDefines", [])
+            for area in ts.get("areas", []):
+                info = area.get("area", {})
+                area_code = info.get("code")
+                if area_code is None:
+                    continue
+                area_names[area_code] = info.get("name")
+                for key, values in area.items():
+                    if key == "area" or not isinstance(values, list):
+                        continue
+                    eid = element_id(key)
+                    for t, v in zip(times, values):
+                        if v != "":
+                            yield (area_code, eid, series, t, office_code, v, report_datetime)
+
+        for avg_key in AVERAGE_KEYS:
+            for area in report.get(avg_key, {}).get("areas", []):
+                info = area.get("area", {})
+                area_code = info.get("code")
+                if area_code is None:
+                    continue
+                area_names[area_code] = info.get("name")
+                for key in ("min", "max"):
+                    v = area.get(key, "")
+                    if v != "":
+                        yield (area_code, element_id(f"{avg_key}.{key}"), series, "", office_code, v, report_datetime)
+
+
+def ingest_forecasts(conn, payloads):
+    """(office_code, data) の並びをまとめて取り込み、書き込んだ行数を返す
+
+    呼び出し側でトランザクションを張っておくこと。
+    """
+    element_id = ElementIds(conn)
+    area_names = {}
+    office_of = {}
+    before = conn.total_changes
+
+    def rows():
+        for office_code, data in payloads:
+            names = {}
+            yield from iter_forecast_values(office_code, data, element_id, names)
+            for code in names:
+                office_of[code] = office_code
+            area_names.update(names)
+
+    conn.executemany(INSERT_VALUE_SQL, rows())
+    written = conn.total_changes - before
+    element_id.flush(conn)
+    conn.executemany(
+        INSERT_FORECAST_AREA_SQL,
+        ((code, name, office_of[code]) for code, name in area_names.items()),
+    )
+    return written
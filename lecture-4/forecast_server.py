@@ -0,0 +1,213 @@
+"""複数の weather-v2 から共有する、ローカルの予報キャッシュサーバー
+
+気象庁への取得はこのサーバーだけが行い、各端末のアプリはクライアントモード
+(環境変数 FORECAST_SERVER_URL) でここから読む。中身は weather-v2 と同じ
+WeatherRepository (SQLite) と ForecastCache なので、
+
+- GET /areas              areasテーブルの行 [[code, name, center_name], ...]
+- GET /forecast/{code}    {"area_code": .., "forecast": [[date, weather_text], ...]}
+- GET /stats              キャッシュの統計
+
+を返す。同じエリアへの同時リクエストは ForecastCache が上流1回の取得にまとめる。
+レスポンスは内容が変わるまでエンコード済みのバイト列を使い回し、ETag を付けて
+If-None-Match には 304 を返す。
+
+    python forecast_server.py --port 8770
+    python forecast_server.py --port 8770 --upstream http://127.0.0.1:8765 --db /tmp/shared.db
+    FORECAST_SERVER_URL=http://127.0.0.1:8770 flet run weather-v2.py
+"""
+import argparse
+import hashlib
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from requests.adapters import HTTPAdapter
+from lecture_common.tracing import tracer
+
+from area_snapshot import revalidate_areas
+from forecast_cache import ForecastCache
+from weather_db import DB_NAME, WeatherRepository
+
+JMA_BASE_URL = "https://www.jma.go.jp"
+AREA_PATH = "/bosai/common/const/area.json"
+FORECAST_PATH = "/bosai/forecast/data/forecast/{}.json"
+SERVER_FORECAST_RE = re.compile(r"^/forecast/(\d{6})$")
+
+
+def make_upstream_fetcher(base_url, pool_size=8, timeout=10):
+    """area_code -> forecast JSON (失敗時はNone) を返す、keep-aliveのセッションを使う関数"""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+    def fetch(area_code):
+        with tracer.span("server.upstream", area=area_code):
+            r = session.get(base_url + FORECAST_PATH.format(area_code), timeout=timeout)
+        if r.status_code != 200:
+            return None
+        return r.json()
+    fetch.session = session
+    return fetch
+
+
+class ResponseCache:
+    """同じ内容 (同じ rows オブジェクト) のあいだ、エンコード済みのボディとETagを使い回す"""
+
+    def __init__(self):
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, source, encode):
+        with self._lock:
+            cached = self._bodies.get(key)
+        if cached is not None and cached[0] is source:
+            return cached[1], cached[2]
+        body = json.dumps(encode(source), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        with self._lock:
+            self._bodies[key] = (source, body, etag)
+        return body, etag
+
+
+class ForecastRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-aliveを有効にする
+    # ヘッダーと本体を別々に書くので、Nagle と遅延ACKで1往復40msほど待たされないようにする
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        with tracer.span("server.request"):
+            self._route(server)
+
+    def _route(self, server):
+        if self.path == "/areas":
+            areas = server.areas()
+            body, etag = server.responses.get("areas", areas, lambda rows: [list(r) for r in rows])
+            self._send_cached(body, etag)
+            return
+        m = SERVER_FORECAST_RE.match(self.path)
+        if m:
+            area_code = m.group(1)
+            rows = server.cache.get(area_code)
+            if not rows:
+                self._send(502, b'{"error": "upstream unavailable"}')
+                return
+            body, etag = server.responses.get(("forecast", area_code), rows, lambda rows: {
+                "area_code": area_code,
+                "forecast": [list(r) for r in rows],
+            })
+            self._send_cached(body, etag)
+            return
+        if self.path == "/stats":
+            stats = dict(server.cache.snapshot_stats(), requests=server.request_count)
+            self._send(200, json.dumps(stats).encode("utf-8"))
+            return
+        self._send(404, b'{"error": "not found"}')
+
+    def _send_cached(self, body, etag):
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, b"", {"ETag": etag})
+        else:
+            self._send(200, body, {"ETag": etag})
+
+    def _send(self, status, body, headers=None):
+        self.server.count_request()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ForecastServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 多数の端末が同時につないでも接続を取りこぼさないようにする
+    request_queue_size = 128
+
+    def __init__(self, address, repo, cache, area_url=None):
+        super().__init__(address, ForecastRequestHandler)
+        self.repo = repo
+        self.cache = cache
+        self.area_url = area_url
+        self.responses = ResponseCache()
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+        self._areas = None
+        self._areas_lock = threading.Lock()
+
+    def count_request(self):
+        with self._count_lock:
+            self.request_count += 1
+
+    def areas(self):
+        """areasテーブルの行。一度読んだらメモリに置き、reload_areas() まで使い回す"""
+        areas = self._areas
+        if areas is None:
+            with self._areas_lock:
+                if self._areas is None:
+                    self._areas = self.repo.get_areas()
+                areas = self._areas
+        return areas
+
+    def reload_areas(self):
+        """area.json を確認し、変わっていれば次のリクエストから新しい areas を返す"""
+        if self.area_url is not None:
+            result = revalidate_areas(self.repo, self.area_url)
+        else:
+            result = "unchanged"
+        with self._areas_lock:
+            self._areas = None
+        return result
+
+
+def start_forecast_server(repo, upstream=JMA_BASE_URL, host="127.0.0.1", port=0, ttl=600, max_entries=256):
+    """サーバーを別スレッドで起動し、(server, base_url) を返す。areasが空なら先に取得する"""
+    fetcher = make_upstream_fetcher(upstream)
+    cache = ForecastCache(repo, fetcher, ttl=ttl, max_entries=max_entries)
+    server = ForecastServer((host, port), repo, cache, upstream + AREA_PATH)
+    if not repo.get_areas():
+        server.reload_areas()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def stop_forecast_server(server):
+    server.shutdown()
+    server.server_close()
+    server.cache.close()
+    server.cache.fetcher.session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8770)
+    parser.add_argument("--upstream", default=JMA_BASE_URL, help="気象庁 (またはスタブ) のベースURL")
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--ttl", type=int, default=600)
+    args = parser.parse_args()
+
+    repo = WeatherRepository(args.db, pool_size=16, archive=True)
+    repo.init_schema()
+    server, url = start_forecast_server(repo, args.upstream, args.host, args.port, args.ttl)
+    print(f"forecast server: {url} (upstream {args.upstream})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(server.cache.snapshot_stats())
+        stop_forecast_server(server)
+        repo.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""気象庁APIの代わりに fixtures/ の固定JSONを返すローカルHTTPサーバー
+
+    python jma_stub.py --port 8765
+    python prefetch.py --base-url http://127.0.0.1:8765
+"""
+import argparse
+import email.utils
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BASE_DIR, 'fixtures')
+
+AREA_PATH = "/bosai/common/const/area.json"
+FORECAST_PATH_RE = re.compile(r"^/bosai/forecast/data/forecast/(\d{6})\.json$")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def forecast_payload(template, area_code):
+    """東京都の固定データをもとに、任意のエリアコード用のJSONを作る"""
+    text = json.dumps(template, ensure_ascii=False)
+    return text.replace("1300", area_code[:4]).encode("utf-8")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-aliveを有効にする
+    # ヘッダーと本体を別々に書くので、Nagle と遅延ACKで1往復40msほど待たされないようにする
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        server.request_count += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if server.fail_every and server.request_count % server.fail_every == 0:
+            self._send(503, b'{"error": "unavailable"}')
+            return
+
+        if self.path == AREA_PATH:
+            # 条件付きGETに対応する
+            if self.headers.get("If-None-Match") == server.area_etag:
+                server.not_modified_count += 1
+                self._send(304, b"", {"ETag": server.area_etag})
+                return
+            self._send(200, server.area_body, {
+                "ETag": server.area_etag,
+                "Last-Modified": server.area_last_modified,
+            })
+            return
+        m = FORECAST_PATH_RE.match(self.path)
+        if m:
+            body = forecast_payload(server.forecast_template, m.group(1))
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                server.not_modified_count += 1
+                self._send(304, b"", {"ETag": etag})
+                return
+            self._send(200, body, {"ETag": etag, "Last-Modified": server.forecast_last_modified})
+            return
+        self._send(404, b'{"error": "not found"}')
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def set_area_data(server, area_data):
+    """配信するarea.jsonを差し替える (ETagも更新される)"""
+    server.area_body = json.dumps(area_data, ensure_ascii=False).encode("utf-8")
+    server.area_etag = '"' + hashlib.md5(server.area_body).hexdigest() + '"'
+    server.area_last_modified = email.utils.formatdate(time.time(), usegmt=True)
+
+
+def set_forecast_template(server, template):
+    """配信する予報のもとになるJSONを差し替える (全エリアのETagが変わる)"""
+    server.forecast_template = template
+    server.forecast_last_modified = email.utils.formatdate(time.time(), usegmt=True)
+
+
+def start_stub_server(host="127.0.0.1", port=0, latency=0.0, fail_every=0):
+    """スタブサーバーを別スレッドで起動し、(server, base_url) を返す"""
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.fail_every = fail_every
+    server.request_count = 0
+    server.not_modified_count = 0
+    set_area_data(server, load_fixture("area.json"))
+    set_forecast_template(server, load_fixture("forecast_130000.json"))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="1リクエストあたりの遅延(秒)")
+    parser.add_argument("--fail-every", type=int, default=0, help="N回に1回503を返す")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(port=args.port, latency=args.latency, fail_every=args.fail_every)
+    print(f"JMA stub server: {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
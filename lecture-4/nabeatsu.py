@@ -0,0 +1,171 @@
+"""Python演習3 問1 の nabeatsu と、整数の範囲をまとめて分類するAPI
+
+    >>> nabeatsu(33)
+    'piyo'
+    >>> classify_range(10, 16).tolist()
+    [0, 0, 1, 2, 0, 1]
+    >>> count_range(1, 100)
+    {'number': 54, 'hoge': 26, 'huga': 12, 'piyo': 7}
+
+1つずつ str() にして '3' を探すのは遅いので、範囲は BLOCK (10^6) 個ずつのブロックに分け、
+
+- 下6桁に3を含むか: 0〜999999 について1度だけ作った表をそのまま使う
+- 上の桁に3を含むか: ブロックごとに1回だけ調べる (含むならブロック全体が「3を含む」)
+- 3の倍数か: ブロックの先頭を3で割った余りごとに1度だけ作った表を使う
+
+の論理和でブロック全体の分類コードを作る。コードは NUMBER=0, HOGE=1, HUGA=2, PIYO=3 の uint8。
+個数だけなら、まるごと入るブロックは (余り, 上の桁に3があるか) の6通りの集計表を引くだけで済む。
+"""
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+NUMBER, HOGE, HUGA, PIYO = range(4)
+CATEGORY_NAMES = ("number", "hoge", "huga", "piyo")
+BLOCK_DIGITS = 6
+BLOCK = 10 ** BLOCK_DIGITS
+
+
+def nabeatsu(num: int) -> str:
+    is_multiple_of_3 = (num % 3 == 0)
+    contains_3 = ('3' in str(num))
+
+    if is_multiple_of_3 and contains_3:
+        return 'piyo'
+    elif is_multiple_of_3:
+        return 'hoge'
+    elif contains_3:
+        return 'huga'
+    else:
+        return str(num)
+
+
+@lru_cache(maxsize=None)
+def _contains_3_table():
+    """0〜BLOCK-1 の下6桁に3を含むなら HUGA (=2)、含まなければ0"""
+    digits = np.arange(BLOCK, dtype=np.int64)
+    table = np.zeros(BLOCK, dtype=np.uint8)
+    for _ in range(BLOCK_DIGITS):
+        table |= (digits % 10 == 3).view(np.uint8)
+        digits //= 10
+    return table * np.uint8(HUGA)
+
+
+@lru_cache(maxsize=None)
+def _multiple_of_3_table(remainder):
+    """先頭の余りが remainder のブロックで、3の倍数の位置が HOGE (=1)"""
+    return ((np.arange(BLOCK, dtype=np.int64) + remainder) % 3 == 0).astype(np.uint8)
+
+
+def _block_codes(block, lo, hi):
+    """block 番目のブロックのうち [lo, hi) の分類コード"""
+    base = block * BLOCK
+    hoge = _multiple_of_3_table(base % 3)[lo:hi]
+    if block and '3' in str(block):
+        return hoge | np.uint8(HUGA)
+    return hoge | _contains_3_table()[lo:hi]
+
+
+def iter_chunks(start, stop):
+    """[start, stop) をブロックの境目で区切って (先頭の数, 分類コードの配列) をyieldする"""
+    if start < 0:
+        raise ValueError("0以上の整数の範囲にしてください")
+    pos = start
+    while pos < stop:
+        block, lo = divmod(pos, BLOCK)
+        hi = min(BLOCK, lo + (stop - pos))
+        yield pos, _block_codes(block, lo, hi)
+        pos += hi - lo
+
+
+def classify_range(start, stop):
+    """[start, stop) の分類コードを uint8 の配列で返す (1要素1バイト)"""
+    if stop <= start:
+        return np.zeros(0, dtype=np.uint8)
+    return np.concatenate([codes for _, codes in iter_chunks(start, stop)])
+
+
+@lru_cache(maxsize=None)
+def _full_block_counts(remainder, has_3):
+    """ブロック全体 (BLOCK個) のカテゴリごとの個数。中身は先頭の余りと上の桁の3だけで決まる"""
+    codes = _multiple_of_3_table(remainder) | (np.uint8(HUGA) if has_3 else _contains_3_table())
+    return np.bincount(codes, minlength=4)
+
+
+def _count_part(bounds):
+    start, stop = bounds
+    counts = np.zeros(4, dtype=np.int64)
+    pos = start
+    while pos < stop:
+        block, lo = divmod(pos, BLOCK)
+        hi = min(BLOCK, lo + (stop - pos))
+        if lo == 0 and hi == BLOCK:
+            # ブロックをまるごと数えるときは配列を作らずに表を引く
+            counts += _full_block_counts(pos % 3, bool(block) and '3' in str(block))
+        else:
+            counts += np.bincount(_block_codes(block, lo, hi), minlength=4)
+        pos += hi - lo
+    return counts
+
+
+def split_range(start, stop, parts):
+    """[start, stop) をブロックの境目でおおよそ parts 等分する"""
+    if stop <= start:
+        return []
+    first = start // BLOCK
+    blocks = (stop - 1) // BLOCK - first + 1
+    per = -(-blocks // parts)
+    return [
+        (max(start, (first + i) * BLOCK), min(stop, (first + i + per) * BLOCK))
+        for i in range(0, blocks, per)
+    ]
+
+
+def count_range(start, stop, workers=None):
+    """[start, stop) のカテゴリごとの個数を {"number": .., "hoge": .., ...} で返す
+
+    workers を2以上にすると、範囲を分けてプロセスプールで数える。
+    ブロックの表は0以上の数を前提にしているので、classify_range と同じく負の数は受け付けない。
+    """
+    if start < 0 and stop > start:
+        raise ValueError("0以上の整数の範囲にしてください")
+    if stop <= start:
+        counts = np.zeros(4, dtype=np.int64)
+    elif workers and workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            counts = sum(pool.map(_count_part, split_range(start, stop, workers)))
+    else:
+        counts = _count_part((start, stop))
+    return dict(zip(CATEGORY_NAMES, (int(n) for n in counts)))
+
+
+def nabeatsu_range(start, stop):
+    """nabeatsu(n) と同じ文字列を n = start, start+1, ... の順にyieldする"""
+    names = (None, 'hoge', 'huga', 'piyo')
+    for first, codes in iter_chunks(start, stop):
+        for offset, code in enumerate(codes.tolist()):
+            yield names[code] or str(first + offset)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("start", type=int)
+    parser.add_argument("stop", type=int)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--list", action="store_true", help="個数ではなく1つずつ表示する")
+    args = parser.parse_args()
+
+    if args.list:
+        for text in nabeatsu_range(args.start, args.stop):
+            print(text)
+        return
+    t0 = time.perf_counter()
+    counts = count_range(args.start, args.stop, args.workers)
+    print(counts, f"({time.perf_counter() - t0:.2f}秒)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""areasテーブルに保存された全officeの天気予報をまとめて取得する
+
+    python prefetch.py                      # 気象庁から取得
+    python prefetch.py --base-url http://127.0.0.1:8765 --concurrency 16
+"""
+import argparse
+import asyncio
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from forecast_cache import extract_weathers
+from weather_db import DB_NAME, WeatherRepository
+
+JMA_BASE_URL = "https://www.jma.go.jp"
+FORECAST_PATH = "/bosai/forecast/data/forecast/{}.json"
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """ホストごとのトークンバケット"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._buckets = {}
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, host):
+        if not self.rate:
+            return
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(host, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                if tokens >= 1:
+                    self._buckets[host] = (tokens - 1, now)
+                    return
+                self._buckets[host] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            await asyncio.sleep(wait)
+
+
+class ForecastPrefetcher:
+    """同時実行数を制限しながら全エリアの予報を非同期に取得する
+
+    HTTP通信はkeep-aliveを使う requests.Session をスレッド上で実行し、
+    asyncio.Semaphore で同時実行数を、RateLimiter でホストごとの秒間リクエスト数を抑える。
+    """
+
+    def __init__(self, base_url=JMA_BASE_URL, concurrency=8, rate=5.0, retries=3,
+                 backoff=0.5, timeout=10):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.stats = {"ok": 0, "failed": 0, "retries": 0}
+
+    def _get(self, url):
+        r = self.session.get(url, timeout=self.timeout)
+        r.raise_for_status()
+        return r.json()
+
+    async def fetch_one(self, area_code, semaphore, limiter):
+        url = self.base_url + FORECAST_PATH.format(area_code)
+        host = urlsplit(url).netloc
+        for attempt in range(self.retries + 1):
+            async with semaphore:
+                await limiter.acquire(host)
+                try:
+                    data = await asyncio.to_thread(self._get, url)
+                    report_datetime, times, weathers = extract_weathers(data)
+                    self.stats["ok"] += 1
+                    return (area_code, times, weathers, report_datetime, data)
+                except requests.HTTPError as e:
+                    # リトライするのは RETRY_STATUS だけ (404 などは何度取っても同じ)
+                    error = e
+                    if e.response is None or e.response.status_code not in RETRY_STATUS:
+                        break
+                except (ValueError, KeyError, IndexError) as e:
+                    # 壊れたJSON・想定外の形 (requests の JSONDecodeError も ValueError)
+                    error = e
+                    break
+                except requests.RequestException as e:
+                    # 接続エラー・タイムアウト
+                    error = e
+            if attempt < self.retries:
+                self.stats["retries"] += 1
+                # フルジッター付きの指数バックオフ
+                await asyncio.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+        logger.warning("取得失敗: %s (%s)", area_code, error)
+        self.stats["failed"] += 1
+        return None
+
+    async def fetch_all(self, area_codes):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiter = RateLimiter(self.rate)
+        results = await asyncio.gather(
+            *(self.fetch_one(code, semaphore, limiter) for code in area_codes)
+        )
+        return [r for r in results if r is not None]
+
+    def close(self):
+        self.session.close()
+
+
+def prefetch_all(repo, base_url=JMA_BASE_URL, concurrency=8, rate=5.0, retries=3):
+    """areasテーブルの全officeを取得し、1トランザクションで保存する。統計を返す"""
+    area_codes = [code for code, _, _ in repo.get_areas()]
+    prefetcher = ForecastPrefetcher(base_url, concurrency=concurrency, rate=rate, retries=retries)
+    started = time.perf_counter()
+    try:
+        results = asyncio.run(prefetcher.fetch_all(area_codes))
+    finally:
+        prefetcher.close()
+    with repo.transaction():
+        repo.save_forecasts(r[:4] for r in results)
+        repo.ingest_forecasts((r[0], r[4]) for r in results)
+    stats = dict(prefetcher.stats)
+    stats["areas"] = len(area_codes)
+    stats["elapsed"] = time.perf_counter() - started
+    return stats
+
+
+def prefetch_in_background(repo, on_done=None, on_error=None, **kwargs):
+    """UIを止めないように別スレッドでprefetch_allを実行する
+
+    成功したら on_done(stats) を、失敗したらログに残して on_error(例外) を呼ぶ。
+    """
+
+    def run():
+        try:
+            stats = prefetch_all(repo, **kwargs)
+        except Exception as e:
+            logger.exception("予報の一括取得に失敗しました")
+            if on_error is not None:
+                on_error(e)
+            return
+        if on_done is not None:
+            on_done(stats)
+
+    thread = threading.Thread(target=run, name="forecast-prefetch", daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--base-url", default=JMA_BASE_URL)
+    parser.add_argument("--area-url", default=None, help="areasが空のときに取得するarea.jsonのURL")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=5.0, help="ホストあたりの秒間リクエスト数 (0で無制限)")
+    parser.add_argument("--retries", type=int, default=3)
+    args = parser.parse_args()
+
+    repo = WeatherRepository(args.db)
+    repo.init_schema()
+    if not repo.get_areas():
+        area_url = args.area_url or args.base_url.rstrip("/") + "/bosai/common/const/area.json"
+        repo.save_areas(requests.get(area_url, timeout=10).json())
+
+    stats = prefetch_all(repo, args.base_url, args.concurrency, args.rate, args.retries)
+    print(
+        f"{stats['ok']}/{stats['areas']}エリア取得 "
+        f"(失敗 {stats['failed']}, リトライ {stats['retries']}) {stats['elapsed']:.2f}秒"
+    )
+    repo.close()
+
+
+if __name__ == "__main__":
+    main()
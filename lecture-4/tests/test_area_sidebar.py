@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("flet")
+from area_sidebar import AreaPrefixIndex, build_area_sidebar, count_controls  # noqa: E402
+
+AREAS = [
+    ("011000", "宗谷地方", "北海道地方"),
+    ("012000", "上川・留萌地方", "北海道地方"),
+    ("130000", "東京都", "関東甲信地方"),
+    ("140000", "神奈川県", "関東甲信地方"),
+    ("270000", "大阪府", "近畿地方"),
+]
+
+
+@pytest.mark.parametrize("lazy, expected", [
+    # Column, 検索ボックス, 検索結果, 地方の一覧 + 地方ごとに (ExpansionTile, title) + エリアごとに (ListTile, title)
+    (False, 4 + 2 * 3 + 2 * 5),
+    (True, 4 + 2 * 3),
+])
+def test_count_controls(lazy, expected):
+    assert count_controls(build_area_sidebar(AREAS, lambda code: None, lazy=lazy)) == expected
+
+
+def test_prefix_search_by_name_and_code():
+    index = AreaPrefixIndex(AREAS)
+    assert [code for code, _, _ in index.search("東京")] == ["130000"]
+    assert [code for code, _, _ in index.search("01")] == ["011000", "012000"]
+    assert index.search("  ") == []
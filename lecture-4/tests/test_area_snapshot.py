@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+import requests
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+# lecture_common は pip install -e lecture-common していなくても読めるようにする
+sys.path.append(os.path.join(TESTS_DIR, os.pardir, os.pardir, "lecture-common", "src"))
+
+import area_snapshot  # noqa: E402
+from area_snapshot import latest_snapshot, load_snapshot_body, revalidate_areas, revalidate_in_background  # noqa: E402
+from jma_stub import AREA_PATH, load_fixture, set_area_data, start_stub_server  # noqa: E402
+from weather_db import WeatherRepository  # noqa: E402
+
+TIMEOUT = 5
+
+
+@pytest.fixture
+def stub():
+    server, base_url = start_stub_server()
+    yield server, base_url + AREA_PATH
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = WeatherRepository(str(tmp_path / "areas.db"))
+    repo.init_schema()
+    yield repo
+    repo.close()
+
+
+@pytest.fixture
+def session(monkeypatch):
+    # 共有クライアントのディスクキャッシュを使わず、スタブとの条件付きGETだけを見る
+    with requests.Session() as session:
+        monkeypatch.setattr(area_snapshot, "shared_client", lambda: session)
+        yield session
+
+
+def snapshot(repo):
+    with repo.connection() as conn:
+        return latest_snapshot(conn)
+
+
+def test_created_then_not_modified(stub, repo, session):
+    server, area_url = stub
+    assert revalidate_areas(repo, area_url, session=session) == "created"
+    area_codes = [code for code, _, _ in repo.get_areas()]
+    assert area_codes
+    first = snapshot(repo)
+    assert first["etag"] == server.area_etag
+
+    assert revalidate_areas(repo, area_url, session=session) == "not_modified"
+    assert server.not_modified_count == 1
+    second = snapshot(repo)
+    assert second["version"] == first["version"] and second["checked_at"] >= first["checked_at"]
+    assert [code for code, _, _ in repo.get_areas()] == area_codes
+
+
+def test_updated_replaces_areas_and_keeps_only_the_latest_body(stub, repo, session):
+    server, area_url = stub
+    revalidate_areas(repo, area_url, session=session)
+    area_data = load_fixture("area.json")
+    removed = next(iter(area_data["offices"]))
+    del area_data["offices"][removed]
+    set_area_data(server, area_data)
+
+    assert revalidate_areas(repo, area_url, session=session) == "updated"
+    assert removed not in [code for code, _, _ in repo.get_areas()]
+    with repo.connection() as conn:
+        assert latest_snapshot(conn)["version"] == 2
+        assert load_snapshot_body(conn) == area_data
+        assert load_snapshot_body(conn, version=1) is None  # 古い本体は捨てている
+
+
+def test_new_etag_with_the_same_body_is_unchanged(stub, repo, session):
+    server, area_url = stub
+    revalidate_areas(repo, area_url, session=session)
+    server.area_etag = '"rotated"'
+    assert revalidate_areas(repo, area_url, session=session) == "unchanged"
+    current = snapshot(repo)
+    assert current["version"] == 1 and current["etag"] == '"rotated"'
+
+
+def test_background_calls_on_changed_only_when_areas_change(stub, repo, session):
+    _, area_url = stub
+    changed = []
+    revalidate_in_background(repo, area_url, on_changed=lambda: changed.append(1)).join(TIMEOUT)
+    revalidate_in_background(repo, area_url, on_changed=lambda: changed.append(2)).join(TIMEOUT)
+    assert changed == [1]
+
+
+def test_background_reports_database_errors(stub, repo, session, caplog):
+    _, area_url = stub
+    with repo.transaction() as conn:
+        conn.execute("DROP TABLE area_snapshots")
+    errors = []
+    done = threading.Event()
+    revalidate_in_background(repo, area_url, on_error=lambda e: (errors.append(e), done.set()))
+    assert done.wait(TIMEOUT)
+    assert isinstance(errors[0], sqlite3.Error)
+    assert "再検証できませんでした" in caplog.text
@@ -0,0 +1,110 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bracket_checker import (  # noqa: E402
+    CheckResult,
+    check_bytes,
+    check_file,
+    check_paths,
+    check_stream,
+    format_checker,
+    line_and_column,
+)
+
+PAIRS = {")": "(", "]": "[", "}": "{"}
+
+
+def reference(data):
+    """1バイトずつスタックで調べる素朴な版 (ok, offset) を返す"""
+    stack = []
+    for i, ch in enumerate(data.decode("latin-1")):
+        if ch in "([{":
+            stack.append((ch, i))
+        elif ch in PAIRS:
+            if not stack or stack.pop()[0] != PAIRS[ch]:
+                return False, i
+    if stack:
+        return False, stack[-1][1]
+    return True, None
+
+
+def random_text(rng, length):
+    return bytes(rng.choice(b"()[]{}ab \n") for _ in range(length))
+
+
+def test_unmatched_closer():
+    result = check_bytes(b"ok (a) b) c")
+    assert result == CheckResult(False, 8, "閉じ括弧 ')' に対応する開き括弧がありません")
+
+
+def test_mismatched_closer():
+    assert check_bytes(b"[(x]").offset == 3
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1024])
+def test_unclosed_opener_at_eof_reports_its_offset(chunk_size):
+    # 最後まで閉じられなかった一番内側の開き括弧の位置
+    result = check_bytes(b"{a} (b [c] {d}", chunk_size)
+    assert not result.ok
+    assert result.offset == 4
+    assert "閉じられていません" in result.reason
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 64])
+def test_matches_reference_across_chunk_boundaries(chunk_size):
+    rng = random.Random(chunk_size)
+    for _ in range(300):
+        data = random_text(rng, rng.randint(0, 40))
+        if rng.random() < 0.5:
+            data = b"(" * 40 + data + b")" * 40  # 入れ子を深くして replace の回数の上限を超える
+        expected = reference(data)
+        assert tuple(check_bytes(data, chunk_size)[:2]) == expected, data
+        chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+        assert tuple(check_stream(chunks)[:2]) == expected, data
+
+
+def test_utf8_is_checked_as_bytes():
+    assert format_checker("こんにちは (世界) [{ok}]")
+    text = "括弧 (閉じない"
+    assert check_bytes(text.encode("utf-8")).offset == len("括弧 ".encode("utf-8"))
+
+
+def test_mmap_path(tmp_path):
+    path = tmp_path / "big.log"
+    body = b"line [ok] {1}\n" * 1000
+    path.write_bytes(body + b"broken ) here\n" + body)
+    result = check_file(str(path), chunk_size=4096)
+    assert result.offset == len(body) + 7
+    assert line_and_column(str(path), result.offset) == (1001, 8)
+
+    good = tmp_path / "good.log"
+    good.write_bytes(body)
+    assert check_file(str(good), chunk_size=4096).ok
+    empty = tmp_path / "empty.log"
+    empty.write_bytes(b"")
+    assert check_file(str(empty)).ok
+
+
+def test_batch_results_equal_serial_results(tmp_path):
+    rng = random.Random(0)
+    for i in range(12):
+        sub = tmp_path / ("a" if i % 2 else "b")
+        sub.mkdir(exist_ok=True)
+        (sub / f"{i:02d}.txt").write_bytes(random_text(rng, rng.randint(0, 5000)))
+    (tmp_path / "skip.bin").write_bytes(b")")
+    missing = str(tmp_path / "missing.txt")
+    paths = [str(tmp_path), missing]
+
+    serial = check_paths(paths, workers=0, pattern="*.txt")
+    parallel = check_paths(paths, workers=2, pattern="*.txt")
+    assert parallel == serial
+    assert len(serial) == 13
+    assert serial[-1][0] == missing and serial[-1][1].reason.startswith("読み込めません")
+    for path, result in serial[:-1]:
+        with open(path, "rb") as f:
+            assert tuple(result[:2]) == reference(f.read())
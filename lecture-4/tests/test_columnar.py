@@ -0,0 +1,52 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+
+np = pytest.importorskip("numpy")
+import columnar  # noqa: E402
+
+REPOS = [
+    ("a", "Python", 10), ("b", "Python", 30), ("c", "N/A", 5),
+    ("d", None, 7), ("e", None, None), ("f", "Go", 1),
+]
+
+
+@pytest.fixture
+def table(tmp_path):
+    conn = sqlite3.connect(tmp_path / "repos.db")
+    conn.execute("CREATE TABLE repositories (repo_name TEXT PRIMARY KEY, language TEXT, stars INTEGER)")
+    conn.executemany("INSERT INTO repositories VALUES (?, ?, ?)", REPOS)
+    columnar.export_table(conn, "repositories", str(tmp_path / "columns"))
+    conn.close()
+    return columnar.open_table("repositories", str(tmp_path / "columns"))
+
+
+def test_null_language_is_its_own_group(table):
+    summary = columnar.language_summary(table)
+    assert summary == [
+        ("Python", 2, 40, 20.0, 20.0),
+        (None, 2, 7, 3.5, 3.5),
+        ("Go", 1, 1, 1.0, 1.0),
+        ("N/A", 1, 5, 5.0, 5.0),
+    ]
+    assert len({row[0] for row in summary}) == len(summary)
+    assert columnar.language_label(None) != columnar.language_label(columnar.NO_LANGUAGE)
+
+
+def test_top_repos_keeps_null_language(table):
+    assert columnar.top_repos(table, k=3) == [("b", "Python", 30), ("a", "Python", 10), ("d", None, 7)]
+    assert columnar.top_repos(table, "N/A") == [("c", "N/A", 5)]
+    assert columnar.top_repos(table, columnar.NULL_LANGUAGE) == [("d", None, 7), ("e", None, 0)]
+
+
+def test_import_does_not_load_http_stack():
+    code = "import sys, columnar; print('requests' in sys.modules, 'weather_db' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(TESTS_DIR),
+                         check=True, capture_output=True, text=True).stdout
+    assert out.split() == ["False", "False"]
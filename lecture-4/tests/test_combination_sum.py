@@ -0,0 +1,69 @@
+import itertools
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from combination_sum import (  # noqa: E402
+    CombinationMemo,
+    combination_sum,
+    combination_sum_memo,
+    count_combinations,
+    iter_combinations,
+)
+
+CASES = [
+    ([2, 3, 6, 7], 7),
+    ([2, 3, 5], 8),
+    ([2], 1),
+    ([1], 0),
+    ([3, 1, 3, 2], 9),  # 重複とソートされていない候補
+    ([5, 10, 25], 60),
+    ([4, 6], 15),  # 作れない
+    ([7, 11], 3),  # どの候補も target を超える
+]
+
+
+def brute_force(candidates, target):
+    """各候補を 0〜target//c 個ずつ使う組み合わせを全部試し、辞書順に並べる"""
+    values = sorted(set(candidates))
+    found = []
+    for counts in itertools.product(*(range(target // c + 1) for c in values)):
+        if sum(c * n for c, n in zip(values, counts)) == target:
+            found.append(tuple(c for c, n in zip(values, counts) for _ in range(n)))
+    return sorted(found)
+
+
+@pytest.mark.parametrize("candidates, target", CASES)
+def test_every_mode_matches_brute_force(candidates, target):
+    expected = brute_force(candidates, target)
+    stream = list(iter_combinations(candidates, target))
+    assert stream == expected
+    assert combination_sum(candidates, target) == [list(combo) for combo in expected]
+    assert combination_sum_memo(candidates, target) == [list(combo) for combo in expected]
+    assert count_combinations(candidates, target) == len(stream)
+
+
+def test_count_matches_stream_on_larger_targets():
+    for target in range(0, 60):
+        assert count_combinations([2, 9, 11], target) == len(list(iter_combinations([2, 9, 11], target)))
+
+
+def test_memo_is_reused_across_targets():
+    memo = CombinationMemo([2, 3, 5])
+    # 大きい target の後に小さい target を聞いても、メモだけで同じ答えになる
+    for target in (20, 8, 13, 0):
+        assert list(memo.solutions(target)) == brute_force([2, 3, 5], target)
+    assert memo.filled == 20
+
+
+def test_negative_target_and_invalid_candidates():
+    assert list(iter_combinations([2, 3], -1)) == []
+    assert count_combinations([2, 3], -1) == 0
+    assert CombinationMemo([2, 3]).solutions(-1) == ()
+    with pytest.raises(ValueError):
+        combination_sum([0, 2], 4)
+    with pytest.raises(ValueError):
+        count_combinations([2.5], 5)
@@ -0,0 +1,170 @@
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+# lecture_common は pip install -e lecture-common していなくても読めるようにする
+sys.path.append(os.path.join(TESTS_DIR, os.pardir, os.pardir, "lecture-common", "src"))
+
+from forecast_cache import REPORT_GRACE, ForecastCache  # noqa: E402
+from jma_stub import load_fixture  # noqa: E402
+from weather_db import WeatherRepository  # noqa: E402
+
+AREA = "130000"
+TIMEOUT = 5
+# fixture の reportDatetime は 2026-10-18T11:00+09:00 なので、次の発表は 17:00 (+猶予)
+REPORTED = datetime.fromisoformat("2026-10-18T11:00:00+09:00").timestamp()
+NEXT_REPORT = REPORTED + 6 * 3600 + REPORT_GRACE.total_seconds()
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeFetcher:
+    """呼ばれた回数を数え、gate があれば開くまで待ってから fixture を返す"""
+
+    def __init__(self, gate=None):
+        self.data = load_fixture("forecast_130000.json")
+        self.gate = gate
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, area_code):
+        with self._lock:
+            self.calls += 1
+        if self.gate is not None:
+            assert self.gate.wait(TIMEOUT)
+        return self.data
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = WeatherRepository(str(tmp_path / "cache.db"))
+    repo.init_schema()
+    repo.save_areas(load_fixture("area.json"))
+    yield repo
+    repo.close()
+
+
+def make_cache(repo, fetcher, now, ttl=600):
+    return ForecastCache(repo, fetcher, ttl=ttl, min_ttl=60, clock=FakeClock(now))
+
+
+def wait_until(predicate):
+    deadline = time.monotonic() + TIMEOUT
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_fresh_until_ttl(repo):
+    fetcher = FakeFetcher()
+    cache = make_cache(repo, fetcher, REPORTED + 60)
+    rows = cache.get(AREA)
+    assert len(rows) == 3 and fetcher.calls == 1
+
+    cache.clock.now += 599
+    assert cache.get(AREA) == rows
+    assert fetcher.calls == 1
+    assert cache.snapshot_stats()["hits"] == 1
+
+    cache.clock.now += 1  # ttl ちょうどで期限切れ
+    cache.get(AREA)
+    cache.close()
+    assert cache.stats["stale_hits"] == 1 and fetcher.calls == 2
+
+
+def test_expires_at_next_report_before_ttl(repo):
+    fetcher = FakeFetcher()
+    cache = make_cache(repo, fetcher, NEXT_REPORT - 120, ttl=3600)
+    cache.get(AREA)
+    cache.clock.now = NEXT_REPORT - 1
+    cache.get(AREA)
+    assert fetcher.calls == 1
+    cache.clock.now = NEXT_REPORT
+    cache.get(AREA)
+    cache.close()
+    assert fetcher.calls == 2 and cache.stats["stale_hits"] == 1
+
+
+def test_min_ttl_when_the_report_is_late(repo):
+    fetcher = FakeFetcher()
+    cache = make_cache(repo, fetcher, NEXT_REPORT + 3600)  # 次の発表時刻を過ぎても新しい発表が無い
+    cache.get(AREA)
+    cache.clock.now += 59
+    cache.get(AREA)
+    assert fetcher.calls == 1
+    cache.clock.now += 1
+    cache.get(AREA)
+    cache.close()
+    assert fetcher.calls == 2
+
+
+def test_concurrent_misses_are_coalesced(repo):
+    gate = threading.Event()
+    fetcher = FakeFetcher(gate)
+    cache = make_cache(repo, fetcher, REPORTED + 60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(AREA))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    wait_until(lambda: cache.snapshot_stats()["coalesced"] == 4)
+    gate.set()
+    for t in threads:
+        t.join(TIMEOUT)
+    cache.close()
+    assert fetcher.calls == 1
+    assert len(results) == 5 and all(rows == results[0] and rows for rows in results)
+
+
+def test_stale_while_revalidate_calls_on_refresh(repo):
+    fetcher = FakeFetcher()
+    cache = make_cache(repo, fetcher, REPORTED + 60)
+    rows = cache.get(AREA)
+    cache.clock.now += 600
+    refreshed = threading.Event()
+    calls = []
+
+    def on_refresh(area_code, new_rows):
+        calls.append((area_code, new_rows))
+        refreshed.set()
+
+    assert cache.get(AREA, on_refresh=on_refresh) == rows  # 古いデータをすぐ返す
+    assert refreshed.wait(TIMEOUT)
+    assert calls == [(AREA, rows)]
+    assert cache.get(AREA) == rows and fetcher.calls == 2  # 再取得した分は新鮮
+    cache.close()
+
+
+def test_refresh_failures_are_logged(repo, caplog):
+    fetcher = FakeFetcher()
+    cache = make_cache(repo, fetcher, REPORTED + 60)
+    cache.get(AREA)
+    cache.clock.now += 600
+
+    def on_refresh(area_code, rows):
+        raise RuntimeError("page closed")
+
+    with caplog.at_level(logging.WARNING, logger="forecast_cache"):
+        cache.get(AREA, on_refresh=on_refresh)
+        cache.close()
+    assert "予報の再取得に失敗しました" in caplog.text and "page closed" in caplog.text
+
+
+def test_upstream_error_returns_empty(repo, caplog):
+    cache = make_cache(repo, lambda area_code: None, REPORTED)
+    assert cache.get(AREA) == []
+    cache.close()
+    assert cache.stats["upstream_errors"] == 1
+    assert "予報を取得できませんでした" in caplog.text
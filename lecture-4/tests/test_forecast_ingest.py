@@ -0,0 +1,73 @@
+import os
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+# lecture_common は pip install -e lecture-common していなくても読めるようにする
+sys.path.append(os.path.join(TESTS_DIR, os.pardir, os.pardir, "lecture-common", "src"))
+
+from jma_stub import load_fixture  # noqa: E402
+from weather_db import WeatherRepository  # noqa: E402
+
+OFFICE = "130000"
+TABLES = ("forecast_areas", "forecast_elements", "forecast_values")
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = WeatherRepository(str(tmp_path / "ingest.db"))
+    repo.init_schema()
+    yield repo
+    repo.close()
+
+
+def expected_counts(data):
+    """fixture をそのまま数えた、各テーブルに入るはずの行数"""
+    areas, elements, values = set(), set(), 0
+    for report in data:
+        for ts in report["timeSeries"]:
+            for area in ts["areas"]:
+                areas.add(area["area"]["code"])
+                for key, items in area.items():
+                    if key != "area":
+                        elements.add(key)
+                        values += sum(1 for v in items if v != "")
+        for avg_key in ("tempAverage", "precipAverage"):
+            for area in report.get(avg_key, {}).get("areas", []):
+                areas.add(area["area"]["code"])
+                for key in ("min", "max"):
+                    elements.add(f"{avg_key}.{key}")
+                    values += area[key] != ""
+    return {"forecast_areas": len(areas), "forecast_elements": len(elements), "forecast_values": values}
+
+
+def table_contents(repo):
+    with repo.connection() as conn:
+        return {table: sorted(conn.execute(f"SELECT * FROM {table}").fetchall()) for table in TABLES}
+
+
+def test_ingest_fixture_row_counts(repo):
+    data = load_fixture("forecast_130000.json")
+    written = repo.ingest_forecast(OFFICE, data)
+    contents = table_contents(repo)
+    counts = {table: len(rows) for table, rows in contents.items()}
+    assert counts == expected_counts(data)
+    assert counts["forecast_areas"] == 4 and counts["forecast_elements"] == 17
+    assert written == counts["forecast_values"]
+    assert {office for _, _, office in contents["forecast_areas"]} == {OFFICE}
+
+    weathers = repo.get_forecast_values(OFFICE, "weathers")
+    assert len(weathers) == 2 * 3
+    assert {area_code for area_code, _, _ in weathers} == {"130010", "130020"}
+    assert repo.get_forecast_values(OFFICE, "tempAverage.min", series=1) == [("44132", "", "14.1")]
+
+
+def test_reingest_is_idempotent(repo):
+    data = load_fixture("forecast_130000.json")
+    repo.ingest_forecast(OFFICE, data)
+    first = table_contents(repo)
+    repo.ingest_forecast(OFFICE, data)
+    repo.ingest_forecasts([(OFFICE, data), (OFFICE, data)])
+    assert table_contents(repo) == first
@@ -0,0 +1,95 @@
+import os
+import sys
+import threading
+
+import pytest
+import requests
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+# lecture_common は pip install -e lecture-common していなくても読めるようにする
+sys.path.append(os.path.join(TESTS_DIR, os.pardir, os.pardir, "lecture-common", "src"))
+
+from forecast_client import ForecastClient  # noqa: E402
+from forecast_server import start_forecast_server, stop_forecast_server  # noqa: E402
+from jma_stub import load_fixture, start_stub_server  # noqa: E402
+from weather_db import WeatherRepository  # noqa: E402
+
+AREA = "130000"
+TIMEOUT = 5
+
+
+@pytest.fixture
+def upstream():
+    # 上流を少し遅くして、同時リクエストが取得中に重なるようにする
+    server, base_url = start_stub_server(latency=0.2)
+    yield server, base_url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def forecast_server(upstream, tmp_path):
+    _, upstream_url = upstream
+    repo = WeatherRepository(str(tmp_path / "server.db"), pool_size=8)
+    repo.init_schema()
+    repo.save_areas(load_fixture("area.json"))  # areas があれば起動時に上流へ問い合わせない
+    server, base_url = start_forecast_server(repo, upstream_url, port=0)
+    yield server, base_url
+    stop_forecast_server(server)
+    repo.close()
+
+
+@pytest.mark.parametrize("path", ["/areas", f"/forecast/{AREA}"])
+def test_if_none_match_returns_304(forecast_server, path):
+    _, base_url = forecast_server
+    with requests.Session() as session:
+        first = session.get(base_url + path, timeout=TIMEOUT)
+        assert first.status_code == 200 and first.headers["ETag"]
+        second = session.get(base_url + path, headers={"If-None-Match": first.headers["ETag"]}, timeout=TIMEOUT)
+        assert second.status_code == 304 and second.content == b""
+        third = session.get(base_url + path, headers={"If-None-Match": '"other"'}, timeout=TIMEOUT)
+        assert third.status_code == 200 and third.content == first.content
+
+
+def test_concurrent_requests_share_one_upstream_fetch(upstream, forecast_server):
+    stub, _ = upstream
+    server, base_url = forecast_server
+    barrier = threading.Barrier(8)
+    responses = []
+
+    def request():
+        barrier.wait(TIMEOUT)
+        responses.append(requests.get(f"{base_url}/forecast/{AREA}", timeout=TIMEOUT))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(TIMEOUT)
+    assert [r.status_code for r in responses] == [200] * 8
+    assert len({r.content for r in responses}) == 1
+    assert stub.request_count == 1
+    stats = server.cache.snapshot_stats()
+    assert stats["upstream_fetches"] == 1
+    assert stats["misses"] + stats["hits"] == 8
+
+
+def test_client_round_trips(upstream, forecast_server):
+    stub, _ = upstream
+    server, base_url = forecast_server
+    client = ForecastClient(base_url)
+    try:
+        areas = client.get_areas()
+        assert areas == server.repo.get_areas()
+        assert client.get_areas() == areas
+        assert client.stats["not_modified"] == 1
+
+        rows = client.get(AREA)
+        assert rows and rows == [tuple(r) for r in server.repo.get_forecast(AREA)]
+        stub.fail_every = 1  # 上流が503 -> サーバーは502 -> 空のリスト
+        assert client.get("270000") == []
+        assert client.stats["errors"] == 1
+        assert client.server_stats()["requests"] == 4  # /stats 自身は数える前に統計を作る
+    finally:
+        client.close()
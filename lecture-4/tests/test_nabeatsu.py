@@ -0,0 +1,40 @@
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("numpy")
+
+from nabeatsu import BLOCK, classify_range, count_range, nabeatsu, nabeatsu_range  # noqa: E402
+
+
+def brute_force(start, stop):
+    counts = Counter(
+        name if name in ("hoge", "huga", "piyo") else "number"
+        for name in map(nabeatsu, range(start, stop))
+    )
+    return {name: counts[name] for name in ("number", "hoge", "huga", "piyo")}
+
+
+@pytest.mark.parametrize("start, stop", [
+    (1, 100),
+    (0, 1),
+    (BLOCK - 50, BLOCK + 50),
+    (3 * BLOCK - 7, 3 * BLOCK + 7),  # 上の桁に3が入るブロックの境目
+    (5, 5),
+])
+def test_count_range_matches_brute_force(start, stop):
+    assert count_range(start, stop) == brute_force(start, stop)
+
+
+def test_nabeatsu_range_matches_nabeatsu():
+    assert list(nabeatsu_range(28, 40)) == [nabeatsu(n) for n in range(28, 40)]
+
+
+@pytest.mark.parametrize("fn", [count_range, classify_range])
+def test_negative_ranges_are_rejected(fn):
+    with pytest.raises(ValueError):
+        fn(-10, 0)
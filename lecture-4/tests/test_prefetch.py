@@ -0,0 +1,83 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+# lecture_common は pip install -e lecture-common していなくても読めるようにする
+sys.path.append(os.path.join(TESTS_DIR, os.pardir, os.pardir, "lecture-common", "src"))
+
+from jma_stub import load_fixture, start_stub_server  # noqa: E402
+from prefetch import ForecastPrefetcher, prefetch_all, prefetch_in_background  # noqa: E402
+from weather_db import WeatherRepository  # noqa: E402
+
+
+@pytest.fixture
+def stub():
+    server, base_url = start_stub_server()
+    yield server, base_url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = WeatherRepository(str(tmp_path / "prefetch.db"))
+    repo.init_schema()
+    repo.save_areas(load_fixture("area.json"))
+    yield repo
+    repo.close()
+
+
+def test_prefetch_all_saves_every_area(stub, repo):
+    server, base_url = stub
+    stats = prefetch_all(repo, base_url, concurrency=4, rate=0)
+    area_codes = [code for code, _, _ in repo.get_areas()]
+    assert stats["ok"] == stats["areas"] == len(area_codes)
+    assert stats["failed"] == 0
+    assert all(repo.get_forecast(code) for code in area_codes)
+
+
+def test_failed_areas_are_logged_and_counted(stub, repo, caplog):
+    server, base_url = stub
+    server.fail_every = 1  # すべて503
+    stats = prefetch_all(repo, base_url, concurrency=4, rate=0, retries=1)
+    assert stats["ok"] == 0
+    assert stats["failed"] == stats["areas"]
+    assert stats["retries"] == stats["areas"]
+    assert "取得失敗" in caplog.text
+    assert not repo.has_forecasts()
+
+
+def test_not_found_is_not_retried(stub, caplog):
+    server, base_url = stub
+    prefetcher = ForecastPrefetcher(base_url, rate=0, retries=3, backoff=0)
+    try:
+        results = asyncio.run(prefetcher.fetch_all(["unknown"]))  # スタブは404を返す
+    finally:
+        prefetcher.close()
+    assert results == []
+    assert prefetcher.stats == {"ok": 0, "failed": 1, "retries": 0}
+    assert server.request_count == 1
+    assert "404" in caplog.text
+
+
+def test_background_errors_reach_on_error(tmp_path, caplog):
+    repo = WeatherRepository(str(tmp_path / "missing" / "prefetch.db"))  # 開けないDB
+    done, errors = [], []
+    thread = prefetch_in_background(repo, on_done=done.append, on_error=errors.append,
+                                    base_url="http://127.0.0.1:9")
+    thread.join(10)
+    assert not done
+    assert len(errors) == 1
+    assert "予報の一括取得に失敗しました" in caplog.text
+
+
+def test_background_success_calls_on_done(stub, repo):
+    server, base_url = stub
+    done = []
+    thread = prefetch_in_background(repo, on_done=done.append, base_url=base_url, rate=0)
+    thread.join(30)
+    assert done and done[0]["ok"] == done[0]["areas"]
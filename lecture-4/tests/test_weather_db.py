@@ -0,0 +1,98 @@
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+# lecture_common は pip install -e lecture-common していなくても読めるようにする
+sys.path.append(os.path.join(TESTS_DIR, os.pardir, os.pardir, "lecture-common", "src"))
+
+from weather_db import WeatherRepository  # noqa: E402
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = WeatherRepository(str(tmp_path / "test.db"), pool_size=2, checkout_timeout=0.2)
+    repo.init_schema()
+    yield repo
+    repo.close()
+
+
+def test_long_lived_threads_do_not_exhaust_the_pool(repo):
+    # スレッドは release しないまま生き続けるが、接続は操作ごとに返される
+    errors = []
+
+    def worker(code):
+        try:
+            for i in range(50):
+                repo.save_forecast(code, [f"2026-10-{i % 28 + 1:02d}T00:00"], ["晴れ"])
+                repo.get_forecast(code)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(f"{n:06d}",)) for n in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    assert not errors
+    assert len(repo._all) <= 2
+
+
+def test_checkout_times_out_when_all_connections_are_in_use(repo):
+    held = threading.Event()
+    done = threading.Event()
+
+    def hold():
+        with repo.connection():
+            held.set()
+            done.wait(5)
+
+    other = threading.Thread(target=hold)
+    other.start()
+    held.wait(5)
+    errors = []
+
+    def third():
+        try:
+            repo.get_areas()
+        except sqlite3.OperationalError as e:
+            errors.append(e)
+
+    try:
+        with repo.connection():
+            # 2本とも貸し出し中なので、別スレッドの3つ目は checkout_timeout 秒で諦める
+            t = threading.Thread(target=third)
+            t.start()
+            t.join(5)
+    finally:
+        done.set()
+        other.join(5)
+    assert len(errors) == 1
+    assert repo.get_areas() == []
+
+
+def test_nested_operations_share_one_connection(repo):
+    with repo.transaction() as conn:
+        with repo.connection() as inner:
+            assert inner is conn
+        repo.save_forecast("130000", ["2026-10-18T00:00"], ["くもり"])
+    assert repo.get_forecast("130000") == [("2026-10-18", "くもり")]
+
+
+def test_rollback_resets_only_that_connections_text_ids(tmp_path):
+    repo = WeatherRepository(str(tmp_path / "archive.db"), archive=True)
+    repo.init_schema()
+    with repo.connection() as conn:
+        texts = repo.texts(conn)
+        with pytest.raises(RuntimeError):
+            with repo.transaction():
+                repo.save_forecast("130000", ["2026-10-18T00:00"], ["雪"])
+                raise RuntimeError
+        assert repo.texts(conn) is not texts
+        repo.save_forecast("130000", ["2026-10-18T00:00"], ["雪"])
+        assert repo.forecast_history("130000", "2026-10-18", "2026-10-18")[0][2] == "雪"
+    repo.close()
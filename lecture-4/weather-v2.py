@@ -1,78 +1,71 @@
-import flet as ft
-import requests
-import sqlite3
 import os
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_NAME = os.path.join(BASE_DIR, 'weather_forecast.db')
-AREA_URL = "https://www.jma.go.jp/bosai/common/const/area.json"
-FORECAST_URL = "https://www.jma.go.jp/bosai/forecast/data/forecast/{}.json"
+import flet as ft
+from lecture_common.http_client import shared_client
+from lecture_common.tracing import format_snapshot, tracer
+from lecture_common.ui_worker import LatencyProbe, LatestRequestRunner
+
+from area_sidebar import build_area_sidebar
+from area_snapshot import revalidate_areas, revalidate_in_background
+from forecast_cache import ForecastCache
+from forecast_client import ForecastClient
+from prefetch import prefetch_in_background
+from weather_db import DB_NAME, WeatherRepository
+
+JMA_BASE_URL = os.environ.get("JMA_BASE_URL", "https://www.jma.go.jp")
+AREA_URL = JMA_BASE_URL + "/bosai/common/const/area.json"
+FORECAST_URL = JMA_BASE_URL + "/bosai/forecast/data/forecast/{}.json"
+# 設定されていれば、気象庁とローカルDBの代わりに forecast_server.py から読む (クライアントモード)
+FORECAST_SERVER_URL = os.environ.get("FORECAST_SERVER_URL")
+
+# アプリ全体で1つのリポジトリ(接続プール)を共有する
+# 予報は上書きせず forecast_archive にも積み上げる
+repo = WeatherRepository(DB_NAME, archive=True)
 
 def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS weather_forecasts (
-            area_code TEXT, date TEXT, weather_text TEXT,
-            PRIMARY KEY (area_code, date)
-        )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS areas (
-            code TEXT PRIMARY KEY,
-            name TEXT,
-            center_name TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
+    repo.init_schema()
 
 def save_areas_to_db(area_data):
     """取得したエリア情報をDBに保存する"""
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
-    area_list = []
-    
-    centers = area_data.get("centers", {})
-    offices = area_data.get("offices", {})
-    
-    for c_code, c_info in centers.items():
-        for o_code in c_info.get("children", []):
-            if o_code in offices:
-                area_list.append((o_code, offices[o_code]["name"], c_info["name"]))
-                
-    cur.executemany("INSERT OR REPLACE INTO areas VALUES (?, ?, ?)", area_list)
-    conn.commit()
-    conn.close()
+    repo.save_areas(area_data)
 
 def get_areas_from_db():
     """DBからエリア情報を取得する"""
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
-    cur.execute("SELECT code, name, center_name FROM areas ORDER BY center_name")
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    return repo.get_areas()
 
 def save_forecast_to_db(area_code, times, weathers):
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
-    sql = "INSERT OR REPLACE INTO weather_forecasts VALUES (?, ?, ?);"
-    forecast_data = [(area_code, t[:10], w) for t, w in zip(times, weathers)]
-    cur.executemany(sql, forecast_data)
-    conn.commit()
-    conn.close()
+    with tracer.span("weather.store", area=area_code):
+        repo.save_forecast(area_code, times, weathers)
 
 def get_forecast_from_db(area_code):
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
-    cur.execute("SELECT date, weather_text FROM weather_forecasts WHERE area_code = ? ORDER BY date ASC", (area_code,))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    return repo.get_forecast(area_code)
+
+def fetch_forecast(area_code):
+    # 前回と同じ内容なら 304 になり、本体はディスクのキャッシュから読む
+    with tracer.span("weather.fetch", area=area_code):
+        r = shared_client().get(FORECAST_URL.format(area_code))
+    if not r.from_cache:
+        tracer.count("weather.bytes_received", len(r.content))
+    if r.status_code != 200:
+        tracer.count("weather.http_errors")
+        return None
+    with tracer.span("weather.parse_json", area=area_code):
+        return r.json()
+
+# 同じエリアへの連続クリックでは気象庁に再アクセスしない
+if FORECAST_SERVER_URL:
+    forecast_cache = ForecastClient(FORECAST_SERVER_URL)
+else:
+    forecast_cache = ForecastCache(repo, fetch_forecast)
 
 def main(page: ft.Page):
-    init_db()
+    if not FORECAST_SERVER_URL:
+        init_db()
+
+    # 通信とDB処理はイベントハンドラではなくワーカースレッドで行う。
+    # Webモードでは main() がセッションごとに呼ばれるので、最新のクリックの判定と遅延の計測はセッションごとに持つ
+    runner = LatestRequestRunner()
+    latency_probe = LatencyProbe(os.environ.get("WEATHER_LATENCY_LOG"))
     
     page.title = "お天気予報アプリ (エリアDB版)"
     page.window_width = 1000
@@ -112,60 +105,115 @@ def main(page: ft.Page):
                     color=ft.Colors.WHITE,
                 )
             )
-        page.update()
+        with tracer.span("weather.render"):
+            page.update()
 
     tabs.on_change = lambda e: update_weather_by_tab(e.control.selected_index)
 
-    def show_weather(area_code: str):
-        r = requests.get(FORECAST_URL.format(area_code))
-        if r.status_code == 200:
-            data = r.json()
-            ts = data[0]["timeSeries"][0]
-            save_forecast_to_db(area_code, ts.get("timeDefines", []), ts.get("areas", [])[0].get("weathers", []))
+    selected = {"area_code": None}
 
-        db_rows = get_forecast_from_db(area_code)
+    def render_forecast(db_rows):
         current_weather["times"] = [row[0] for row in db_rows]
         current_weather["weathers"] = [row[1] for row in db_rows]
         tabs.selected_index = 0
         update_weather_by_tab(0)
 
-    db_areas = get_areas_from_db()
-    if not db_areas:
-        area_json = requests.get(AREA_URL).json()
-        save_areas_to_db(area_json)
+    def on_forecast_refreshed(area_code, db_rows):
+        # 裏で再取得が終わったとき、まだ同じエリアを表示していれば描き直す
+        if selected["area_code"] == area_code:
+            render_forecast(db_rows)
+
+    def show_loading(area_code: str):
+        weather_list.controls.clear()
+        weather_list.controls.append(
+            ft.Row([ft.ProgressRing(width=20, height=20), ft.Text("天気情報を取得中...")])
+        )
+        page.update()
+
+    def show_error(e):
+        weather_list.controls.clear()
+        weather_list.controls.append(ft.Text("天気データを取得できません", color=ft.Colors.RED))
+        page.update()
+
+    def show_weather(area_code: str):
+        selected["area_code"] = area_code
+        latency_probe.click(area_code)
+        show_loading(area_code)
+        latency_probe.paint(area_code, "placeholder")
+
+        def on_done(db_rows):
+            render_forecast(db_rows)
+            latency_probe.paint(area_code, "forecast", final=True)
+
+        def work():
+            with tracer.profile("forecast"), tracer.span("weather.get_forecast", area=area_code):
+                return forecast_cache.get(area_code, on_refresh=on_forecast_refreshed)
+
+        runner.submit(work, on_done, on_error=show_error)
+
+    # 画面はローカルのareasテーブルだけで描き、area.jsonの確認は裏で行う
+    if FORECAST_SERVER_URL:
+        # クライアントモードではエリアも予報もサーバーから読む (取得と保存はサーバー側で行う)
+        db_areas = forecast_cache.get_areas()
+    else:
+        db_areas = get_areas_from_db()
+    if not db_areas and not FORECAST_SERVER_URL:
+        # 初回起動でスナップショットが無いときだけは取得を待つ
+        revalidate_areas(repo, AREA_URL)
         db_areas = get_areas_from_db()
 
-    left_column = ft.Column(expand=True, scroll=ft.ScrollMode.AUTO)
+    if not FORECAST_SERVER_URL and not repo.has_forecasts():
+        # 初回起動時は全エリアの予報を裏でまとめて取得しておく
+        prefetch_in_background(repo, base_url=JMA_BASE_URL, on_done=lambda stats: forecast_cache.invalidate())
 
-    current_center = ""
-    target_container = None
-    
-    for code, name, center_name in db_areas:
-        if center_name != current_center:
-            current_center = center_name
-            target_container = ft.ExpansionTile(
-                title=ft.Text(center_name, weight="bold", color=ft.Colors.BLUE_800)
-            )
-            left_column.controls.append(target_container)
-        
-        target_container.controls.append(
-            ft.ListTile(
-                title=ft.Text(name, color=ft.Colors.BLUE_900),
-                on_click=lambda e, c=code: show_weather(c),
-            )
-        )
+    # 地方ごとのタイルの中身は、その地方が最初に開かれたときに作る
+    sidebar = ft.Container(width=300, bgcolor=ft.Colors.WHITE, padding=10,
+                           content=build_area_sidebar(db_areas, show_weather))
+
+    def on_areas_changed():
+        sidebar.content = build_area_sidebar(get_areas_from_db(), show_weather)
+        sidebar.update()
 
+    # 計測を有効にして起動したときだけ、ヘッダーに計測結果のパネルを出すボタンを置く
+    stats_panel = ft.Text(visible=False, size=11, font_family="monospace", selectable=True)
+
+    def toggle_stats_panel(e):
+        stats_panel.visible = not stats_panel.visible
+        if stats_panel.visible:
+            lines = format_snapshot(tracer.snapshot())
+            stats_panel.value = "\n".join(lines) or "まだ計測結果がありません"
+        page.update()
+
+    header = [ft.Text("天気予報ダッシュボード", color=ft.Colors.WHITE, size=24, weight="bold")]
+    if tracer.enabled:
+        header.append(ft.IconButton(ft.Icons.QUERY_STATS, icon_color=ft.Colors.WHITE,
+                                    tooltip="計測結果", on_click=toggle_stats_panel))
     page.add(
         ft.Container(
-            content=ft.Text("天気予報ダッシュボード", color=ft.Colors.WHITE, size=24, weight="bold"),
+            content=ft.Row(header, alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
             bgcolor=ft.Colors.BLUE_800, padding=20, width=page.window_width,
         ),
+        stats_panel,
         ft.Row([
-            ft.Container(width=300, bgcolor=ft.Colors.WHITE, content=left_column, padding=10),
+            sidebar,
             ft.VerticalDivider(width=1),
             ft.Container(expand=True, padding=20, content=ft.Column([tabs, weather_list]))
         ], expand=True)
     )
 
+    if not FORECAST_SERVER_URL:
+        revalidate_in_background(repo, AREA_URL, on_changed=on_areas_changed)
+    def on_disconnect(e):
+        # tracer はプロセス全体で共有しているので、ここでは閉じない (ほかのセッションの計測が止まる)
+        print(f"クリック→描画の遅延: {latency_probe.summary()}")
+        runner.shutdown()
+
+    page.on_disconnect = on_disconnect
+
 if __name__ == "__main__":
-    ft.app(target=main)
\ No newline at end of file
+    try:
+        ft.app(target=main)
+    finally:
+        if tracer.enabled:
+            print("\n".join(format_snapshot(tracer.snapshot())))
+            tracer.close()
\ No newline at end of file
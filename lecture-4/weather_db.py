@@ -0,0 +1,270 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import forecast_archive
+from area_snapshot import SNAPSHOT_SCHEMA
+from forecast_archive import ARCHIVE_SCHEMA, TextDictionary
+from forecast_ingest import INGEST_SCHEMA, ingest_forecasts
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_NAME = os.path.join(BASE_DIR, 'weather_forecast.db')
+
+# 接続ごとに一度だけ流すPRAGMA
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA busy_timeout=5000",
+)
+
+CREATE_FORECASTS_SQL = """
+    CREATE TABLE IF NOT EXISTS weather_forecasts (
+        area_code TEXT, date TEXT, weather_text TEXT,
+        fetched_at REAL, report_datetime TEXT,
+        PRIMARY KEY (area_code, date)
+    )
+"""
+# 古いDBファイルに後から追加した列
+FORECAST_EXTRA_COLUMNS = (
+    ("fetched_at", "REAL"),
+    ("report_datetime", "TEXT"),
+)
+CREATE_AREAS_SQL = """
+    CREATE TABLE IF NOT EXISTS areas (
+        code TEXT PRIMARY KEY,
+        name TEXT,
+        center_name TEXT
+    )
+"""
+
+# SQL文は定数にしておき、sqlite3のステートメントキャッシュに再利用させる
+INSERT_AREA_SQL = "INSERT OR REPLACE INTO areas VALUES (?, ?, ?)"
+SELECT_AREAS_SQL = "SELECT code, name, center_name FROM areas ORDER BY center_name"
+INSERT_FORECAST_SQL = """
+    INSERT OR REPLACE INTO weather_forecasts (area_code, date, weather_text, fetched_at, report_datetime)
+    VALUES (?, ?, ?, ?, ?);
+"""
+SELECT_FORECAST_SQL = "SELECT date, weather_text FROM weather_forecasts WHERE area_code = ? ORDER BY date ASC"
+SELECT_FORECAST_META_SQL = """
+    SELECT date, weather_text, fetched_at, report_datetime
+    FROM weather_forecasts WHERE area_code = ? ORDER BY date ASC
+"""
+
+
+def area_rows(area_data):
+    """area.jsonの内容を (code, name, center_name) の行に変換する"""
+    centers = area_data.get("centers", {})
+    offices = area_data.get("offices", {})
+    for c_code, c_info in centers.items():
+        for o_code in c_info.get("children", []):
+            if o_code in offices:
+                yield (o_code, offices[o_code]["name"], c_info["name"])
+
+
+class WeatherRepository:
+    """長寿命の接続を使い回すSQLiteリポジトリ
+
+    接続は最大 pool_size 本まで作成し、操作ごとに with repo.connection() で借りて、
+    with を抜けたらプールに戻す (同じスレッドで入れ子にすると同じ接続を使う)。
+    すべて貸し出し中なら checkout_timeout 秒まで待ち、空かなければ sqlite3.OperationalError にする。
+    archive=True のときは予報の保存のたびに forecast_archive にも追記する。
+    """
+
+    def __init__(self, db_name=DB_NAME, pool_size=8, cached_statements=128, archive=False,
+                 checkout_timeout=30):
+        self.db_name = db_name
+        self.archive = archive
+        self.pool_size = pool_size
+        self.cached_statements = cached_statements
+        self.checkout_timeout = checkout_timeout
+        self._idle = queue.LifoQueue()
+        self._all = []
+        # 接続 -> TextDictionary。接続は一度に1スレッドにしか貸さないので、辞書も同時には使われない
+        self._texts = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.db_name,
+            isolation_level=None,  # BEGIN/COMMITは自前で発行する
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        self._texts[conn] = TextDictionary()
+        return conn
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._all) < self.pool_size:
+                conn = self._open()
+                self._all.append(conn)
+                return conn
+        # プールが埋まっている場合は他の操作の返却を待つ
+        try:
+            return self._idle.get(timeout=self.checkout_timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"{self.checkout_timeout}秒待ってもDB接続が空きませんでした (pool_size={self.pool_size})"
+            ) from None
+
+    @contextmanager
+    def connection(self):
+        """接続を1つ借りる。with を抜けるとプールに戻す"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            # 入れ子の場合は外側で借りた接続をそのまま使う
+            yield conn
+            return
+        conn = self._checkout()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            with self._lock:
+                alive = any(c is conn for c in self._all)
+            if alive:  # 貸し出し中に close() された接続は戻さない
+                self._idle.put(conn)
+
+    def close(self):
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+            self._texts.clear()
+        self._idle = queue.LifoQueue()
+
+    def texts(self, conn):
+        """conn 用の weather_texts のIDキャッシュ"""
+        return self._texts[conn]
+
+    @contextmanager
+    def transaction(self):
+        """書き込みをまとめて1回のCOMMITにする"""
+        with self.connection() as conn:
+            if conn.in_transaction:
+                # 入れ子の場合は外側のトランザクションに相乗りする
+                yield conn
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                # 取り消された weather_texts のIDを覚えていないように、この接続の分を捨てる
+                self._texts[conn] = TextDictionary()
+                raise
+            else:
+                conn.execute("COMMIT")
+
+    def init_schema(self):
+        with self.transaction() as conn:
+            conn.execute(CREATE_FORECASTS_SQL)
+            conn.execute(CREATE_AREAS_SQL)
+            for sql in INGEST_SCHEMA + ARCHIVE_SCHEMA + SNAPSHOT_SCHEMA:
+                conn.execute(sql)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(weather_forecasts)")}
+            for name, col_type in FORECAST_EXTRA_COLUMNS:
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE weather_forecasts ADD COLUMN {name} {col_type}")
+
+    def save_areas(self, area_data):
+        with self.transaction() as conn:
+            conn.executemany(INSERT_AREA_SQL, area_rows(area_data))
+
+    def get_areas(self):
+        with self.connection() as conn:
+            return conn.execute(SELECT_AREAS_SQL).fetchall()
+
+    def save_forecast(self, area_code, times, weathers, fetched_at=None, report_datetime=None):
+        if fetched_at is None:
+            fetched_at = time.time()
+        forecast_data = (
+            (area_code, t[:10], w, fetched_at, report_datetime)
+            for t, w in zip(times, weathers)
+        )
+        with self.transaction() as conn:
+            conn.executemany(INSERT_FORECAST_SQL, forecast_data)
+            if self.archive:
+                forecast_archive.append_forecast(conn, self.texts(conn), area_code, times, weathers, fetched_at)
+
+    def save_forecasts(self, forecasts, fetched_at=None):
+        """(area_code, times, weathers, report_datetime) の並びを1トランザクションで保存する"""
+        if fetched_at is None:
+            fetched_at = time.time()
+        forecasts = list(forecasts)
+        rows = (
+            (area_code, t[:10], w, fetched_at, report_datetime)
+            for area_code, times, weathers, report_datetime in forecasts
+            for t, w in zip(times, weathers)
+        )
+        with self.transaction() as conn:
+            conn.executemany(INSERT_FORECAST_SQL, rows)
+            if self.archive:
+                for area_code, times, weathers, _ in forecasts:
+                    forecast_archive.append_forecast(conn, self.texts(conn), area_code, times, weathers, fetched_at)
+
+    def forecast_history(self, area_code, start, end):
+        """アーカイブからエリアの start〜end の予報の変遷を返す"""
+        with self.connection() as conn:
+            return forecast_archive.forecast_history(conn, area_code, start, end)
+
+    def forecast_drift(self, area_code=None):
+        """アーカイブからリードタイム別の予報的中率(最終予報との一致率)を返す"""
+        with self.connection() as conn:
+            return forecast_archive.forecast_drift(conn, area_code)
+
+    def ingest_forecast(self, office_code, data):
+        """forecast JSON全体を正規化テーブル(forecast_values)に保存する"""
+        return self.ingest_forecasts([(office_code, data)])
+
+    def ingest_forecasts(self, payloads):
+        with self.transaction() as conn:
+            return ingest_forecasts(conn, payloads)
+
+    def get_forecast_values(self, office_code, element, series=0):
+        """officeの指定要素を [(area_code, time_define, value), ...] で返す"""
+        with self.connection() as conn:
+            return conn.execute(
+                """
+                SELECT v.area_code, v.time_define, v.value
+                FROM forecast_values v JOIN forecast_elements e ON e.id = v.element_id
+                WHERE v.office_code = ? AND e.name = ? AND v.series = ?
+                ORDER BY v.time_define, v.area_code
+                """,
+                (office_code, element, series),
+            ).fetchall()
+
+    def has_forecasts(self):
+        with self.connection() as conn:
+            return conn.execute("SELECT 1 FROM weather_forecasts LIMIT 1").fetchone() is not None
+
+    def get_forecast(self, area_code):
+        with self.connection() as conn:
+            return conn.execute(SELECT_FORECAST_SQL, (area_code,)).fetchall()
+
+    def get_forecast_with_meta(self, area_code):
+        """(rows, fetched_at, report_datetime) を返す。fetched_atは最後に取得した時刻"""
+        with self.connection() as conn:
+            rows = conn.execute(SELECT_FORECAST_META_SQL, (area_code,)).fetchall()
+        if not rows:
+            return [], None, None
+        fetched = [r[2] for r in rows if r[2] is not None]
+        reports = [r[3] for r in rows if r[3] is not None]
+        return (
+            [(r[0], r[1]) for r in rows],
+            max(fetched) if fetched else None,
+            max(reports) if reports else None,
+        )
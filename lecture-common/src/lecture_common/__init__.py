@@ -0,0 +1,8 @@
+"""天気アプリ (lecture-3, lecture-4) とGitHubスクレイパー (lecture-1) で共有するモジュール
+
+- http_client: keep-alive のセッションと条件付きGETのディスクキャッシュ
+- tracing: 区間・カウンター・ヒストグラムの計測API
+- ui_worker: Fletのイベントハンドラーから重い処理を逃がすワーカーと、クリックから描画までの計測
+
+    pip install -e lecture-common
+"""
@@ -0,0 +1,244 @@
+"""天気アプリとスクレイパーで共有するHTTPクライアント
+
+- keep-alive の requests.Session (接続プールつき) をプロセス内で使い回す (shared_client())
+- 200 のレスポンスに ETag / Last-Modified があれば、本体をディスクに保存しておき、
+  次回は If-None-Match / If-Modified-Since を付けて取得する。304 が返ったら保存した本体から
+  200 のレスポンスを作って返すので、呼び出し側は r.json() などをそのまま使える (r.from_cache が True)
+- 本体は内容のハッシュ (sha256) をファイル名にして保存する (同じ内容は1つだけ)。
+  URLごとの検証子と最終使用時刻は index.db (SQLite) に持ち、合計が max_bytes を超えたら
+  使われていない順に捨てる
+- 呼び出し側が自分で If-None-Match などを付けたときは、304 をそのまま返す (area_snapshot や
+  github_sync のように検証子を自分のDBで管理しているもの用)
+
+    from lecture_common.http_client import shared_client
+
+    r = shared_client().get(url)
+    print(shared_client().stats_snapshot())  # 304の割合と節約できたバイト数
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from lecture_common.tracing import tracer
+
+# 実行したディレクトリに作る (tracing の profiles/ と同じ)
+CACHE_DIR = os.environ.get("HTTP_CACHE_DIR", "http_cache")
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+CONDITIONAL_HEADERS = ("If-None-Match", "If-Modified-Since")
+
+CREATE_ENTRIES_SQL = """
+    CREATE TABLE IF NOT EXISTS entries (
+        url TEXT PRIMARY KEY,
+        etag TEXT,
+        last_modified TEXT,
+        content_type TEXT,
+        digest TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        used_at REAL NOT NULL
+    )
+"""
+CREATE_USED_AT_INDEX_SQL = "CREATE INDEX IF NOT EXISTS entries_used_at ON entries (used_at)"
+# 同じ内容を複数のURLが指していても、ディスク上は1つなので1回だけ数える
+TOTAL_SIZE_SQL = "SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM entries GROUP BY digest)"
+
+
+class DiskCache:
+    """URL -> (検証子, 本体) を保存する、サイズ上限つきのディスクキャッシュ"""
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "index.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(CREATE_ENTRIES_SQL)
+        self._conn.execute(CREATE_USED_AT_INDEX_SQL)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def _object_path(self, digest):
+        return os.path.join(self.directory, "objects", digest[:2], digest)
+
+    def lookup(self, url):
+        """(etag, last_modified, content_type, digest) を返す。無ければ None"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT etag, last_modified, content_type, digest FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+
+    def read(self, url, digest):
+        """本体を読み、最終使用時刻を更新する。ファイルが消えていたら None (エントリも消す)"""
+        try:
+            with open(self._object_path(digest), "rb") as f:
+                body = f.read()
+        except OSError:
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+            return None
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE entries SET used_at = ? WHERE url = ?", (time.time(), url))
+        return body
+
+    def store(self, url, body, etag, last_modified, content_type):
+        if len(body) > self.max_bytes:
+            return
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        with self._lock, self._conn:
+            old = self._conn.execute("SELECT digest FROM entries WHERE url = ?", (url,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (url, etag, last_modified, content_type, digest, size, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, content_type, digest, len(body), time.time()),
+            )
+            if old is not None and old[0] != digest:
+                self._remove_unreferenced(old[0])
+            self._evict()
+
+    def _evict(self):
+        """合計が max_bytes に収まるまで、使われていない順にエントリを消す (ロックを持って呼ぶ)"""
+        total = self._conn.execute(TOTAL_SIZE_SQL).fetchone()[0]
+        while total > self.max_bytes:
+            url, digest = self._conn.execute(
+                "SELECT url, digest FROM entries ORDER BY used_at LIMIT 1"
+            ).fetchone()
+            self._conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+            self._remove_unreferenced(digest)
+            self.evicted += 1
+            total = self._conn.execute(TOTAL_SIZE_SQL).fetchone()[0]
+
+    def _remove_unreferenced(self, digest):
+        if self._conn.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+            return
+        try:
+            os.remove(self._object_path(digest))
+        except OSError:
+            pass
+
+    def total_bytes(self):
+        with self._lock:
+            return self._conn.execute(TOTAL_SIZE_SQL).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def cached_response(url, body, etag, last_modified, content_type):
+    """保存しておいた本体から 200 のレスポンスを作る"""
+    r = requests.Response()
+    r.status_code = 200
+    r.url = url
+    r._content = body
+    r.headers = CaseInsensitiveDict()
+    for name, value in (("ETag", etag), ("Last-Modified", last_modified), ("Content-Type", content_type)):
+        if value:
+            r.headers[name] = value
+    r.encoding = get_encoding_from_headers(r.headers)
+    r.from_cache = True
+    return r
+
+
+class HttpClient:
+    """keep-aliveのセッションと、条件付きGETで検証するディスクキャッシュを持つクライアント
+
+    cache_dir=None ならキャッシュせず、接続の使い回しだけを行う。
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_cache_bytes=MAX_CACHE_BYTES, pool_size=8, timeout=10,
+                 headers=None):
+        self.timeout = timeout
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.cache = DiskCache(cache_dir, max_cache_bytes) if cache_dir else None
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "not_modified": 0, "revalidated": 0, "bytes_received": 0, "bytes_saved": 0}
+
+    def get(self, url, headers=None, timeout=None):
+        """GETする。キャッシュがあれば検証子を付け、304 なら保存した本体のレスポンスを返す"""
+        headers = dict(headers or {})
+        entry = None
+        if self.cache is not None and not any(h in headers for h in CONDITIONAL_HEADERS):
+            entry = self.cache.lookup(url)
+            if entry is not None:
+                etag, last_modified, _, _ = entry
+                if etag:
+                    headers["If-None-Match"] = etag
+                if last_modified:
+                    headers["If-Modified-Since"] = last_modified
+        r = self.session.get(url, headers=headers or None, timeout=timeout or self.timeout)
+        received = len(r.content)
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["bytes_received"] += received
+            if r.status_code == 304:
+                self.stats["not_modified"] += 1
+        tracer.count("http.bytes_received", received)
+
+        if r.status_code == 304 and entry is not None:
+            etag, last_modified, content_type, digest = entry
+            body = self.cache.read(url, digest)
+            if body is None:
+                # 本体がディスクから消えていたら、検証子なしで取り直す
+                return self.get(url, headers=None, timeout=timeout)
+            with self._lock:
+                self.stats["revalidated"] += 1
+                self.stats["bytes_saved"] += len(body)
+            tracer.count("http.not_modified")
+            tracer.count("http.bytes_saved", len(body))
+            return cached_response(
+                url, body, r.headers.get("ETag", etag), r.headers.get("Last-Modified", last_modified), content_type,
+            )
+
+        r.from_cache = False
+        etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+        if self.cache is not None and r.status_code == 200 and (etag or last_modified):
+            self.cache.store(url, r.content, etag, last_modified, r.headers.get("Content-Type"))
+        return r
+
+    def stats_snapshot(self):
+        """統計に、304の割合 (not_modified_rate) とキャッシュの使用量を足したもの"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats["not_modified_rate"] = stats["not_modified"] / stats["requests"] if stats["requests"] else 0.0
+        if self.cache is not None:
+            stats["cache_bytes"] = self.cache.total_bytes()
+            stats["evicted"] = self.cache.evicted
+        return stats
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_client():
+    """プロセス内で共有するクライアント (キャッシュは CACHE_DIR、環境変数 HTTP_CACHE_DIR で変えられる)"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HttpClient()
+        return _shared
@@ -0,0 +1,320 @@
+"""処理時間を区間 (span)・カウンター・ヒストグラムで記録する軽量な計測API
+
+    from lecture_common.tracing import tracer
+
+    with tracer.span("weather.fetch", area=area_code):
+        r = requests.get(url)
+    tracer.count("weather.cache_miss")
+    tracer.observe("scraper.parse", elapsed_ms)
+
+- 無効のとき (既定) は span() が使い回しの何もしないコンテキストマネージャーを返し、
+  count()/observe() もすぐ戻るので、呼び出し箇所を残したままでもほとんど負荷がない
+- 有効にすると、区間の時間を名前ごとのヒストグラムに集計し、snapshot() で p50/p95/p99 などを返す
+  (アプリ内の統計パネル用)。log_path を渡すと、区間が終わるたびにJSON Linesで書き出す
+- profile="cprofile" なら tracer.profile(name) の中だけ cProfile で測り、close() で .prof に書く。
+  profile="sample" なら別スレッドで全スレッドのスタックを一定間隔で取り、折りたたみ形式
+  (flamegraph.pl にそのまま渡せる) で書く
+
+環境変数でも有効にできる:
+
+    TRACE=1 TRACE_LOG=trace.jsonl TRACE_PROFILE=sample flet run weather-v2.py
+"""
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+DEFAULT_PROFILE_DIR = "profiles"
+
+
+class Histogram:
+    """件数・合計・最大と、最大 max_samples 個のサンプル (reservoir sampling) を持つ"""
+
+    def __init__(self, max_samples=2048):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.max_samples = max_samples
+        self._samples = []
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if len(self._samples) < self.max_samples:
+            self._samples.append(value)
+        else:
+            # それまでの全件から一様に残るように入れ替える
+            i = random.randrange(self.count)
+            if i < self.max_samples:
+                self._samples[i] = value
+
+    def summary(self):
+        ordered = sorted(self._samples)
+
+        def pick(q):
+            return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": pick(0.50),
+            "p95": pick(0.95),
+            "p99": pick(0.99),
+            "max": self.max,
+        }
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "attrs", "parent", "started")
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed_ms = (time.perf_counter() - self.started) * 1000
+        self.tracer._stack().pop()
+        self.tracer._finish(self, elapsed_ms, exc_type)
+        return False
+
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class SamplingProfiler:
+    """interval 秒ごとに全スレッドのスタックを取り、折りたたみ形式のスタックごとに数える"""
+
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._log = None
+        self._profile_kind = None
+        self._profile_dir = DEFAULT_PROFILE_DIR
+        self._profiles = {}
+        self._sampler = None
+        self.reset()
+
+    def configure(self, enabled=True, log_path=None, profile=None, profile_dir=DEFAULT_PROFILE_DIR):
+        """計測を有効にする。profile は None / "cprofile" / "sample" """
+        if profile not in (None, "cprofile", "sample"):
+            raise ValueError(f"unknown profiler: {profile}")
+        self.close()
+        self.enabled = enabled
+        self._profile_kind = profile if enabled else None
+        self._profile_dir = profile_dir
+        if enabled and log_path:
+            self._log = open(log_path, "a", encoding="utf-8", buffering=1)
+        if self._profile_kind == "sample":
+            self._sampler = SamplingProfiler()
+            self._sampler.start()
+        return self
+
+    def configure_from_env(self, environ=os.environ):
+        if environ.get("TRACE") or environ.get("TRACE_LOG") or environ.get("TRACE_PROFILE"):
+            self.configure(
+                log_path=environ.get("TRACE_LOG"),
+                profile=environ.get("TRACE_PROFILE") or None,
+                profile_dir=environ.get("TRACE_PROFILE_DIR", DEFAULT_PROFILE_DIR),
+            )
+        return self
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._counters = Counter()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    # --- 記録 ---
+    def span(self, name, **attrs):
+        """with で囲んだ区間の時間 (ms) を name のヒストグラムに記録する"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, attrs)
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name, value, **attrs):
+        """区間で測れない値 (別プロセスで測った時間など) をヒストグラムに記録する"""
+        if not self.enabled:
+            return
+        self._record(name, value, attrs, None, None)
+
+    def traced(self, name=None):
+        """関数全体を区間にするデコレーター"""
+        def decorate(fn):
+            span_name = name or fn.__qualname__
+
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Span(self, span_name, {}):
+                    return fn(*args, **kwargs)
+            wrapper.__name__ = fn.__name__
+            wrapper.__doc__ = fn.__doc__
+            wrapper.__wrapped__ = fn
+            return wrapper
+        return decorate
+
+    def _finish(self, span, elapsed_ms, exc_type):
+        if exc_type is not None:
+            self.count(f"{span.name}.errors")
+        self._record(span.name, elapsed_ms, span.attrs, span.parent, exc_type)
+
+    def _record(self, name, value, attrs, parent, exc_type):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.add(value)
+            if self._log is not None:
+                event = {"ts": round(time.time(), 6), "span": name, "ms": round(value, 3),
+                         "thread": threading.current_thread().name}
+                if parent:
+                    event["parent"] = parent
+                if exc_type is not None:
+                    event["error"] = exc_type.__name__
+                event.update(attrs)
+                self._log.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+
+    # --- プロファイラー ---
+    @contextlib.contextmanager
+    def profile(self, name):
+        """profile="cprofile" のときだけ、この区間 (現在のスレッド) を cProfile で測る"""
+        if self._profile_kind != "cprofile":
+            yield
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self._lock:
+                profiler.create_stats()
+                if name in self._profiles:
+                    self._profiles[name].add(profiler)
+                else:
+                    self._profiles[name] = pstats.Stats(profiler)
+
+    def write_profiles(self):
+        """集めたプロファイルを profile_dir に書き、書いたファイルのリストを返す"""
+        written = []
+        if not self._profiles and self._sampler is None:
+            return written
+        os.makedirs(self._profile_dir, exist_ok=True)
+        for name, stats in self._profiles.items():
+            path = os.path.join(self._profile_dir, f"{name}.prof")
+            stats.dump_stats(path)
+            written.append(path)
+        if self._sampler is not None:
+            path = os.path.join(self._profile_dir, "samples.folded")
+            self._sampler.write(path)
+            written.append(path)
+        return written
+
+    # --- 出力 ---
+    def snapshot(self):
+        """{"spans": {name: {count, total, mean, p50, p95, p99, max}}, "counters": {name: 値}}"""
+        with self._lock:
+            return {
+                "spans": {name: h.summary() for name, h in sorted(self._histograms.items())},
+                "counters": dict(sorted(self._counters.items())),
+            }
+
+    def close(self):
+        """プロファイルと集計をファイルに書き出して、計測を止める"""
+        if self._sampler is not None:
+            self._sampler.stop()
+        self.write_profiles()
+        if self._log is not None:
+            self._log.write(json.dumps({"ts": round(time.time(), 6), "summary": self.snapshot()},
+                                       ensure_ascii=False) + "\n")
+            self._log.close()
+        self._log = None
+        self._sampler = None
+        self._profiles = {}
+        self.enabled = False
+
+
+def format_snapshot(snapshot, limit=None):
+    """snapshot() を表示用の行のリストにする (統計パネルやコンソール用)"""
+    lines = []
+    spans = sorted(snapshot["spans"].items(), key=lambda item: -item[1]["total"])
+    for name, s in spans[:limit]:
+        lines.append(f"{name:<24} n={s['count']:<6} p50={s['p50']:8.2f}ms  p95={s['p95']:8.2f}ms  "
+                     f"max={s['max']:8.2f}ms")
+    for name, value in snapshot["counters"].items():
+        lines.append(f"{name:<24} {value:,}")
+    return lines
+
+
+# アプリ全体で共有する tracer。環境変数 TRACE / TRACE_LOG / TRACE_PROFILE があれば有効になる
+tracer = Tracer().configure_from_env()
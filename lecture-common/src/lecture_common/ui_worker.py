@@ -0,0 +1,113 @@
+import json
+import logging
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class LatestRequestRunner:
+    """重い処理をバックグラウンドで実行し、最後に依頼された結果だけをUIに反映する
+
+    新しい submit() が来た時点で、まだ始まっていない古いジョブはキャンセルし、
+    すでに走っているジョブの結果は捨てる。
+    """
+
+    def __init__(self, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ui-worker")
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._pending = None
+        self.stats = {"submitted": 0, "cancelled": 0, "discarded": 0, "applied": 0}
+
+    def is_current(self, generation):
+        return generation == self._generation
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def submit(self, work, on_done, on_error=None):
+        """work() をワーカーで実行し、最新のままなら on_done(result) を呼ぶ"""
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            if self._pending is not None and self._pending.cancel():
+                self.stats["cancelled"] += 1
+            self.stats["submitted"] += 1
+
+            def task():
+                if not self.is_current(generation):
+                    self._count("discarded")
+                    return
+                try:
+                    result = work()
+                except Exception as e:
+                    if not self.is_current(generation):
+                        self._count("discarded")
+                    elif on_error is not None:
+                        _call_safely(on_error, e)
+                    else:
+                        logger.exception("バックグラウンドの処理に失敗しました")
+                    return
+                if not self.is_current(generation):
+                    self._count("discarded")
+                    return
+                self._count("applied")
+                _call_safely(on_done, result)
+
+            self._pending = self._executor.submit(task)
+        return generation
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _call_safely(callback, arg):
+    """UIへの反映 (page.update() など) の例外は、Future の中で消えないようにログに出す"""
+    try:
+        callback(arg)
+    except Exception:
+        logger.exception("UIへの反映に失敗しました: %r", callback)
+
+
+class LatencyProbe:
+    """クリックから描画までの時間を段階ごとに記録する"""
+
+    def __init__(self, log_path=None):
+        self.log_path = log_path
+        self._clicks = {}
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def click(self, key):
+        with self._lock:
+            self._clicks[key] = time.perf_counter()
+
+    def paint(self, key, stage, final=False):
+        """描画完了を記録する。final=True のときはそのクリックの計測を終える"""
+        now = time.perf_counter()
+        with self._lock:
+            started = self._clicks.pop(key, None) if final else self._clicks.get(key)
+            if started is None:
+                return None
+            elapsed_ms = (now - started) * 1000
+            self.samples.setdefault(stage, []).append(elapsed_ms)
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": str(key), "stage": stage, "ms": round(elapsed_ms, 3)}) + "\n")
+        return elapsed_ms
+
+    def summary(self):
+        result = {}
+        for stage, values in self.samples.items():
+            ordered = sorted(values)
+            result[stage] = {
+                "count": len(ordered),
+                "p50_ms": statistics.median(ordered),
+                "p95_ms": ordered[max(0, int(len(ordered) * 0.95) - 1)],
+                "max_ms": ordered[-1],
+            }
+        return result
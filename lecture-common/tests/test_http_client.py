@@ -0,0 +1,115 @@
+import hashlib
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from lecture_common.http_client import HttpClient  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """server.bodies[path] を返す。ETag は内容から作り、If-None-Match が一致すれば 304"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.seen_headers.append(dict(self.headers))
+        body = server.bodies.get(self.path)
+        if body is None:
+            self._send(404, b"not found")
+            return
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, b"", etag)
+            return
+        self._send(200, body, etag)
+
+    def _send(self, status, body, etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.bodies = {"/a.json": b'{"area": "a"}' * 100, "/b.json": b'{"area": "b"}' * 100}
+    server.seen_headers = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_second_get_is_revalidated_from_disk(stub, tmp_path):
+    server, base_url = stub
+    client = HttpClient(str(tmp_path))
+    first = client.get(base_url + "/a.json")
+    second = client.get(base_url + "/a.json")
+    stats = client.stats_snapshot()
+    client.close()
+
+    assert first.status_code == second.status_code == 200
+    assert not first.from_cache and second.from_cache
+    assert second.content == first.content
+    assert "If-None-Match" in server.seen_headers[1]
+    assert stats["requests"] == 2 and stats["not_modified"] == 1
+    assert stats["not_modified_rate"] == 0.5
+    assert stats["bytes_saved"] == len(server.bodies["/a.json"])
+
+
+def test_cache_survives_restart_and_picks_up_changes(stub, tmp_path):
+    server, base_url = stub
+    HttpClient(str(tmp_path)).get(base_url + "/a.json")
+
+    client = HttpClient(str(tmp_path))
+    assert client.get(base_url + "/a.json").from_cache
+    server.bodies["/a.json"] = b'{"area": "changed"}'
+    r = client.get(base_url + "/a.json")
+    assert not r.from_cache and r.json() == {"area": "changed"}
+    assert client.get(base_url + "/a.json").json() == {"area": "changed"}
+    client.close()
+
+
+def test_caller_validators_get_304_back(stub, tmp_path):
+    _, base_url = stub
+    client = HttpClient(str(tmp_path))
+    etag = client.get(base_url + "/a.json").headers["ETag"]
+    r = client.get(base_url + "/a.json", headers={"If-None-Match": etag})
+    client.close()
+    assert r.status_code == 304 and not r.from_cache
+
+
+def test_evicts_least_recently_used(stub, tmp_path):
+    server, base_url = stub
+    size = len(server.bodies["/a.json"])
+    client = HttpClient(str(tmp_path), max_cache_bytes=size + size // 2)
+    client.get(base_url + "/a.json")
+    client.get(base_url + "/b.json")
+    stats = client.stats_snapshot()
+    assert stats["evicted"] == 1 and stats["cache_bytes"] == size
+    assert not client.get(base_url + "/a.json").from_cache
+    client.close()
+
+
+def test_without_cache_dir_sends_no_validators(stub):
+    server, base_url = stub
+    client = HttpClient(None)
+    client.get(base_url + "/a.json")
+    r = client.get(base_url + "/a.json")
+    client.close()
+    assert r.status_code == 200 and not r.from_cache
+    assert all("If-None-Match" not in h for h in server.seen_headers)
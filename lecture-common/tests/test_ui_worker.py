@@ -0,0 +1,91 @@
+import logging
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from lecture_common.ui_worker import LatencyProbe, LatestRequestRunner  # noqa: E402
+
+TIMEOUT = 5
+
+
+def blocking(result, started, release, error=None):
+    """started を立ててから release まで待ち、result を返す (error があれば送出する)"""
+    def work():
+        started.set()
+        assert release.wait(TIMEOUT)
+        if error is not None:
+            raise error
+        return result
+    return work
+
+
+def test_stale_result_is_discarded():
+    runner = LatestRequestRunner(max_workers=2)
+    started, release, done = threading.Event(), threading.Event(), threading.Event()
+    applied = []
+    runner.submit(blocking("old", started, release), applied.append)
+    assert started.wait(TIMEOUT)
+    runner.submit(lambda: "new", lambda r: (applied.append(r), done.set()))
+    assert done.wait(TIMEOUT)
+    release.set()
+    runner.shutdown()
+    runner._executor.shutdown(wait=True)
+    assert applied == ["new"]
+    assert runner.stats["applied"] == 1 and runner.stats["discarded"] == 1
+
+
+def test_on_error_only_for_current_generation():
+    runner = LatestRequestRunner(max_workers=2)
+    started, release, done = threading.Event(), threading.Event(), threading.Event()
+    errors = []
+    runner.submit(blocking(None, started, release, ValueError("old")), print, on_error=errors.append)
+    assert started.wait(TIMEOUT)
+    runner.submit(lambda: 1 / 0, print, on_error=lambda e: (errors.append(e), done.set()))
+    assert done.wait(TIMEOUT)
+    release.set()
+    runner.shutdown()
+    runner._executor.shutdown(wait=True)
+    assert [type(e) for e in errors] == [ZeroDivisionError]
+
+
+def test_pending_task_is_cancelled():
+    runner = LatestRequestRunner(max_workers=1)
+    started, release, done = threading.Event(), threading.Event(), threading.Event()
+    ran = []
+    runner.submit(blocking("first", started, release), ran.append)
+    assert started.wait(TIMEOUT)
+    runner.submit(lambda: ran.append("second"), ran.append)  # 1つ目が終わるまで始まらない
+    runner.submit(lambda: "third", lambda r: (ran.append(r), done.set()))
+    release.set()
+    assert done.wait(TIMEOUT)
+    runner.shutdown()
+    assert ran == ["third"]
+    assert runner.stats["cancelled"] == 1 and runner.stats["submitted"] == 3
+
+
+def test_on_done_exception_is_logged(caplog):
+    runner = LatestRequestRunner(max_workers=1)
+    done = threading.Event()
+
+    def on_done(result):
+        done.set()
+        raise RuntimeError("page closed")
+
+    with caplog.at_level(logging.ERROR, logger="lecture_common.ui_worker"):
+        runner.submit(lambda: 1, on_done)
+        assert done.wait(TIMEOUT)
+        runner._executor.shutdown(wait=True)
+    assert any("page closed" in r.exc_text for r in caplog.records if r.exc_text)
+    assert runner.stats["applied"] == 1
+
+
+def test_latency_probe_records_until_final_paint():
+    probe = LatencyProbe()
+    probe.click("130000")
+    assert probe.paint("130000", "placeholder") is not None
+    assert probe.paint("130000", "forecast", final=True) is not None
+    assert probe.paint("130000", "forecast", final=True) is None
+    summary = probe.summary()
+    assert summary["placeholder"]["count"] == summary["forecast"]["count"] == 1
@@ -0,0 +1,71 @@
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from word_stats import WordStats, split_ranges, stats_for_range, tokenize, word_stats  # noqa: E402
+
+TEXT = (
+    "It is not the strongest of the species that survives, nor the most intelligent that survives.\n"
+    "It is the one that is most adaptable to change. Supercalifragilisticexpialidocious!\t"
+    "日本語の 単語も 数える、 survives  again.\n"
+) * 7
+TARGETS = [1, 2, 5, 6, 8, 9, 16, 40, 120, 10_000]
+
+
+def expected(text):
+    words = tokenize(text)
+    first = {}
+    for i, word in enumerate(words, 1):
+        first.setdefault(word, i)
+    return words, Counter(words), first
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = tmp_path / "corpus.txt"
+    path.write_bytes(TEXT.encode("utf-8"))
+    return str(path)
+
+
+@pytest.mark.parametrize("workers, chunk_size", [(0, 7), (2, 7), (3, 64), (2, 1 << 20)])
+def test_map_reduce_matches_single_process_counter(corpus, workers, chunk_size):
+    words, counts, first = expected(TEXT)
+    stats = word_stats(corpus, workers=workers, targets=TARGETS, chunk_size=chunk_size)
+    assert stats.counts == counts
+    assert stats.total_words == len(words)
+    assert stats.first_position == first
+    assert stats.target_words == {p: words[p - 1] for p in TARGETS if p <= len(words)}
+
+
+def test_range_boundaries_do_not_split_words(corpus):
+    data = TEXT.encode("utf-8")
+    ranges = split_ranges(corpus, 11)  # 11等分の位置はほとんどが単語の途中
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    for start, _ in ranges[1:]:
+        assert data[start - 1:start].isspace()
+
+
+def test_chunk_boundary_inside_a_word(corpus):
+    data = TEXT.encode("utf-8")
+    cut = data.index(b"strongest") + 4  # "stro" | "ngest"
+    # 読む単位 (chunk_size) の切れ目が単語の途中に来ても、空白まで持ち越すので単語は切れない
+    assert stats_for_range(corpus, 0, len(data), chunk_size=5).counts == expected(TEXT)[1]
+    # 範囲を単語の途中で切ると "stro" と "ngest" に分かれてしまう (split_ranges が空白で切る理由)
+    merged = WordStats()
+    for start, end in ((0, cut), (cut, len(data))):
+        merged.merge(stats_for_range(corpus, start, end, chunk_size=5))
+    assert merged.counts["stro"] == merged.counts["ngest"] == 1
+    assert merged.counts != expected(TEXT)[1]
+
+
+def test_length_histogram_and_prefix_index():
+    stats = WordStats(targets=[1, 2, 5, 6, 8, 9, 16])
+    stats.add_text(TEXT)
+    words = tokenize(TEXT)
+    assert stats.length_histogram() == sorted(Counter(map(len, words)).items())
+    assert stats.prefix_index() == {"it": 1, "is": 2, "st": 5, "of": 6, "sp": 8, "th": 9, "su": 16}
@@ -0,0 +1,237 @@
+"""Python演習1 問4・問5 の単語の処理を、大きなテキストファイルにも使えるようにしたもの
+
+問4・問5 と同じく「句読点を除く (str.translate) -> 小文字にする -> split() で単語にする」で数え、
+
+- 単語ごとの出現回数
+- 単語の文字数 (len) ごとの個数 (length_histogram())
+- 単語が最初に出てくる位置 (先頭から何番目か、1から)
+- 指定した位置の単語 (問5 の辞書は prefix_index() で作れる)
+
+を求める。ファイルは丸ごと読まずに chunk_size バイトずつ読み、空白の位置で区切るので
+単語が途中で切れない。大きなファイルは空白の位置でいくつかの範囲に分け、プロセスプールで
+範囲ごとに WordStats を作ってから、先頭の範囲から順に merge() する (位置は前の範囲の単語数だけずらす)。
+指定した位置の単語は、範囲ごとの単語数が分かるまで決まらないので、最後にその位置を含む範囲だけ読み直す。
+
+    >>> stats = WordStats(targets=[1, 2, 5, 6, 8, 9, 16])
+    >>> stats.add_text("It is not the strongest of the species that survives, nor the most "
+    ...                "intelligent that survives. It is the one that is most adaptable to change.")
+    >>> stats.prefix_index()
+    {'it': 1, 'is': 2, 'st': 5, 'of': 6, 'sp': 8, 'th': 9, 'su': 16}
+    >>> stats.counts["that"], stats.first_position["survives"]
+    (3, 10)
+
+    python word_stats.py corpus.txt --workers 4 --top 20 --positions 1 2 5 6 8 9 16
+"""
+import argparse
+import os
+import string
+import time
+from bisect import bisect_left
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+CHUNK_SIZE = 4 * 1024 * 1024
+NEW_WORDS_BY_INDEX = 32  # 初めて出てくる単語がこれ以下なら、位置を list.index で探す
+PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+# ここで区切れば、str.split() が分ける位置と必ず一致する (UTF-8の途中にもならない)
+SPLIT_BYTES = (b" ", b"\n", b"\t", b"\r", b"\x0b", b"\x0c")
+
+
+def tokenize(text):
+    """問5 と同じ手順で単語のリストにする"""
+    return text.translate(PUNCTUATION_TABLE).lower().split()
+
+
+class WordStats:
+    """単語の統計。範囲ごとに作ったものを merge() で1つにまとめられる
+
+    位置はこの WordStats に入れた最初の単語を1番目として数える。
+    targets (単語を知りたい位置) は add_words() で入れた分についてだけ記録し、merge() では足さない。
+    """
+
+    def __init__(self, targets=()):
+        self.targets = sorted(set(targets))
+        self.total_words = 0
+        self.counts = Counter()
+        self.first_position = {}
+        self.target_words = {}  # 位置 -> 単語 (targets のうち見つかったもの)
+
+    def add_words(self, words):
+        base = self.total_words
+        chunk_counts = Counter(words)
+        self.counts.update(chunk_counts)
+        new_words = chunk_counts.keys() - self.first_position.keys()
+        if len(new_words) <= NEW_WORDS_BY_INDEX:
+            # 初めて出てくる単語が少ないとき (最初のチャンクより後はほとんどこちら) は list.index で探す
+            for word in new_words:
+                self.first_position[word] = base + words.index(word) + 1
+        else:
+            # 後ろから入れると、同じ単語は最初に出てきた位置が残る
+            positions = dict(zip(reversed(words), range(base + len(words), base, -1)))
+            for word in new_words:
+                self.first_position[word] = positions[word]
+        i = bisect_left(self.targets, base + 1)
+        while i < len(self.targets) and self.targets[i] <= base + len(words):
+            self.target_words[self.targets[i]] = words[self.targets[i] - base - 1]
+            i += 1
+        self.total_words += len(words)
+
+    def add_text(self, text):
+        self.add_words(tokenize(text))
+
+    def merge(self, other):
+        """other (この範囲の直後の範囲) を足し込んで self を返す"""
+        base = self.total_words
+        self.counts.update(other.counts)
+        for word in other.first_position.keys() - self.first_position.keys():
+            self.first_position[word] = other.first_position[word] + base
+        self.total_words += other.total_words
+        return self
+
+    def prefix_index(self):
+        """問5 の辞書: 指定した位置の単語の先頭2文字 -> 位置 (同じキーは後の位置で上書き)"""
+        return {self.target_words[p][:2]: p for p in self.targets if p in self.target_words}
+
+    def length_histogram(self):
+        """[(文字数, 個数), ...] を文字数の順に返す (異なり語ごとに counts から足すので、単語ごとに len() しない)"""
+        lengths = Counter()
+        for word, count in self.counts.items():
+            lengths[len(word)] += count
+        return sorted(lengths.items())
+
+
+def iter_text_chunks(f, start=0, end=None, chunk_size=CHUNK_SIZE):
+    """バイナリファイル f の [start, end) を、単語の途中で切らずに str で少しずつ返す"""
+    f.seek(start)
+    remaining = None if end is None else end - start
+    rest = b""
+    while remaining is None or remaining > 0:
+        data = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+        if not data:
+            break
+        if remaining is not None:
+            remaining -= len(data)
+        data = rest + data
+        cut = max(data.rfind(sep) for sep in SPLIT_BYTES) + 1
+        if cut == 0:
+            # 空白が無い (とても長い単語) ときは次と続けて読む
+            rest = data
+            continue
+        rest = data[cut:]
+        yield data[:cut].decode("utf-8", errors="replace")
+    if rest:
+        yield rest.decode("utf-8", errors="replace")
+
+
+def _boundary(f, offset):
+    """offset 以降で、直前のバイトが空白になる最初の位置 (単語の途中なら単語の後ろまで進む)"""
+    if offset == 0:
+        return 0
+    f.seek(offset - 1)
+    position = offset - 1
+    while True:
+        data = f.read(64 * 1024)
+        if not data:
+            return position
+        cuts = [i for i in (data.find(sep) for sep in SPLIT_BYTES) if i >= 0]
+        if cuts:
+            return position + min(cuts) + 1
+        position += len(data)
+
+
+def split_ranges(path, parts):
+    """ファイルを空白の位置でおおよそ parts 等分した [(start, end), ...]"""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        bounds = sorted({_boundary(f, size * i // parts) for i in range(parts)} | {size})
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def stats_for_range(path, start, end, chunk_size=CHUNK_SIZE):
+    """ファイルの [start, end) の WordStats (位置はこの範囲の先頭の単語を1番目とする)"""
+    stats = WordStats()
+    with open(path, "rb") as f:
+        for text in iter_text_chunks(f, start, end, chunk_size):
+            stats.add_text(text)
+    return stats
+
+
+def _map_range(args):
+    return stats_for_range(*args)
+
+
+def word_stats(paths, workers=None, targets=(), chunk_size=CHUNK_SIZE, parts_per_worker=2):
+    """paths のファイルを順につなげたものの WordStats を返す
+
+    workers を2以上にすると、各ファイルを空白の位置で範囲に分けてプロセスプールで数え (map)、
+    先頭の範囲から順に merge() する (reduce)。
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    result = WordStats(targets)
+    if not workers or workers < 2:
+        # 1つの WordStats に先頭から順に入れるので、指定位置の単語もその場で分かる
+        for path in paths:
+            with open(path, "rb") as f:
+                for text in iter_text_chunks(f, chunk_size=chunk_size):
+                    result.add_text(text)
+        return result
+
+    tasks = [
+        (path, start, end, chunk_size)
+        for path in paths
+        for start, end in split_ranges(path, workers * parts_per_worker)
+    ]
+    bases = []  # 各範囲より前にある単語の数
+    with ProcessPoolExecutor(workers) as pool:
+        for partial in pool.map(_map_range, tasks):
+            bases.append(result.total_words)
+            result.merge(partial)
+    result.target_words = _words_at(tasks, bases, result.targets, result.total_words)
+    return result
+
+
+def _words_at(tasks, bases, positions, total_words):
+    """{位置: 単語}。指定した位置を含む範囲だけを読み直す"""
+    local = {}
+    for position in positions:
+        if position <= total_words:
+            i = bisect_left(bases, position) - 1
+            local.setdefault(i, []).append(position - bases[i])
+    found = {}
+    for i, range_positions in local.items():
+        path, start, end, chunk_size = tasks[i]
+        finder = WordStats(range_positions)
+        with open(path, "rb") as f:
+            for text in iter_text_chunks(f, start, end, chunk_size):
+                finder.add_text(text)
+                if finder.total_words >= finder.targets[-1]:
+                    break
+        found.update((p + bases[i], word) for p, word in finder.target_words.items())
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--positions", type=int, nargs="*", default=[], help="単語を知りたい位置 (1から)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    stats = word_stats(args.paths, args.workers, args.positions, args.chunk_size)
+    elapsed = time.perf_counter() - started
+    size = sum(os.path.getsize(p) for p in args.paths)
+    print(f"{stats.total_words:,}語 (異なり {len(stats.counts):,}語)  {size / 1e6 / elapsed:.1f} MB/s")
+    for word, count in stats.counts.most_common(args.top):
+        print(f"{count:>12,}  {word}  (最初の位置 {stats.first_position[word]:,})")
+    print("文字数:", ", ".join(f"{length}:{count:,}" for length, count in stats.length_histogram()))
+    if args.positions:
+        print("指定した位置の単語:", {p: stats.target_words.get(p) for p in sorted(set(args.positions))})
+        print("先頭2文字 -> 位置:", stats.prefix_index())
+
+
+if __name__ == "__main__":
+    main()